@@ -0,0 +1,423 @@
+"""
+ALERTAS ECONÓMICAS
+Reglas declarativas (umbrales, cruces, z-scores y rachas) sobre cualquier
+columna del panel. Las reglas se compilan en bloques vectorizados por serie
+de entrada, cada bloque se evalúa solo sobre las observaciones nuevas y el
+estado de las alertas (sin duplicados) persiste en el almacén
+"""
+
+import threading
+from dataclasses import astuple, dataclass
+from functools import cached_property
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from derived_metrics import yoy_series
+from macro_panel import MacroPanel
+from series_store import SeriesStore, get_default_store
+
+KINDS = ('threshold', 'cross', 'zscore', 'streak')
+OPERATORS = ('>', '<', 'abs>')
+TRANSFORMS = ('level', 'diff', 'pct', 'yoy')
+
+# Orden de presentación de las alertas
+SEVERITIES = ('critical', 'warning', 'info')
+
+# Grupo de las series calculadas fuera del panel (p. ej. probabilidad de recesión)
+DERIVED_GROUP = 'derived'
+
+# Días durante los que se muestra una alerta puntual (cruce) o ya cerrada
+RECENT_DAYS = 30
+
+# Alertas cerradas que se conservan en el estado persistente
+ALERT_HISTORY_LIMIT = 500
+
+# Nombre del estado en el almacén
+STATE_NAME = 'alerts'
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    """
+    Regla de alerta sobre una serie (grupo, nombre) del panel
+
+    - kind: 'threshold' (activa mientras se cumple la condición), 'cross'
+      (solo el día en que empieza a cumplirse), 'zscore' (la condición se
+      aplica al z-score móvil de `window` observaciones) o 'streak' (la
+      condición se cumple `streak` observaciones seguidas)
+    - op/level: condición valor > level, valor < level o |valor| > level
+    - transform: 'level', 'diff' y 'pct' (a `lag` observaciones) o 'yoy'
+    - minus: otra columna del mismo grupo que se resta (diferenciales)
+
+    title, message y action admiten {value} (o {z}), {level}, {name}, {date}
+    (apertura) y {streak}.
+    """
+    id: str
+    group: str
+    name: str
+    kind: str = 'threshold'
+    op: str = '>'
+    level: float = 0.0
+    transform: str = 'level'
+    lag: int = 1
+    minus: Optional[str] = None
+    window: int = 60
+    streak: int = 3
+    severity: str = 'warning'
+    title: str = ''
+    message: str = ''
+    action: str = ''
+
+    @property
+    def source(self) -> Tuple:
+        return self.group, self.name, self.minus, self.transform, self.lag
+
+    @property
+    def input_key(self) -> Tuple:
+        return self.source + ((self.window,) if self.kind == 'zscore' else (None,))
+
+    @cached_property
+    def signature(self) -> str:
+        return repr(astuple(self))
+
+
+# Reglas por defecto (sustituyen a generate_economic_alerts)
+DEFAULT_RULES = [
+    AlertRule('curve_inverted', 'rates', '10Y Treasury', minus='2Y Treasury', op='<', level=0.0,
+              severity='critical', title="🔴 Curva de rendimientos invertida",
+              message="El diferencial 10Y-2Y está en {value:+.2f}pp desde el {date}",
+              action="Históricamente precede a recesiones en 12-24 meses: reducir riesgo de crédito"),
+    AlertRule('curve_uninverted', 'rates', '10Y Treasury', minus='2Y Treasury', kind='cross', op='>', level=0.0,
+              severity='warning', title="⚠️ La curva sale de la inversión",
+              message="El diferencial 10Y-2Y vuelve a positivo ({value:+.2f}pp) el {date}",
+              action="La desinversión suele coincidir con el inicio de las recesiones"),
+    AlertRule('inflation_high', 'macro', 'CPI', transform='yoy', op='>', level=4.0,
+              severity='warning', title="🔥 Inflación elevada",
+              message="CPI interanual del {value:.1f}% (objetivo 2%)",
+              action="Presión para mantener una política monetaria restrictiva"),
+    AlertRule('inflation_very_high', 'macro', 'CPI', transform='yoy', op='>', level=6.0,
+              severity='critical', title="🔥 Inflación muy elevada",
+              message="CPI interanual del {value:.1f}%",
+              action="Riesgo de subidas agresivas de tipos: acortar duración"),
+    AlertRule('unemployment_rising', 'macro', 'Unemployment', kind='streak', transform='diff', op='>',
+              level=0.0, streak=3, severity='warning', title="📈 Desempleo al alza",
+              message="El desempleo sube {streak} meses seguidos (último cambio {value:+.2f}pp)",
+              action="Señal temprana de debilidad del mercado laboral"),
+    AlertRule('sentiment_low', 'macro', 'Consumer Sentiment', op='<', level=60.0,
+              severity='info', title="😟 Sentimiento del consumidor débil",
+              message="Índice de la Universidad de Michigan en {value:.1f}",
+              action="Vigilar el consumo y las ventas minoristas"),
+    AlertRule('rate_10y_shock', 'rates', '10Y Treasury', kind='zscore', transform='diff', op='abs>',
+              level=3.0, window=60, severity='warning', title="⚡ Movimiento anómalo del 10Y",
+              message="Cambio diario del 10Y de {z:+.1f} desviaciones típicas el {date}",
+              action="Revisar la exposición a duración"),
+    AlertRule('fed_funds_move', 'rates', 'Fed Funds', kind='cross', transform='diff', lag=1, op='abs>',
+              level=0.2, severity='info', title="🏦 Cambio de tipos de la Fed",
+              message="Fed Funds efectivo cambia {value:+.2f}pp el {date}",
+              action="Reajustar las proyecciones de tipos"),
+    AlertRule('vix_elevated', 'markets', 'VIX', kind='cross', op='>', level=25.0,
+              severity='warning', title="😨 Volatilidad en aumento",
+              message="El VIX supera 25 ({value:.1f}) el {date}",
+              action="Revisar coberturas"),
+    AlertRule('vix_panic', 'markets', 'VIX', op='>', level=35.0,
+              severity='critical', title="😱 Pánico en los mercados",
+              message="VIX en {value:.1f}",
+              action="Evitar vender en pánico; valorar coberturas y liquidez"),
+    AlertRule('equity_crash', 'markets', 'S&P 500', kind='zscore', transform='pct', op='<',
+              level=-3.0, window=250, severity='critical', title="📉 Caída extrema del S&P 500",
+              message="Rentabilidad diaria de {z:+.1f} desviaciones típicas el {date}",
+              action="Comprobar correlaciones y riesgo de contagio"),
+    AlertRule('recession_high', DERIVED_GROUP, 'Probabilidad de recesión', op='>', level=60.0,
+              severity='critical', title="🚨 Riesgo de recesión alto",
+              message="Probabilidad de recesión del {value:.0f}%",
+              action="Posicionamiento defensivo: calidad, duración y liquidez"),
+    AlertRule('recession_moderate', DERIVED_GROUP, 'Probabilidad de recesión', op='>', level=30.0,
+              severity='warning', title="⚠️ Riesgo de recesión moderado",
+              message="Probabilidad de recesión del {value:.0f}%",
+              action="Vigilar desempleo y producción industrial"),
+]
+
+
+def validate_rules(rules: Sequence[AlertRule]) -> None:
+    """
+    Comprueba tipos, operadores, transformaciones, severidades e ids únicos
+    """
+    for field, allowed in (('kind', KINDS), ('op', OPERATORS), ('transform', TRANSFORMS), ('severity', SEVERITIES)):
+        unknown = {getattr(rule, field) for rule in rules} - set(allowed)
+        if unknown:
+            raise ValueError(f"{field} desconocido: {', '.join(sorted(unknown))} (usa {', '.join(allowed)})")
+    ids = [rule.id for rule in rules]
+    if len(ids) != len(set(ids)):
+        raise ValueError("Hay reglas con el mismo id")
+
+
+def rule_input(panel: MacroPanel, source: Tuple, extra: Dict[str, pd.Series] = None) -> pd.Series:
+    """
+    Serie de entrada de una regla en su propia frecuencia (sin NaN)
+    """
+    group, name, minus, transform, lag = source
+    lookup = (lambda col: (extra or {}).get(col, pd.Series(dtype=float))) if group == DERIVED_GROUP \
+        else (lambda col: panel.native(group, col))
+
+    series = lookup(name).dropna()
+    if minus is not None:
+        # Diferencial as-of sobre la unión de fechas de ambas series
+        both = pd.concat([series, lookup(minus).dropna()], axis=1).sort_index().ffill().dropna()
+        series = both.iloc[:, 0] - both.iloc[:, 1]
+
+    if transform == 'diff':
+        series = series.diff(lag)
+    elif transform == 'pct':
+        series = series.pct_change(lag) * 100
+    elif transform == 'yoy':
+        series = yoy_series(series)
+    return series.replace([np.inf, -np.inf], np.nan).dropna()
+
+
+def rolling_zscore(series: pd.Series, window: int) -> pd.Series:
+    """
+    z-score de cada observación frente a las `window` anteriores (ella excluida)
+    """
+    past = series.shift(1).rolling(window, min_periods=window)
+    return ((series - past.mean()) / past.std()).replace([np.inf, -np.inf], np.nan).dropna()
+
+
+class CompiledBlock:
+    """
+    Reglas que comparten serie de entrada, como arrays para evaluarlas a la vez
+    """
+
+    def __init__(self, rules: List[AlertRule]):
+        self.rules = rules
+        self.levels = np.array([rule.level for rule in rules], dtype=float)
+        self.absolute = np.array([rule.op == 'abs>' for rule in rules])
+        self.below = np.array([rule.op == '<' for rule in rules])
+        self.cross = np.array([rule.kind == 'cross' for rule in rules])
+        self.streak = np.array([rule.kind == 'streak' for rule in rules])
+        self.streak_length = np.array([rule.streak if rule.kind == 'streak' else 1 for rule in rules])
+
+    def evaluate(self, values: np.ndarray, cond: np.ndarray, firing: np.ndarray,
+                 streak: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Evalúa todas las reglas sobre las observaciones nuevas (n,)
+
+        cond, firing y streak (R,) son el estado tras la última observación
+        evaluada. Devuelve (condición, disparo, racha), cada uno (n, R).
+        """
+        x = values[:, None]
+        x = np.where(self.absolute, np.abs(x), x)
+        with np.errstate(invalid='ignore'):
+            now = np.where(self.below, x < self.levels, x > self.levels)
+
+        rows = np.arange(len(values))[:, None]
+        previous = np.vstack([cond[None, :], now[:-1]])
+
+        # Racha: observaciones seguidas cumpliendo la condición (arrastra la anterior)
+        counts = np.cumsum(now, axis=0)
+        last_break = np.maximum.accumulate(np.where(~now, rows, -1), axis=0)
+        before = np.take_along_axis(counts, np.maximum(last_break, 0), axis=0)
+        runs = np.where(last_break >= 0, counts - before, counts + streak)
+
+        fired = np.where(self.cross, now & ~previous, np.where(self.streak, runs >= self.streak_length, now))
+        return now, fired, runs
+
+
+class AlertEngine:
+    """
+    Evaluación incremental de reglas con estado persistente
+
+    Para cada regla se guarda la última observación evaluada de su serie y
+    el estado tras ella (condición, disparo, racha); cada actualización solo
+    evalúa las observaciones posteriores, de modo que los datos macro que se
+    publican con retraso también se evalúan cuando llegan. Una alerta se
+    abre cuando la regla empieza a disparar y se cierra cuando deja de
+    hacerlo; su clave (regla + fecha de apertura) evita duplicados.
+    """
+
+    def __init__(self, rules: Sequence[AlertRule] = None, store: SeriesStore = None,
+                 state_name: str = STATE_NAME):
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+        validate_rules(self.rules)
+        self.store = store or get_default_store()
+        self.state_name = state_name
+        self._blocks: Dict[Tuple, CompiledBlock] = {}
+        for rule in self.rules:
+            self._blocks.setdefault(rule.input_key, []).append(rule)
+        self._blocks = {key: CompiledBlock(rules) for key, rules in self._blocks.items()}
+        self._version = None
+        self._lock = threading.Lock()
+
+    # ── Evaluación ──────────────────────────────────────────────────────────
+
+    def update(self, panel: MacroPanel, extra: Dict[str, pd.Series] = None) -> List[Dict]:
+        """
+        Evalúa las observaciones nuevas del panel (y de las series `extra`) y
+        devuelve las alertas vigentes
+        """
+        with self._lock:
+            version = (panel.version, tuple((name, len(s), s.index[-1] if len(s) else None)
+                                            for name, s in (extra or {}).items()))
+            state = self.store.load_state(self.state_name)
+            if version == self._version:
+                return self.current(state, panel.index[-1] if len(panel.index) else None)
+
+            rule_ids = {rule.id for rule in self.rules}
+            rule_states = {rule_id: s for rule_id, s in state.get('rules', {}).items() if rule_id in rule_ids}
+            alerts = {key: a for key, a in state.get('alerts', {}).items() if a['rule'] in rule_ids}
+            sources: Dict[Tuple, pd.Series] = {}
+
+            for key, block in self._blocks.items():
+                if key[:-1] not in sources:
+                    sources[key[:-1]] = rule_input(panel, key[:-1], extra)
+                series = sources[key[:-1]] if key[-1] is None else rolling_zscore(sources[key[:-1]], key[-1])
+                if len(series) == 0:
+                    continue
+
+                # Las reglas nuevas o modificadas se evalúan desde el principio
+                known = [rule_states.get(rule.id, {}) for rule in block.rules]
+                seen = [s.get('seen') if s.get('signature') == rule.signature else None
+                        for s, rule in zip(known, block.rules)]
+                for since in set(seen):
+                    members = [i for i, s in enumerate(seen) if s == since]
+                    new = series[series.index > pd.Timestamp(since)] if since else series
+                    if len(new) == 0:
+                        continue
+                    self._evaluate(block, members, new, rule_states, alerts, fresh=since is None)
+
+            alerts = self._trim(alerts)
+            state = {'rules': rule_states, 'alerts': alerts, 'updated_at': datetime.now().isoformat()}
+            self.store.save_state(self.state_name, state)
+            self._version = version
+            return self.current(state, panel.index[-1] if len(panel.index) else None)
+
+    def _evaluate(self, block: CompiledBlock, members: List[int], new: pd.Series,
+                  rule_states: Dict, alerts: Dict, fresh: bool) -> None:
+        rules = [block.rules[i] for i in members]
+        sub = CompiledBlock(rules) if len(members) < len(block.rules) else block
+        if fresh:
+            ids = {rule.id for rule in rules}
+            for key in [key for key, a in alerts.items() if a['rule'] in ids]:
+                del alerts[key]
+        previous = [{} if fresh else rule_states.get(rule.id, {}) for rule in rules]
+        cond = np.array([s.get('cond', False) for s in previous])
+        firing = np.array([s.get('firing', False) for s in previous])
+        streak = np.array([s.get('streak', 0) for s in previous])
+
+        values = new.to_numpy(dtype=float)
+        now, fired, runs = sub.evaluate(values, cond, firing, streak)
+        before = np.vstack([firing[None, :], fired[:-1]])
+
+        # Aperturas y cierres como arrays (regla, fila): la k-ésima apertura de una
+        # regla se cierra en su k-ésimo cierre (contando el de la alerta ya abierta)
+        n = len(values)
+        dates = np.asarray(new.index.strftime('%Y-%m-%d'))
+        carried = (firing & ~sub.cross).astype(int)
+        open_j, open_row = np.nonzero((fired & ~before).T)
+        close_j, close_row = np.nonzero((~fired & before & ~sub.cross).T)
+        open_rank = np.arange(len(open_j)) - np.searchsorted(open_j, open_j)
+        close_rank = np.arange(len(close_j)) - np.searchsorted(close_j, close_j) - carried[close_j]
+
+        close_keys = close_j * (n + 2) + close_rank + 1
+        pos = np.searchsorted(close_keys, open_j * (n + 2) + open_rank + 1)
+        found = pos < len(close_keys)
+        found[found] = close_keys[pos[found]] == (open_j * (n + 2) + open_rank + 1)[found]
+        closes_at = np.full(len(open_j), -1)
+        closes_at[found] = close_row[pos[found]]
+        closes_at = np.where(sub.cross[open_j], open_row, closes_at)
+
+        # Solo se materializan las abiertas y las ALERT_HISTORY_LIMIT cerradas más recientes
+        closed = np.flatnonzero(closes_at >= 0)
+        keep = np.concatenate([np.flatnonzero(closes_at < 0),
+                               closed[np.argsort(closes_at[closed], kind='stable')][-ALERT_HISTORY_LIMIT:]])
+        open_keys = [s.get('open') for s in previous]
+        for i in np.sort(keep):
+            j, row, close = open_j[i], open_row[i], closes_at[i]
+            rule = rules[j]
+            last = n - 1 if close < 0 else close if rule.kind == 'cross' else close - 1
+            key = f"{rule.id}@{dates[row]}"
+            alerts[key] = self._alert(rule, values[last], dates[row], int(runs[last, j]))
+            alerts[key]['closed'] = dates[close] if close >= 0 else None
+            if close < 0:
+                open_keys[j] = key
+
+        # La alerta que seguía abierta se actualiza (y se cierra si toca)
+        for j in np.flatnonzero(carried):
+            alert = alerts.get(previous[j].get('open'))
+            if alert is None:
+                continue
+            first = np.searchsorted(close_j, j)
+            close = close_row[first] if first < len(close_j) and close_j[first] == j else -1
+            last = n - 1 if close < 0 else close - 1
+            if last >= 0:
+                alert.update(self._alert(rules[j], values[last], alert['opened'], int(runs[last, j])))
+            alert['closed'] = dates[close] if close >= 0 else None
+
+        for j, rule in enumerate(rules):
+            rule_states[rule.id] = {
+                'signature': rule.signature,
+                'seen': dates[-1],
+                'cond': bool(now[-1, j]),
+                'firing': bool(fired[-1, j]),
+                'streak': int(runs[-1, j]),
+                'open': open_keys[j] if fired[-1, j] and rule.kind != 'cross' else None,
+            }
+
+    @staticmethod
+    def _alert(rule: AlertRule, value: float, opened: str, streak: int) -> Dict:
+        fields = {'value': value, 'z': value, 'level': rule.level, 'name': rule.name,
+                  'date': opened, 'streak': streak}
+        return {
+            'rule': rule.id,
+            'type': rule.severity,
+            'title': rule.title.format(**fields) or rule.id,
+            'message': rule.message.format(**fields) or f"{rule.name} {rule.op} {rule.level}: {value:.2f}",
+            'action': rule.action.format(**fields),
+            'value': float(value),
+            'opened': opened,
+            'closed': None,
+        }
+
+    @staticmethod
+    def _trim(alerts: Dict) -> Dict:
+        closed = sorted((a['closed'], key) for key, a in alerts.items() if a.get('closed') is not None)
+        drop = {key for _, key in closed[:max(0, len(closed) - ALERT_HISTORY_LIMIT)]}
+        return {key: a for key, a in alerts.items() if key not in drop}
+
+    # ── Lecturas ────────────────────────────────────────────────────────────
+
+    def current(self, state: Dict = None, as_of=None) -> List[Dict]:
+        """
+        Alertas abiertas y las cerradas en los últimos RECENT_DAYS, por severidad y fecha
+        """
+        state = self.store.load_state(self.state_name) if state is None else state
+        alerts = list(state.get('alerts', {}).values())
+        if not alerts:
+            return []
+        as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp(max(a['opened'] for a in alerts))
+        cutoff = (as_of - pd.Timedelta(days=RECENT_DAYS)).strftime('%Y-%m-%d')
+
+        shown = [a for a in alerts if a.get('closed') is None or a['closed'] >= cutoff]
+        shown.sort(key=lambda a: a['opened'], reverse=True)
+        shown.sort(key=lambda a: (a.get('closed') is not None, SEVERITIES.index(a['type'])))
+        return shown
+
+    def history(self) -> pd.DataFrame:
+        """
+        Todas las alertas guardadas (abiertas y cerradas)
+        """
+        alerts = self.store.load_state(self.state_name).get('alerts', {})
+        if not alerts:
+            return pd.DataFrame(columns=['opened', 'closed', 'type', 'title', 'message', 'value'])
+        frame = pd.DataFrame(list(alerts.values()))
+        return frame[['opened', 'closed', 'type', 'title', 'message', 'value']].sort_values('opened', ascending=False)
+
+    def reset(self) -> None:
+        """
+        Borra el estado: la próxima actualización evalúa todo el histórico
+        """
+        with self._lock:
+            self.store.save_state(self.state_name, {})
+            self._version = None
@@ -0,0 +1,225 @@
+"""
+FUNCIONES DE ANÁLISIS
+Pendiente de la curva, proyección por tendencia y probabilidad de recesión,
+independientes de Streamlit (las usan la app y el pipeline sin interfaz)
+"""
+
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def calculate_yield_curve_slope(df: pd.DataFrame) -> float:
+    """
+    Calcula la pendiente de la curva de rendimientos (10Y - 2Y)
+    Una pendiente negativa puede indicar recesión
+    """
+    if '10Y Treasury' in df.columns and '2Y Treasury' in df.columns:
+        latest = df.iloc[-1]
+        return latest['10Y Treasury'] - latest['2Y Treasury']
+    return 0.0
+
+
+def calculate_rate_of_change(series: pd.Series, periods: int = 12) -> float:
+    """
+    Calcula la tasa de cambio porcentual en n períodos
+    """
+    if len(series) < periods + 1:
+        return 0.0
+
+    current = series.iloc[-1]
+    past = series.iloc[-periods-1]
+
+    if past == 0:
+        return 0.0
+
+    return ((current - past) / past) * 100
+
+
+def fit_linear_trends(values: np.ndarray, window: int = 60) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Ajusta una tendencia lineal a cada columna de una matriz (T x N) en una sola pasada
+
+    Cada columna usa sus últimas `window` observaciones válidas (los NaN se
+    ignoran, con máscaras distintas por columna) y el eje x es la posición
+    de la observación dentro de la serie sin NaN, igual que np.polyfit sobre
+    series.dropna(). Devuelve (pendiente, ordenada, nº de observaciones válidas).
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+
+    valid = ~np.isnan(values)
+    n_valid = valid.sum(axis=0)
+
+    # Posición de cada observación entre las válidas de su columna
+    x = np.cumsum(valid, axis=0) - 1
+
+    # Ventana: las últimas `window` observaciones válidas de cada columna
+    weights = (valid & (x >= (n_valid - window)[None, :])).astype(float)
+    y = np.where(valid, values, 0.0)
+
+    # Mínimos cuadrados ponderados con x centrada (estable numéricamente)
+    w_sum = weights.sum(axis=0)
+    safe_sum = np.where(w_sum > 0, w_sum, 1.0)
+    x_mean = (weights * x).sum(axis=0) / safe_sum
+    y_mean = (weights * y).sum(axis=0) / safe_sum
+    x_c = (x - x_mean[None, :]) * weights
+    sxx = (x_c * (x - x_mean[None, :])).sum(axis=0)
+    sxy = (x_c * (y - y_mean[None, :])).sum(axis=0)
+
+    slope = np.divide(sxy, sxx, out=np.zeros_like(sxy), where=sxx > 0)
+    intercept = y_mean - slope * x_mean
+
+    return slope, intercept, n_valid
+
+
+def forecast_interest_rates(df: pd.DataFrame, periods: int = 12, window: int = 60) -> pd.DataFrame:
+    """
+    Proyección simple de tipos de interés usando tendencia lineal
+    Todas las series se ajustan a la vez (ver fit_linear_trends)
+    """
+    if df.empty:
+        return pd.DataFrame()
+
+    slope, intercept, n_valid = fit_linear_trends(df.to_numpy(dtype=float), window)
+
+    # Series con menos de 3 observaciones no se proyectan
+    keep = n_valid >= 3
+
+    # Proyectar: x futuras a continuación de la última observación válida de cada serie
+    future_x = n_valid[None, keep] + np.arange(periods)[:, None]
+    future_y = intercept[None, keep] + slope[None, keep] * future_x
+
+    # Crear DataFrame de proyecciones
+    future_dates = pd.date_range(
+        start=df.index[-1] + pd.Timedelta(days=30),
+        periods=periods,
+        freq='MS'
+    )
+
+    forecast_df = pd.DataFrame(future_y, index=future_dates, columns=df.columns[keep])
+    return forecast_df
+
+
+# Puntos de cada señal de recesión (suman 100)
+RECESSION_WEIGHTS = {
+    'Curva invertida': 25,
+    'Desempleo': 20,
+    'Producción industrial': 15,
+    'Sentimiento': 15,
+    'M2': 15,
+    'Inflación': 10
+}
+
+# Meses de histórico que necesita la señal más larga (variaciones a 12 meses)
+RECESSION_LOOKBACK_MONTHS = 12
+
+
+def calculate_recession_probability_history(indicators: Dict[str, pd.Series],
+                                            rates: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Probabilidad de recesión para cada mes, calculada de una vez con shift/rolling
+
+    Devuelve un DataFrame mensual con los puntos de cada señal (columnas de
+    RECESSION_WEIGHTS) y la columna 'probability'. Cada señal se evalúa
+    sobre su propia serie y se arrastra hasta la siguiente publicación.
+    """
+    def _native(name: str) -> pd.Series:
+        series = indicators.get(name)
+        return series.dropna() if series is not None else pd.Series(dtype=float)
+
+    signals = {}
+
+    # 1. Curva de rendimientos invertida (10Y - 2Y al cierre de cada mes)
+    if rates is not None and '10Y Treasury' in rates.columns and '2Y Treasury' in rates.columns:
+        spread = (rates['10Y Treasury'] - rates['2Y Treasury']).dropna()
+        signals['Curva invertida'] = spread.resample('MS').last().dropna() < 0
+
+    # 2. Desempleo en aumento: +0.5% frente a 11 observaciones antes
+    unemp = _native('Unemployment')
+    signals['Desempleo'] = (unemp - unemp.shift(11)) > 0.5
+
+    # 3. Producción industrial en descenso: caída de 2% en 5 observaciones
+    ip = _native('Industrial Production')
+    signals['Producción industrial'] = ip.pct_change(5, fill_method=None) * 100 < -2
+
+    # 4. Sentimiento del consumidor 10% por debajo de su media de 12 meses
+    sentiment = _native('Consumer Sentiment')
+    signals['Sentimiento'] = sentiment < sentiment.rolling(12).mean() * 0.9
+
+    # 5. Contracción monetaria (M2)
+    m2 = _native('M2 Money Supply')
+    signals['M2'] = m2.pct_change(11, fill_method=None) * 100 < 0
+
+    # 6. Inflación (CPI) alta
+    cpi = _native('CPI')
+    signals['Inflación'] = cpi.pct_change(11, fill_method=None) * 100 > 4
+
+    signals = {name: signal for name, signal in signals.items() if len(signal) > 0}
+    if not signals:
+        return pd.DataFrame(columns=list(RECESSION_WEIGHTS) + ['probability'])
+
+    # Calendario mensual común: cada señal vale su último valor conocido
+    start = min(signal.index.min() for signal in signals.values())
+    end = max(signal.index.max() for signal in signals.values())
+    calendar = pd.date_range(start.to_period('M').to_timestamp(), end, freq='MS')
+
+    points = pd.DataFrame(0.0, index=calendar, columns=list(RECESSION_WEIGHTS))
+    for name, signal in signals.items():
+        monthly = signal.astype(float).groupby(signal.index.to_period('M').to_timestamp()).last()
+        points[name] = monthly.reindex(calendar).ffill().fillna(0.0).to_numpy() * RECESSION_WEIGHTS[name]
+
+    points['probability'] = points[list(RECESSION_WEIGHTS)].sum(axis=1) / sum(RECESSION_WEIGHTS.values()) * 100
+    return points
+
+
+def calculate_recession_probability(indicators: Dict[str, pd.Series], rates: pd.DataFrame = None) -> float:
+    """
+    Calcula probabilidad de recesión basada en indicadores clave
+    Modelo simplificado basado en múltiples señales (último valor del histórico)
+    """
+    history = calculate_recession_probability_history(indicators, rates)
+    return float(history['probability'].iloc[-1]) if len(history) > 0 else 0.0
+
+
+class RecessionProbabilityEngine:
+    """
+    Histórico de probabilidad de recesión que se actualiza de forma incremental
+
+    Tras el primer cálculo completo, cada actualización solo recalcula los
+    meses desde la última fila guardada, usando RECESSION_LOOKBACK_MONTHS de
+    histórico de entrada para las variaciones. Si las entradas empiezan antes
+    que el histórico (p. ej. al ampliar el período) se recalcula todo.
+    """
+
+    def __init__(self):
+        self.history = None
+        self._lock = threading.Lock()
+
+    def update(self, indicators: Dict[str, pd.Series], rates: pd.DataFrame = None) -> pd.DataFrame:
+        with self._lock:
+            starts = [s.index.min() for s in indicators.values() if s is not None and len(s) > 0]
+            if rates is not None and len(rates) > 0:
+                starts.append(rates.index.min())
+
+            if self.history is None or self.history.empty or not starts or \
+                    min(starts) < self.history.index[0] - pd.DateOffset(months=RECESSION_LOOKBACK_MONTHS):
+                self.history = calculate_recession_probability_history(indicators, rates)
+                return self.history
+
+            # Se recalcula el último mes guardado (puede estar incompleto) y los nuevos
+            last = self.history.index[-1]
+            cutoff = last - pd.DateOffset(months=RECESSION_LOOKBACK_MONTHS + 1)
+            recent_indicators = {
+                name: series[series.index >= cutoff] if series is not None else series
+                for name, series in indicators.items()
+            }
+            recent_rates = rates[rates.index >= cutoff] if rates is not None else None
+
+            fresh = calculate_recession_probability_history(recent_indicators, recent_rates)
+            fresh = fresh[fresh.index >= last]
+            self.history = pd.concat([self.history[self.history.index < last], fresh])
+            return self.history
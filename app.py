@@ -12,10 +12,37 @@ import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
-import yfinance as yf
-from fredapi import Fred
-import requests
-from typing import Dict, List, Tuple
+from data_fetch import (
+    configure_fred_client,
+    get_fred_client
+)
+from series_store import get_default_store, NEVER_STALE, PER_SERIES_TTL
+from freshness import MARKET_INTRADAY_TTL
+from series_catalog import RATE_SERIES
+from refresh_worker import RefreshWorker
+from analytics import (
+    calculate_yield_curve_slope,
+    forecast_interest_rates,
+    RECESSION_WEIGHTS,
+    RecessionProbabilityEngine
+)
+from pipeline import load_interest_rates, load_macro_indicators, load_market_data
+from scenarios import PROFILES, apply_scenarios, generate_stress_scenarios, scenario_grid
+from replay import EPISODES, SESSIONS_PER_MONTH, ReplayEngine, load_replay_history
+from alerts import AlertEngine
+from sentiment import COMPONENT_WEIGHTS, SentimentEngine
+from taylor import (
+    DEFAULT_PARAMS, GAP_COEF_GRID, NAIRU_GRID, PI_STAR_GRID, R_STAR_GRID,
+    TaylorGrid, TaylorParams, apply_taylor, policy_stance, taylor_grid, taylor_inputs
+)
+from montecarlo import simulate_rate_distribution
+from correlation import CorrelationEngine, DEFAULT_HALFLIFE
+from macro_panel import MacroPanel, build_panel, group_fingerprint, group_series
+from derived_metrics import DerivedMetrics, yoy_series
+from downsampling import DEFAULT_CHART_WIDTH, lttb, max_points, max_candles, ohlc_buckets
+from figure_cache import memoize_figure, clear_figure_cache
+from typing import Dict, Optional, Tuple
+import os
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -24,11 +51,7 @@ try:
     from advanced_functions import (
         ml_forecast_interest_rates,
         detect_economic_cycle,
-        calculate_economic_volatility_index,
-        generate_stress_scenarios,
-        generate_economic_alerts,
-        analyze_fed_policy_stance,
-        calculate_market_sentiment_score
+        calculate_economic_volatility_index
     )
     ADVANCED_FEATURES_AVAILABLE = True
 except ImportError:
@@ -169,232 +192,200 @@ st.markdown("""
 # FUNCIONES DE DATOS - FRED API
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@st.cache_data(ttl=3600)
-def get_fred_data(series_id: str, start_date: str = None) -> pd.Series:
+# Períodos de análisis del sidebar (años de histórico)
+ANALYSIS_PERIODS = {
+    "1 año": 1,
+    "2 años": 2,
+    "5 años": 5,
+    "10 años": 10
+}
+
+# Fuente (nodo de datos) de cada grupo del panel
+PANEL_SOURCES = {
+    'rates': 'interest_rates',
+    'macro': 'macro_indicators',
+    'markets': 'market_data'
+}
+
+# Modelos de shocks de la simulación Monte Carlo
+MC_METHODS = {
+    "Normal correlacionada": 'gaussian',
+    "Bootstrap de residuos": 'bootstrap'
+}
+
+# Ventanas disponibles para la correlación móvil (sesiones)
+CORRELATION_WINDOWS = [30, 60, 90, 180]
+
+@st.cache_resource
+def init_fred_client():
     """
-    Obtiene datos de FRED (Federal Reserve Economic Data)
-    Necesitas una API key gratuita de https://fred.stlouisfed.org/
+    Cliente FRED compartido por el proceso (sesión HTTP con pool de conexiones)
+    La API key se lee de st.secrets o de la variable de entorno FRED_API_KEY
     """
     try:
-        # IMPORTANTE: Reemplaza con tu API key de FRED
-        fred = Fred(api_key='TU_API_KEY_AQUI')
-        
-        if start_date is None:
-            start_date = (datetime.now() - timedelta(days=365*5)).strftime('%Y-%m-%d')
-        
-        data = fred.get_series(series_id, start_date)
-        return data
-    except Exception as e:
-        st.warning(f"Error obteniendo datos de FRED: {e}")
-        return pd.Series()
+        api_key = st.secrets.get('FRED_API_KEY')
+    except Exception:
+        api_key = None
+    
+    return configure_fred_client(api_key=api_key) if api_key else get_fred_client()
+
+@st.cache_resource
+def start_refresh_worker():
+    """
+    Arranca el refresco en segundo plano (un hilo por proceso)
+    MACRO_REFRESHER=process si se ejecuta aparte (python refresh_worker.py), off para desactivarlo
+    """
+    store = get_default_store()
+    if os.environ.get('MACRO_REFRESHER', 'thread') != 'thread' or store.refresher_alive():
+        return None
+    return RefreshWorker(store).start()
+
+def data_read_policy() -> Tuple[int, Optional[timedelta]]:
+    """
+    (generación del almacén, antigüedad máxima) con la que leer los datos base
+    Con el refresco en marcha el almacén se da por bueno y la página no descarga nada;
+    sin él, cada serie caduca según su frecuencia de publicación (PER_SERIES_TTL)
+    """
+    store = get_default_store()
+    max_age = NEVER_STALE if store.refresher_alive() else PER_SERIES_TTL
+    return store.generation(), max_age
+
+def warn_fred_errors(errors: Dict[str, str]):
+    """
+    Avisa en un único mensaje de las series FRED que fallaron
+    """
+    if errors:
+        failed = ", ".join(f"{name} ({msg})" for name, msg in errors.items())
+        st.warning(f"Error obteniendo datos de FRED: {failed}")
 
 @st.cache_data(ttl=3600)
-def get_interest_rate_expectations() -> pd.DataFrame:
+def get_interest_rate_expectations(years: int = 5, generation: int = 0,
+                                   max_age: Optional[timedelta] = PER_SERIES_TTL) -> pd.DataFrame:
     """
     Obtiene expectativas de tipos de interés desde diferentes fuentes
     """
     try:
-        # Fed Funds Rate efectivo
-        fed_funds = get_fred_data('DFF')
-        
-        # Treasury yields (curva de rendimientos)
-        t3m = get_fred_data('DGS3MO')
-        t2y = get_fred_data('DGS2')
-        t10y = get_fred_data('DGS10')
-        t30y = get_fred_data('DGS30')
-        
-        # Combinar en DataFrame
-        df = pd.DataFrame({
-            'Fed Funds': fed_funds,
-            '3M Treasury': t3m,
-            '2Y Treasury': t2y,
-            '10Y Treasury': t10y,
-            '30Y Treasury': t30y
-        })
-        
-        return df.dropna()
+        # Fed Funds + Treasury yields (curva de rendimientos) en una sola tanda
+        df, errors = load_interest_rates(years, max_age)
+        warn_fred_errors(errors)
+        return df
     except Exception as e:
         st.error(f"Error obteniendo expectativas de tipos: {e}")
         return pd.DataFrame()
 
 @st.cache_data(ttl=3600)
-def get_macro_indicators() -> Dict[str, pd.Series]:
+def get_macro_indicators(years: int = 5, generation: int = 0,
+                         max_age: Optional[timedelta] = PER_SERIES_TTL) -> Dict[str, pd.Series]:
     """
     Obtiene indicadores macroeconómicos principales
+    Incluye un año extra para que las variaciones interanuales cubran todo el período
     """
-    indicators = {
-        'GDP': 'GDP',           # PIB
-        'CPI': 'CPIAUCSL',      # Inflación (CPI)
-        'Unemployment': 'UNRATE',  # Tasa de desempleo
-        'Retail Sales': 'RSXFS',   # Ventas minoristas
-        'Industrial Production': 'INDPRO',  # Producción industrial
-        'Housing Starts': 'HOUST',  # Inicio de viviendas
-        'Consumer Sentiment': 'UMCSENT',  # Sentimiento del consumidor
-        'PCE': 'PCEPI',         # Índice de precios PCE
-        'M2 Money Supply': 'M2SL',  # Oferta monetaria M2
-        'Trade Balance': 'BOPGSTB'  # Balanza comercial
-    }
-    
-    data = {}
-    for name, series_id in indicators.items():
-        data[name] = get_fred_data(series_id)
-    
+    data, errors = load_macro_indicators(years, max_age)
+    warn_fred_errors(errors)
     return data
 
-@st.cache_data(ttl=3600)
-def get_market_data() -> Dict[str, pd.DataFrame]:
+@st.cache_data(ttl=MARKET_INTRADAY_TTL)
+def get_market_data(years: int = 2, generation: int = 0,
+                    max_age: Optional[timedelta] = PER_SERIES_TTL) -> Dict[str, pd.DataFrame]:
     """
     Obtiene datos de mercados financieros
     """
-    tickers = {
-        'S&P 500': '^GSPC',
-        'NASDAQ': '^IXIC',
-        'DXY (Dollar Index)': 'DX-Y.NYB',
-        'Gold': 'GC=F',
-        'Oil (WTI)': 'CL=F',
-        'VIX': '^VIX',
-        '10Y Treasury': '^TNX'
-    }
+    data, errors = load_market_data(years, max_age)
     
-    data = {}
-    for name, ticker in tickers.items():
-        try:
-            df = yf.download(ticker, period='2y', progress=False)
-            data[name] = df
-        except Exception as e:
-            st.warning(f"Error obteniendo {name}: {e}")
+    for name, msg in errors.items():
+        st.warning(f"Error obteniendo {name}: {msg}")
     
     return data
 
+@st.cache_resource(max_entries=8)
+def get_macro_panel(fingerprint: str, _sources: Dict[str, object]) -> MacroPanel:
+    """
+    Panel alineado de uno o varios grupos {grupo: fuente}, construido una sola vez por huella de datos
+    """
+    return build_panel({group: group_series(group, source) for group, source in _sources.items()})
+
+@st.cache_resource(max_entries=8)
+def get_derived_metrics(version: str, _panel: MacroPanel) -> DerivedMetrics:
+    """
+    Métricas derivadas (YoY, cambios, spread) calculadas una vez por versión del panel
+    """
+    return DerivedMetrics(_panel)
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # FUNCIONES DE ANÁLISIS
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def calculate_yield_curve_slope(df: pd.DataFrame) -> float:
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_rate_distribution(interest_rates: pd.DataFrame, horizon: int, n_paths: int,
+                          seed: int, method: str) -> Tuple[Dict[float, pd.DataFrame], pd.DataFrame, pd.DataFrame]:
     """
-    Calcula la pendiente de la curva de rendimientos (10Y - 2Y)
-    Una pendiente negativa puede indicar recesión
+    Distribución Monte Carlo de los tipos: (bandas de percentiles, media, desviación)
+    Cacheada por parámetros
     """
-    if '10Y Treasury' in df.columns and '2Y Treasury' in df.columns:
-        latest = df.iloc[-1]
-        return latest['10Y Treasury'] - latest['2Y Treasury']
-    return 0.0
+    return simulate_rate_distribution(interest_rates, horizon, n_paths, seed, method)
 
-def calculate_rate_of_change(series: pd.Series, periods: int = 12) -> float:
+@st.cache_resource(max_entries=2)
+def get_replay_engine(generation: int = 0, max_age: Optional[timedelta] = PER_SERIES_TTL) -> ReplayEngine:
     """
-    Calcula la tasa de cambio porcentual en n períodos
+    Índices de cambios del histórico largo, construidos una vez por generación del almacén
     """
-    if len(series) < periods + 1:
-        return 0.0
-    
-    current = series.iloc[-1]
-    past = series.iloc[-periods-1]
-    
-    if past == 0:
-        return 0.0
-    
-    return ((current - past) / past) * 100
+    rates, closes, errors = load_replay_history(max_age=max_age)
+    warn_fred_errors({name: msg for name, msg in errors.items() if name in RATE_SERIES})
+    return ReplayEngine(rates, closes)
 
-def forecast_interest_rates(df: pd.DataFrame, periods: int = 12) -> pd.DataFrame:
+@st.cache_resource
+def get_recession_engine(years: int) -> RecessionProbabilityEngine:
     """
-    Proyección simple de tipos de interés usando media móvil y tendencia
+    Motor incremental compartido por período de análisis
     """
-    forecasts = {}
-    
-    for col in df.columns:
-        series = df[col].dropna()
-        if len(series) < 3:
-            continue
-        
-        # Calcular tendencia lineal simple
-        x = np.arange(len(series))
-        y = series.values
-        
-        # Regresión lineal simple
-        coeffs = np.polyfit(x[-60:] if len(x) > 60 else x, y[-60:] if len(y) > 60 else y, 1)
-        
-        # Proyectar
-        future_x = np.arange(len(series), len(series) + periods)
-        future_y = np.polyval(coeffs, future_x)
-        
-        forecasts[col] = future_y
-    
-    # Crear DataFrame de proyecciones
-    future_dates = pd.date_range(
-        start=df.index[-1] + pd.Timedelta(days=30),
-        periods=periods,
-        freq='MS'
-    )
-    
-    forecast_df = pd.DataFrame(forecasts, index=future_dates)
-    return forecast_df
+    return RecessionProbabilityEngine()
 
-def calculate_recession_probability(indicators: Dict[str, pd.Series]) -> float:
+@st.cache_resource(max_entries=4)
+def get_taylor_grid(version: str, _inputs: pd.DataFrame) -> TaylorGrid:
     """
-    Calcula probabilidad de recesión basada en indicadores clave
-    Modelo simplificado basado en múltiples señales
+    Rejilla de sensibilidad de la regla de Taylor, evaluada una vez por versión del panel
     """
-    score = 0
-    max_score = 0
-    
-    # 1. Curva de rendimientos invertida
-    max_score += 25
-    # (se calculará con datos reales de la curva)
-    
-    # 2. Desempleo en aumento
-    if 'Unemployment' in indicators:
-        unemp = indicators['Unemployment']
-        if len(unemp) >= 12:
-            recent_change = unemp.iloc[-1] - unemp.iloc[-12]
-            if recent_change > 0.5:  # Aumento de 0.5% en desempleo
-                score += 20
-    max_score += 20
-    
-    # 3. Producción industrial en descenso
-    if 'Industrial Production' in indicators:
-        ip = indicators['Industrial Production']
-        if len(ip) >= 6:
-            recent_trend = (ip.iloc[-1] - ip.iloc[-6]) / ip.iloc[-6] * 100
-            if recent_trend < -2:  # Caída de 2%
-                score += 15
-    max_score += 15
-    
-    # 4. Sentimiento del consumidor bajo
-    if 'Consumer Sentiment' in indicators:
-        sentiment = indicators['Consumer Sentiment']
-        if len(sentiment) >= 12:
-            avg_sentiment = sentiment.iloc[-12:].mean()
-            if sentiment.iloc[-1] < avg_sentiment * 0.9:  # 10% por debajo de media
-                score += 15
-    max_score += 15
-    
-    # 5. M2 Money Supply (velocidad del dinero)
-    if 'M2 Money Supply' in indicators:
-        m2 = indicators['M2 Money Supply']
-        if len(m2) >= 12:
-            m2_growth = (m2.iloc[-1] - m2.iloc[-12]) / m2.iloc[-12] * 100
-            if m2_growth < 0:  # Contracción monetaria
-                score += 15
-    max_score += 15
-    
-    # 6. Inflación (CPI)
-    if 'CPI' in indicators:
-        cpi = indicators['CPI']
-        if len(cpi) >= 12:
-            inflation = (cpi.iloc[-1] - cpi.iloc[-12]) / cpi.iloc[-12] * 100
-            if inflation > 4:  # Inflación alta
-                score += 10
-    max_score += 10
-    
-    return (score / max_score * 100) if max_score > 0 else 0
+    return taylor_grid(_inputs)
+
+@st.cache_resource
+def get_sentiment_engine(years: int) -> SentimentEngine:
+    """
+    Histórico de sentimiento incremental compartido por período de análisis
+    """
+    return SentimentEngine()
+
+@st.cache_resource
+def get_alert_engine() -> AlertEngine:
+    """
+    Motor de alertas compartido por el proceso (estado persistente en el almacén)
+    """
+    return AlertEngine(store=get_default_store())
+
+@st.cache_resource
+def get_correlation_engine(years: int, window: int) -> CorrelationEngine:
+    """
+    Motor incremental de correlaciones compartido por período de análisis y ventana
+    """
+    return CorrelationEngine(window=window, halflife=DEFAULT_HALFLIFE)
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # FUNCIONES DE VISUALIZACIÓN
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def create_yield_curve_chart(df: pd.DataFrame, forecast_df: pd.DataFrame = None):
+def _hex_to_rgba(color: str, alpha: float) -> str:
+    """
+    Convierte un color '#rrggbb' en 'rgba(r, g, b, alpha)' para rellenos
+    """
+    color = color.lstrip('#')
+    r, g, b = (int(color[i:i + 2], 16) for i in (0, 2, 4))
+    return f'rgba({r}, {g}, {b}, {alpha})'
+
+@memoize_figure
+def create_yield_curve_chart(df: pd.DataFrame, forecast_df: pd.DataFrame = None,
+                             fan_bands: Dict[float, pd.DataFrame] = None):
     """
     Crea gráfico de curva de rendimientos con proyección
+    Con fan_bands (Monte Carlo) añade la banda P5-P95 y la mediana al final del horizonte
     """
     fig = go.Figure()
     
@@ -436,6 +427,32 @@ def create_yield_curve_chart(df: pd.DataFrame, forecast_df: pd.DataFrame = None)
             marker=dict(size=8)
         ))
     
+    # Banda Monte Carlo al final del horizonte
+    if fan_bands:
+        curve_cols = ['3M Treasury', '2Y Treasury', '10Y Treasury', '30Y Treasury']
+        low, high = fan_bands[min(fan_bands)], fan_bands[max(fan_bands)]
+        median = fan_bands.get(50)
+        
+        fig.add_trace(go.Scatter(
+            x=maturities + maturities[::-1],
+            y=[high.iloc[-1].get(c, 0) for c in curve_cols] + [low.iloc[-1].get(c, 0) for c in curve_cols][::-1],
+            fill='toself',
+            fillcolor='rgba(139, 92, 246, 0.15)',
+            line=dict(width=0),
+            hoverinfo='skip',
+            name=f'Monte Carlo P{min(fan_bands):g}-P{max(fan_bands):g}'
+        ))
+        
+        if median is not None:
+            fig.add_trace(go.Scatter(
+                x=maturities,
+                y=[median.iloc[-1].get(c, 0) for c in curve_cols],
+                mode='lines+markers',
+                name='Monte Carlo mediana',
+                line=dict(color='#8b5cf6', width=2, dash='dot'),
+                marker=dict(size=6)
+            ))
+    
     fig.update_layout(
         title='Curva de Rendimientos US Treasury',
         xaxis_title='Vencimiento',
@@ -449,20 +466,31 @@ def create_yield_curve_chart(df: pd.DataFrame, forecast_df: pd.DataFrame = None)
     
     return fig
 
-def create_interest_rate_history_chart(df: pd.DataFrame, forecast_df: pd.DataFrame = None):
+@memoize_figure
+def create_interest_rate_history_chart(df: pd.DataFrame, forecast_df: pd.DataFrame = None,
+                                       fan_bands: Dict[float, pd.DataFrame] = None,
+                                       width_px: int = DEFAULT_CHART_WIDTH):
     """
     Crea gráfico histórico de tipos de interés con proyección
+    Con fan_bands (Monte Carlo) añade bandas de percentiles por serie
+    El histórico se reduce con LTTB a los puntos que caben en width_px
     """
     fig = go.Figure()
     
+    palette = px.colors.qualitative.Plotly
+    colors = {col: palette[i % len(palette)] for i, col in enumerate(df.columns)}
+    n_points = max_points(width_px)
+    
     # Datos históricos
     for col in df.columns:
+        history = lttb(df[col], n_points)
         fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df[col],
+            x=history.index,
+            y=history.values,
             mode='lines',
             name=col,
-            line=dict(width=2)
+            legendgroup=col,
+            line=dict(width=2, color=colors[col])
         ))
     
     # Proyecciones
@@ -473,10 +501,35 @@ def create_interest_rate_history_chart(df: pd.DataFrame, forecast_df: pd.DataFra
                 y=forecast_df[col],
                 mode='lines',
                 name=f'{col} (Proyección)',
-                line=dict(width=2, dash='dash'),
+                legendgroup=col,
+                line=dict(width=2, dash='dash', color=colors.get(col)),
                 opacity=0.7
             ))
     
+    # Bandas Monte Carlo: exterior (min-max percentil) e interior (P25-P75)
+    if fan_bands:
+        percentiles = sorted(fan_bands)
+        band_pairs = [(percentiles[0], percentiles[-1], 0.12)]
+        if 25 in fan_bands and 75 in fan_bands:
+            band_pairs.append((25, 75, 0.25))
+        
+        for col in fan_bands[percentiles[0]].columns:
+            color = colors.get(col, '#8b5cf6')
+            
+            for low_p, high_p, alpha in band_pairs:
+                low, high = fan_bands[low_p][col], fan_bands[high_p][col]
+                fig.add_trace(go.Scatter(
+                    x=list(high.index) + list(low.index[::-1]),
+                    y=list(high.values) + list(low.values[::-1]),
+                    fill='toself',
+                    fillcolor=_hex_to_rgba(color, alpha),
+                    line=dict(width=0),
+                    hoverinfo='skip',
+                    legendgroup=col,
+                    showlegend=False,
+                    name=f'{col} P{low_p:g}-P{high_p:g}'
+                ))
+    
     fig.update_layout(
         title='Evolución y Proyección de Tipos de Interés',
         xaxis_title='Fecha',
@@ -497,10 +550,13 @@ def create_interest_rate_history_chart(df: pd.DataFrame, forecast_df: pd.DataFra
     
     return fig
 
-def create_macro_indicators_chart(indicators: Dict[str, pd.Series]):
+@memoize_figure
+def create_macro_indicators_chart(indicators: Dict[str, pd.Series], cpi_yoy: pd.Series = None,
+                                  width_px: int = DEFAULT_CHART_WIDTH):
     """
     Crea gráfico de indicadores macroeconómicos normalizados
     """
+    n_points = max_points(width_px, columns=2)
     fig = make_subplots(
         rows=2, cols=2,
         subplot_titles=('Inflación (CPI YoY%)', 'Desempleo (%)', 
@@ -510,9 +566,10 @@ def create_macro_indicators_chart(indicators: Dict[str, pd.Series]):
     )
     
     # CPI
-    if 'CPI' in indicators and len(indicators['CPI']) > 12:
-        cpi = indicators['CPI']
-        cpi_yoy = cpi.pct_change(12) * 100
+    if cpi_yoy is None and 'CPI' in indicators and len(indicators['CPI']) > 12:
+        cpi_yoy = yoy_series(indicators['CPI'].dropna())
+    if cpi_yoy is not None and len(cpi_yoy) > 0:
+        cpi_yoy = lttb(cpi_yoy, n_points)
         fig.add_trace(
             go.Scatter(x=cpi_yoy.index, y=cpi_yoy.values, 
                       name='CPI YoY%', line=dict(color='#ef4444', width=2)),
@@ -521,7 +578,7 @@ def create_macro_indicators_chart(indicators: Dict[str, pd.Series]):
     
     # Unemployment
     if 'Unemployment' in indicators:
-        unemp = indicators['Unemployment']
+        unemp = lttb(indicators['Unemployment'], n_points)
         fig.add_trace(
             go.Scatter(x=unemp.index, y=unemp.values,
                       name='Desempleo', line=dict(color='#f59e0b', width=2)),
@@ -530,7 +587,7 @@ def create_macro_indicators_chart(indicators: Dict[str, pd.Series]):
     
     # Industrial Production
     if 'Industrial Production' in indicators:
-        ip = indicators['Industrial Production']
+        ip = lttb(indicators['Industrial Production'], n_points)
         fig.add_trace(
             go.Scatter(x=ip.index, y=ip.values,
                       name='Prod. Industrial', line=dict(color='#3b82f6', width=2)),
@@ -539,7 +596,7 @@ def create_macro_indicators_chart(indicators: Dict[str, pd.Series]):
     
     # Consumer Sentiment
     if 'Consumer Sentiment' in indicators:
-        sentiment = indicators['Consumer Sentiment']
+        sentiment = lttb(indicators['Consumer Sentiment'], n_points)
         fig.add_trace(
             go.Scatter(x=sentiment.index, y=sentiment.values,
                       name='Sentimiento', line=dict(color='#10b981', width=2)),
@@ -556,10 +613,13 @@ def create_macro_indicators_chart(indicators: Dict[str, pd.Series]):
     
     return fig
 
-def create_market_overview_chart(market_data: Dict[str, pd.DataFrame]):
+@memoize_figure
+def create_market_overview_chart(market_data: Dict[str, pd.DataFrame], width_px: int = DEFAULT_CHART_WIDTH):
     """
     Crea gráfico de overview de mercados
+    Las velas se agregan por tramos y las líneas se reducen con LTTB según width_px
     """
+    n_points = max_points(width_px, columns=2)
     fig = make_subplots(
         rows=2, cols=2,
         subplot_titles=('S&P 500', 'VIX (Volatilidad)', 
@@ -570,7 +630,7 @@ def create_market_overview_chart(market_data: Dict[str, pd.DataFrame]):
     
     # S&P 500
     if 'S&P 500' in market_data:
-        sp500 = market_data['S&P 500']
+        sp500 = ohlc_buckets(market_data['S&P 500'], max_candles(width_px, columns=2))
         fig.add_trace(
             go.Candlestick(
                 x=sp500.index,
@@ -585,27 +645,27 @@ def create_market_overview_chart(market_data: Dict[str, pd.DataFrame]):
     
     # VIX
     if 'VIX' in market_data:
-        vix = market_data['VIX']
+        vix = lttb(market_data['VIX']['Close'], n_points)
         fig.add_trace(
-            go.Scatter(x=vix.index, y=vix['Close'],
+            go.Scatter(x=vix.index, y=vix.values,
                       name='VIX', line=dict(color='#ef4444', width=2)),
             row=1, col=2
         )
     
     # DXY
     if 'DXY (Dollar Index)' in market_data:
-        dxy = market_data['DXY (Dollar Index)']
+        dxy = lttb(market_data['DXY (Dollar Index)']['Close'], n_points)
         fig.add_trace(
-            go.Scatter(x=dxy.index, y=dxy['Close'],
+            go.Scatter(x=dxy.index, y=dxy.values,
                       name='DXY', line=dict(color='#3b82f6', width=2)),
             row=2, col=1
         )
     
     # Gold
     if 'Gold' in market_data:
-        gold = market_data['Gold']
+        gold = lttb(market_data['Gold']['Close'], n_points)
         fig.add_trace(
-            go.Scatter(x=gold.index, y=gold['Close'],
+            go.Scatter(x=gold.index, y=gold.values,
                       name='Gold', line=dict(color='#f59e0b', width=2)),
             row=2, col=2
         )
@@ -661,786 +721,1360 @@ def create_recession_probability_gauge(probability: float):
     
     return fig
 
+@memoize_figure
+def create_sentiment_history_chart(history: pd.DataFrame):
+    """
+    Score de sentimiento diario y aporte semanal de cada componente
+    """
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.06, row_heights=[0.55, 0.45])
+    
+    score = lttb(history['score'], max_points())
+    fig.add_trace(go.Scatter(
+        x=score.index, y=score.values, name='Sentimiento', mode='lines',
+        line=dict(color='white', width=2),
+        hovertemplate='%{x|%d %b %Y}<br>Sentimiento: %{y:.0f}<extra></extra>'
+    ), row=1, col=1)
+    fig.add_hrect(y0=70, y1=100, fillcolor='rgba(16, 185, 129, 0.1)', line_width=0, row=1, col=1)
+    fig.add_hrect(y0=0, y1=30, fillcolor='rgba(239, 68, 68, 0.1)', line_width=0, row=1, col=1)
+    
+    # Aportes frente a neutral (50), media semanal para que quepan como barras
+    weekly = history[[f"Δ {name}" for name in COMPONENT_WEIGHTS]].resample('W-FRI').mean()
+    colors = ['#8b5cf6', '#3b82f6', '#10b981', '#f59e0b', '#eab308']
+    for idx, name in enumerate(COMPONENT_WEIGHTS):
+        fig.add_trace(go.Bar(
+            x=weekly.index, y=weekly[f"Δ {name}"], name=name,
+            marker_color=colors[idx % len(colors)],
+            hovertemplate='%{x|%d %b %Y}<br>' + name + ': %{y:+.1f}<extra></extra>'
+        ), row=2, col=1)
+    
+    fig.update_yaxes(title_text='Score', range=[0, 100], row=1, col=1)
+    fig.update_yaxes(title_text='Aporte vs 50', row=2, col=1)
+    fig.update_layout(
+        title='Histórico del Sentimiento de Mercado',
+        barmode='relative',
+        height=550,
+        template='plotly_dark',
+        hovermode='x unified',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family='Inter', color='white'),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    
+    return fig
+
+@memoize_figure
+def create_taylor_history_chart(taylor: pd.DataFrame):
+    """
+    Fed Funds frente al tipo de Taylor y gap de política en cada fecha
+    """
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.06, row_heights=[0.6, 0.4])
+    n_points = max_points()
+    
+    for name, color in (('Fed Funds', '#3b82f6'), ('Taylor', '#f59e0b')):
+        series = lttb(taylor[name], n_points)
+        fig.add_trace(go.Scatter(
+            x=series.index, y=series.values, name='Regla de Taylor' if name == 'Taylor' else name,
+            mode='lines', line=dict(color=color, width=2, dash='dash' if name == 'Taylor' else None),
+            hovertemplate='%{x|%d %b %Y}<br>' + name + ': %{y:.2f}%<extra></extra>'
+        ), row=1, col=1)
+    
+    gap = lttb(taylor['Gap'], n_points)
+    fig.add_trace(go.Bar(
+        x=gap.index, y=gap.values, name='Gap',
+        marker_color=np.where(gap.values > 0, '#ef4444', '#10b981'),
+        hovertemplate='%{x|%d %b %Y}<br>Gap: %{y:+.2f}%<extra></extra>'
+    ), row=2, col=1)
+    
+    fig.update_yaxes(title_text='Tasa (%)', row=1, col=1)
+    fig.update_yaxes(title_text='Gap (pp)', row=2, col=1)
+    fig.update_layout(
+        title='Fed Funds vs Regla de Taylor',
+        height=500,
+        template='plotly_dark',
+        hovermode='x unified',
+        bargap=0,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family='Inter', color='white'),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    
+    return fig
+
+@memoize_figure
+def create_taylor_sensitivity_chart(grid: TaylorGrid, pi_star: float, gap_coef: float,
+                                    r_star: float, nairu: float):
+    """
+    Gap actual y gap absoluto medio del período para cada (r*, NAIRU)
+    """
+    current = grid.surface(grid.latest(), pi_star, gap_coef)
+    fit = grid.surface(grid.mean_abs(), pi_star, gap_coef)
+    
+    fig = make_subplots(rows=1, cols=2, horizontal_spacing=0.12,
+                        subplot_titles=('Gap actual (pp)', 'Gap absoluto medio del período (pp)'))
+    limit = float(np.nanmax(np.abs(current.values))) if current.size else 1.0
+    fig.add_trace(go.Heatmap(
+        z=current.values, x=current.columns, y=current.index,
+        colorscale='RdBu_r', zmid=0, zmin=-limit, zmax=limit,
+        colorbar=dict(x=0.44, len=0.9, title='pp'),
+        hovertemplate='r* %{y}% · NAIRU %{x}%<br>Gap: %{z:+.2f}pp<extra></extra>'
+    ), row=1, col=1)
+    fig.add_trace(go.Heatmap(
+        z=fit.values, x=fit.columns, y=fit.index, colorscale='Viridis_r',
+        colorbar=dict(x=1.0, len=0.9, title='pp'),
+        hovertemplate='r* %{y}% · NAIRU %{x}%<br>|Gap| medio: %{z:.2f}pp<extra></extra>'
+    ), row=1, col=2)
+    for col in (1, 2):
+        fig.add_trace(go.Scatter(
+            x=[nairu], y=[r_star], mode='markers', showlegend=False, hoverinfo='skip',
+            marker=dict(symbol='x', size=12, color='white')
+        ), row=1, col=col)
+        fig.update_xaxes(title_text='NAIRU (%)', row=1, col=col)
+        fig.update_yaxes(title_text='r* (%)', row=1, col=col)
+    
+    fig.update_layout(
+        title='Sensibilidad de la Regla de Taylor',
+        height=420,
+        template='plotly_dark',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family='Inter', color='white')
+    )
+    
+    return fig
+
+@memoize_figure
+def create_recession_history_chart(history: pd.DataFrame):
+    """
+    Histórico mensual de la probabilidad de recesión desglosada por señal
+    """
+    fig = go.Figure()
+    
+    colors = ['#ef4444', '#f59e0b', '#8b5cf6', '#06b6d4', '#10b981', '#ec4899']
+    for idx, name in enumerate(RECESSION_WEIGHTS):
+        fig.add_trace(go.Bar(
+            x=history.index,
+            y=history[name],
+            name=name,
+            marker_color=colors[idx % len(colors)],
+            opacity=0.6,
+            hovertemplate='%{x|%b %Y}<br>' + name + ': %{y:.0f} pts<extra></extra>'
+        ))
+    
+    fig.add_trace(go.Scatter(
+        x=history.index,
+        y=history['probability'],
+        name='Probabilidad',
+        mode='lines',
+        line=dict(color='white', width=2.5),
+        hovertemplate='%{x|%b %Y}<br>Probabilidad: %{y:.0f}%<extra></extra>'
+    ))
+    
+    fig.add_hline(y=60, line_dash="dash", line_color="#ef4444", opacity=0.5)
+    fig.add_hline(y=30, line_dash="dash", line_color="#f59e0b", opacity=0.5)
+    
+    fig.update_layout(
+        title='Histórico de Probabilidad de Recesión',
+        xaxis_title='Fecha',
+        yaxis_title='Probabilidad (%)',
+        yaxis=dict(range=[0, 100]),
+        barmode='stack',
+        height=400,
+        template='plotly_dark',
+        hovermode='x unified',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family='Inter', color='white'),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    
+    return fig
+
+@memoize_figure
+def create_correlation_heatmap(matrix: pd.DataFrame, title: str):
+    """
+    Heatmap de una matriz de correlación
+    """
+    fig = go.Figure(data=go.Heatmap(
+        z=matrix.values,
+        x=matrix.columns,
+        y=matrix.columns,
+        colorscale='RdBu',
+        zmid=0,
+        zmin=-1,
+        zmax=1,
+        text=matrix.values,
+        texttemplate='%{text:.2f}',
+        textfont={"size": 10},
+        colorbar=dict(title="Correlación")
+    ))
+    
+    fig.update_layout(
+        title=title,
+        template='plotly_dark',
+        height=500,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    
+    return fig
+
 # ═══════════════════════════════════════════════════════════════════════════════
-# INTERFAZ PRINCIPAL
+# CARGA DIFERIDA DE DATOS
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def main():
-    # Header
-    st.markdown("""
-    <div class="main-header">
-        <h1 class="main-title">📊 MACRO ECONOMIC DASHBOARD PRO</h1>
-        <p class="main-subtitle">
-            Análisis completo de tendencias macroeconómicas, tipos de interés y proyecciones futuras
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+class LazyData:
+    """
+    Resolución perezosa de datos y cálculos con dependencias
     
-    # Sidebar
-    with st.sidebar:
-        st.image("https://img.icons8.com/fluency/96/000000/stocks-growth.png", width=80)
-        st.title("⚙️ Configuración")
-        
-        # Toggle funciones avanzadas
-        if ADVANCED_FEATURES_AVAILABLE:
-            st.markdown("### 🚀 Funciones Avanzadas")
-            use_ml_forecast = st.checkbox("Usar ML para proyecciones", value=False, 
-                help="Usa Random Forest en vez de regresión lineal")
-            show_cycle_analysis = st.checkbox("Análisis de ciclo económico", value=True)
-            show_fed_policy = st.checkbox("Análisis postura Fed (Taylor)", value=True)
-            enable_stress_test = st.checkbox("Escenarios de estrés", value=False)
-            enable_auto_alerts = st.checkbox("Alertas automáticas", value=True)
-            show_market_sentiment = st.checkbox("Score de sentimiento", value=True)
-            st.markdown("---")
-        else:
-            use_ml_forecast = False
-            show_cycle_analysis = False
-            show_fed_policy = False
-            enable_stress_test = False
-            enable_auto_alerts = False
-            show_market_sentiment = False
-            st.info("💡 Instala advanced_functions para más características")
-        
-        analysis_period = st.selectbox(
-            "Período de análisis",
-            ["1 año", "2 años", "5 años", "10 años"],
-            index=2
-        )
-        
-        forecast_months = st.slider(
-            "Meses de proyección",
-            min_value=3,
-            max_value=24,
-            value=12,
-            step=3
-        )
+    Cada elemento se registra con una función que recibe el propio cargador,
+    de modo que sus dependencias se piden (y se calculan) solo cuando hacen
+    falta. Los resultados se memorizan durante la ejecución del script.
+    """
+    
+    def __init__(self):
+        self._providers = {}
+        self._values = {}
+        self._resolving = set()
+    
+    def register(self, name: str, provider, spinner: str = None):
+        self._providers[name] = (provider, spinner)
+    
+    def __getitem__(self, name: str):
+        if name in self._values:
+            return self._values[name]
         
-        st.markdown("---")
-        st.markdown("### 📡 Fuentes de datos")
-        st.markdown("""
-        - **FRED**: Federal Reserve Economic Data
-        - **Yahoo Finance**: Datos de mercado
-        - **Treasury.gov**: Bonos del tesoro
-        """)
+        if name in self._resolving:
+            raise RuntimeError(f"Dependencia circular en '{name}'")
         
-        st.markdown("---")
-        st.markdown("### ℹ️ Nota importante")
-        st.info("""
-        Para usar este dashboard necesitas:
-        1. API key de FRED (gratuita)
-        2. Conexión a internet
-        3. Instalar dependencias
-        """)
+        provider, spinner = self._providers[name]
+        self._resolving.add(name)
+        try:
+            if spinner:
+                with st.spinner(spinner):
+                    value = provider(self)
+            else:
+                value = provider(self)
+        finally:
+            self._resolving.discard(name)
         
-        if st.button("🔄 Actualizar datos", use_container_width=True):
-            st.cache_data.clear()
-            st.rerun()
+        self._values[name] = value
+        return value
+
+def build_data_loader(settings: Dict) -> LazyData:
+    """
+    Registra todas las fuentes de datos y cálculos del dashboard
+    """
+    data = LazyData()
+    advanced = ADVANCED_FEATURES_AVAILABLE
+    
+    # Datos base
+    years = ANALYSIS_PERIODS[settings['analysis_period']]
+    generation, max_age = data_read_policy()
+    
+    data.register('interest_rates', lambda d: get_interest_rate_expectations(years, generation, max_age),
+                  spinner="Cargando tipos de interés...")
+    data.register('macro_indicators', lambda d: get_macro_indicators(years, generation, max_age),
+                  spinner="Cargando indicadores macroeconómicos...")
+    data.register('market_data', lambda d: get_market_data(years, generation, max_age),
+                  spinner="Cargando datos de mercado...")
+    
+    # Un panel por grupo: cada pestaña solo descarga y versiona las fuentes que usa
+    for group, source in PANEL_SOURCES.items():
+        data.register(f'panel:{group}', lambda d, group=group, source=source: get_macro_panel(
+            group_fingerprint(group, d[source]), {group: d[source]}
+        ))
+        data.register(f'metrics:{group}', lambda d, group=group: get_derived_metrics(
+            d[f'panel:{group}'].version, d[f'panel:{group}']
+        ))
+        data.register(f'version:{group}', lambda d, group=group: d[f'panel:{group}'].version)
+    
+    # Panel conjunto, solo para lo que cruza grupos (reglas de alerta)
+    data.register('panel', lambda d: get_macro_panel(
+        ':'.join(d[f'version:{group}'] for group in PANEL_SOURCES),
+        {group: d[source] for group, source in PANEL_SOURCES.items()}
+    ))
+    
+    # Versiones para la caché de figuras: datos + ajustes de los que depende cada figura
+    use_ml = advanced and settings['use_ml_forecast']
+    data.register('version:rates+macro', lambda d: f"{d['version:rates']}:{d['version:macro']}")
+    data.register('forecast_version', lambda d: f"{d['version:rates']}:{settings['forecast_months']}:{use_ml}")
+    data.register('fan_version', lambda d: (
+        f"{d['forecast_version']}:{settings['mc_paths']}:{settings['mc_method']}:{settings['mc_seed']}"
+    ))
     
-    # Tabs principales
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
-        "🎯 Overview", 
-        "📈 Tipos de Interés", 
-        "🌍 Indicadores Macro",
-        "💹 Mercados",
-        "🔮 Proyecciones"
-    ])
-    
-    # Cargar datos
-    with st.spinner("Cargando datos económicos..."):
+    # Calcular proyecciones (con o sin ML)
+    def _forecast(d):
+        if use_ml:
+            st.info("🤖 Usando Machine Learning para proyecciones...")
+            return ml_forecast_interest_rates(d['interest_rates'], settings['forecast_months'])
+        return forecast_interest_rates(d['interest_rates'], settings['forecast_months'])
+    
+    data.register('forecast_df', _forecast)
+    
+    # Simulación Monte Carlo (None si no hay histórico suficiente)
+    def _rate_distribution(d):
         try:
-            interest_rates = get_interest_rate_expectations()
-            macro_indicators = get_macro_indicators()
-            market_data = get_market_data()
+            return get_rate_distribution(d['interest_rates'], settings['forecast_months'], settings['mc_paths'],
+                                         settings['mc_seed'], settings['mc_method'])
+        except ValueError:
+            return None
+    
+    data.register('rate_distribution', _rate_distribution, spinner="Simulando trayectorias Monte Carlo...")
+    data.register('rate_fan', lambda d: d['rate_distribution'][0] if d['rate_distribution'] else None)
+    
+    # Calcular métricas
+    data.register('yield_slope', lambda d: calculate_yield_curve_slope(d['interest_rates']))
+    data.register('recession_history', lambda d: get_recession_engine(years).update(
+        d['macro_indicators'], d['interest_rates']
+    ))
+    data.register('recession_prob', lambda d: (
+        float(d['recession_history']['probability'].iloc[-1]) if len(d['recession_history']) > 0 else 0.0
+    ))
+    
+    # Escenarios de estrés y replay de episodios históricos
+    data.register('stress_scenarios', lambda d: (
+        generate_stress_scenarios(d['forecast_df'])
+        if settings['enable_stress_test'] else None
+    ))
+    data.register('replay_engine', lambda d: (
+        get_replay_engine(generation, max_age) if settings['enable_stress_test'] else None
+    ), spinner="Cargando histórico de episodios...")
+    
+    # Alertas: reglas sobre el panel y la probabilidad de recesión, evaluadas solo sobre datos nuevos
+    def _alerts(d):
+        if not settings['enable_auto_alerts']:
+            return []
+        history = d['recession_history']
+        extra = {'Probabilidad de recesión': history['probability']} if len(history) > 0 else {}
+        return get_alert_engine().update(d['panel'], extra)
+    
+    data.register('alerts', _alerts)
+    
+    # Regla de Taylor: Fed Funds diario frente a CPI y desempleo mensuales
+    def _taylor_inputs(d):
+        if not settings['show_fed_policy']:
+            return None
+        rates, macro = d['panel:rates'], d['panel:macro']
+        if not (rates.has('rates', 'Fed Funds') and macro.has('macro', 'CPI') and macro.has('macro', 'Unemployment')):
+            return None
+        return taylor_inputs(rates.native('rates', 'Fed Funds'), macro.native('macro', 'CPI'),
+                             macro.native('macro', 'Unemployment'))
+    
+    data.register('taylor_inputs', _taylor_inputs)
+    data.register('taylor_grid', lambda d: (
+        get_taylor_grid(d['version:rates+macro'], d['taylor_inputs'])
+        if d['taylor_inputs'] is not None and len(d['taylor_inputs']) > 0 else None
+    ))
+    
+    # Sentimiento de mercado: histórico diario incremental; el gauge es su última fila
+    data.register('sentiment_history', lambda d: (
+        get_sentiment_engine(years).update(d['market_data'])
+        if settings['show_market_sentiment'] else None
+    ))
+    data.register('market_sentiment', lambda d: (
+        float(d['sentiment_history']['score'].iloc[-1])
+        if d['sentiment_history'] is not None and len(d['sentiment_history']) > 0 else None
+    ))
+    
+    return data
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PESTAÑAS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def render_overview_tab(data: LazyData, settings: Dict):
+    """
+    Pestaña 1: resumen ejecutivo, riesgo de recesión y curva actual
+    """
+    enable_auto_alerts = settings['enable_auto_alerts']
+    show_cycle_analysis = settings['show_cycle_analysis']
+    show_market_sentiment = settings['show_market_sentiment']
+    interest_rates = data['interest_rates']
+    rate_metrics = data['metrics:rates']
+    panel = data['panel:macro']
+    forecast_df = data['forecast_df']
+    yield_slope = data['yield_slope']
+    recession_prob = data['recession_prob']
+    recession_history = data['recession_history']
+    alerts = data['alerts']
+    market_sentiment = data['market_sentiment']
+    
+    st.markdown('<p class="section-header">📊 Resumen Ejecutivo</p>', unsafe_allow_html=True)
+    
+    # KPIs principales
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        if rate_metrics.has('rates', 'Fed Funds'):
+            current_fed = rate_metrics.level('rates', 'Fed Funds')
+            change_fed = rate_metrics.change('rates', 'Fed Funds', 30)
             
-            # Calcular proyecciones (con o sin ML)
-            if ADVANCED_FEATURES_AVAILABLE and use_ml_forecast:
-                st.info("🤖 Usando Machine Learning para proyecciones...")
-                forecast_df = ml_forecast_interest_rates(interest_rates, forecast_months)
-            else:
-                forecast_df = forecast_interest_rates(interest_rates, forecast_months)
+            st.metric(
+                label="Fed Funds Rate",
+                value=f"{current_fed:.2f}%",
+                delta=f"{change_fed:+.2f}%" if change_fed != 0 else "Sin cambio"
+            )
+    
+    with col2:
+        if rate_metrics.has('rates', '10Y Treasury'):
+            current_10y = rate_metrics.level('rates', '10Y Treasury')
+            change_10y = rate_metrics.change('rates', '10Y Treasury', 30)
             
-            # Calcular métricas
-            yield_slope = calculate_yield_curve_slope(interest_rates)
-            recession_prob = calculate_recession_probability(macro_indicators)
+            st.metric(
+                label="10Y Treasury",
+                value=f"{current_10y:.2f}%",
+                delta=f"{change_10y:+.2f}%"
+            )
+    
+    with col3:
+        st.metric(
+            label="Pendiente 10Y-2Y",
+            value=f"{yield_slope:.2f}%",
+            delta="Invertida" if yield_slope < 0 else "Normal",
+            delta_color="inverse"
+        )
+    
+    with col4:
+        inflation = data['metrics:macro'].latest_yoy('CPI')
+        if np.isfinite(inflation):
             
-            # Funciones avanzadas opcionales
-            if ADVANCED_FEATURES_AVAILABLE:
-                if enable_stress_test:
-                    stress_scenarios = generate_stress_scenarios(forecast_df)
-                else:
-                    stress_scenarios = None
-                
-                if enable_auto_alerts:
-                    alerts = generate_economic_alerts(interest_rates, macro_indicators, recession_prob)
-                else:
-                    alerts = []
-                
-                if show_market_sentiment:
-                    market_sentiment = calculate_market_sentiment_score(market_data)
-                else:
-                    market_sentiment = None
-            else:
-                stress_scenarios = None
-                alerts = []
-                market_sentiment = None
-            
-        except Exception as e:
-            st.error(f"Error cargando datos: {e}")
-            st.stop()
-    
-    # ═══════════════════════════════════════════════════════════════════════════
-    # TAB 1: OVERVIEW
-    # ═══════════════════════════════════════════════════════════════════════════
-    with tab1:
-        st.markdown('<p class="section-header">📊 Resumen Ejecutivo</p>', unsafe_allow_html=True)
-        
-        # KPIs principales
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            if not interest_rates.empty and 'Fed Funds' in interest_rates.columns:
-                current_fed = interest_rates['Fed Funds'].iloc[-1]
-                prev_fed = interest_rates['Fed Funds'].iloc[-30] if len(interest_rates) > 30 else current_fed
-                change_fed = current_fed - prev_fed
-                
-                st.metric(
-                    label="Fed Funds Rate",
-                    value=f"{current_fed:.2f}%",
-                    delta=f"{change_fed:+.2f}%" if change_fed != 0 else "Sin cambio"
-                )
-        
-        with col2:
-            if not interest_rates.empty and '10Y Treasury' in interest_rates.columns:
-                current_10y = interest_rates['10Y Treasury'].iloc[-1]
-                prev_10y = interest_rates['10Y Treasury'].iloc[-30] if len(interest_rates) > 30 else current_10y
-                change_10y = current_10y - prev_10y
-                
-                st.metric(
-                    label="10Y Treasury",
-                    value=f"{current_10y:.2f}%",
-                    delta=f"{change_10y:+.2f}%"
-                )
-        
-        with col3:
             st.metric(
-                label="Pendiente 10Y-2Y",
-                value=f"{yield_slope:.2f}%",
-                delta="Invertida" if yield_slope < 0 else "Normal",
-                delta_color="inverse"
+                label="Inflación (CPI YoY)",
+                value=f"{inflation:.1f}%",
+                delta=f"{'Alto' if inflation > 3 else 'Controlado'}"
             )
+    
+    # Gauge de recesión
+    st.markdown('<p class="section-header">⚠️ Análisis de Riesgo de Recesión</p>', unsafe_allow_html=True)
+    
+    col_gauge, col_info = st.columns([1, 1])
+    
+    with col_gauge:
+        fig_gauge = create_recession_probability_gauge(recession_prob)
+        st.plotly_chart(fig_gauge, use_container_width=True)
+    
+    with col_info:
+        st.markdown("### Factores de Riesgo Evaluados")
         
-        with col4:
-            if 'CPI' in macro_indicators and len(macro_indicators['CPI']) > 12:
-                cpi = macro_indicators['CPI']
-                inflation = (cpi.iloc[-1] - cpi.iloc[-12]) / cpi.iloc[-12] * 100
-                
-                st.metric(
-                    label="Inflación (CPI YoY)",
-                    value=f"{inflation:.1f}%",
-                    delta=f"{'Alto' if inflation > 3 else 'Controlado'}"
-                )
-        
-        # Gauge de recesión
-        st.markdown('<p class="section-header">⚠️ Análisis de Riesgo de Recesión</p>', unsafe_allow_html=True)
-        
-        col_gauge, col_info = st.columns([1, 1])
+        if recession_prob < 30:
+            st.markdown('<div class="success-box">✅ <strong>Riesgo Bajo</strong>: La economía muestra señales saludables.</div>', unsafe_allow_html=True)
+        elif recession_prob < 60:
+            st.markdown('<div class="warning-box">⚠️ <strong>Riesgo Moderado</strong>: Algunos indicadores muestran debilidad.</div>', unsafe_allow_html=True)
+        else:
+            st.markdown('<div class="warning-box" style="border-color: #ef4444; background: rgba(239, 68, 68, 0.1)">🔴 <strong>Riesgo Alto</strong>: Múltiples señales de recesión presentes.</div>', unsafe_allow_html=True)
         
-        with col_gauge:
-            fig_gauge = create_recession_probability_gauge(recession_prob)
-            st.plotly_chart(fig_gauge, use_container_width=True)
+        st.markdown("""
+        **Indicadores analizados:**
+        - Curva de rendimientos (inversión 10Y-2Y)
+        - Tasa de desempleo (tendencia)
+        - Producción industrial
+        - Sentimiento del consumidor
+        - Oferta monetaria (M2)
+        - Inflación (CPI)
+        """)
+    
+    if len(recession_history) > 1:
+        fig_recession = create_recession_history_chart(recession_history, version=data['version:rates+macro'])
+        st.plotly_chart(fig_recession, use_container_width=True)
+    
+    # ALERTAS AUTOMÁTICAS (si están habilitadas)
+    if enable_auto_alerts and alerts:
+        st.markdown('<p class="section-header">🚨 Alertas Económicas Automáticas</p>', unsafe_allow_html=True)
         
-        with col_info:
-            st.markdown("### Factores de Riesgo Evaluados")
+        # Abiertas primero (por severidad) y después las cerradas recientemente
+        for alert in alerts:
+            alert_type = alert.get('type', 'info')
+            status = f"desde {alert['opened']}" if alert.get('closed') is None else \
+                f"{alert['opened']} → {alert['closed']}"
             
-            if recession_prob < 30:
-                st.markdown('<div class="success-box">✅ <strong>Riesgo Bajo</strong>: La economía muestra señales saludables.</div>', unsafe_allow_html=True)
-            elif recession_prob < 60:
-                st.markdown('<div class="warning-box">⚠️ <strong>Riesgo Moderado</strong>: Algunos indicadores muestran debilidad.</div>', unsafe_allow_html=True)
+            if alert_type == 'critical':
+                box_style = 'border-color: #ef4444; background: rgba(239, 68, 68, 0.1)'
+            elif alert_type == 'warning':
+                box_style = 'border-color: #f59e0b; background: rgba(245, 158, 11, 0.1)'
             else:
-                st.markdown('<div class="warning-box" style="border-color: #ef4444; background: rgba(239, 68, 68, 0.1)">🔴 <strong>Riesgo Alto</strong>: Múltiples señales de recesión presentes.</div>', unsafe_allow_html=True)
+                box_style = 'border-color: #3b82f6; background: rgba(59, 130, 246, 0.1)'
             
-            st.markdown("""
-            **Indicadores analizados:**
-            - Curva de rendimientos (inversión 10Y-2Y)
-            - Tasa de desempleo (tendencia)
-            - Producción industrial
-            - Sentimiento del consumidor
-            - Oferta monetaria (M2)
-            - Inflación (CPI)
-            """)
-        
-        # ALERTAS AUTOMÁTICAS (si están habilitadas)
-        if ADVANCED_FEATURES_AVAILABLE and enable_auto_alerts and alerts:
-            st.markdown('<p class="section-header">🚨 Alertas Económicas Automáticas</p>', unsafe_allow_html=True)
+            st.markdown(f'''
+            <div style="border-left: 4px solid; {box_style}; padding: 1rem; border-radius: 8px; margin: 0.5rem 0;">
+                <strong>{alert['title']}</strong><br>
+                {alert['message']}<br>
+                <small style="color: rgba(255,255,255,0.6);">💡 {alert['action']} · {status}</small>
+            </div>
+            ''', unsafe_allow_html=True)
+        
+        with st.expander("📜 Historial de alertas"):
+            st.dataframe(get_alert_engine().history(), use_container_width=True, hide_index=True)
+    
+    # ANÁLISIS DE CICLO ECONÓMICO
+    if ADVANCED_FEATURES_AVAILABLE and show_cycle_analysis:
+        if panel.has('macro', 'GDP') and panel.has('macro', 'Unemployment'):
+            cycle_phase = detect_economic_cycle(
+                panel.native('macro', 'GDP'), 
+                panel.native('macro', 'Unemployment')
+            )
+            
+            st.markdown('<p class="section-header">🔄 Fase del Ciclo Económico</p>', unsafe_allow_html=True)
+            st.markdown(f'<div class="info-box"><strong>{cycle_phase}</strong></div>', unsafe_allow_html=True)
+    
+    # SENTIMIENTO DE MERCADO
+    if show_market_sentiment and market_sentiment is not None:
+        st.markdown('<p class="section-header">📊 Score de Sentimiento de Mercado</p>', unsafe_allow_html=True)
+        
+        col_sent1, col_sent2 = st.columns([2, 1])
+        
+        with col_sent1:
+            # Crear gauge de sentimiento
+            fig_sentiment = go.Figure(go.Indicator(
+                mode="gauge+number",
+                value=market_sentiment,
+                domain={'x': [0, 1], 'y': [0, 1]},
+                title={'text': "Sentimiento Agregado", 'font': {'size': 20, 'color': 'white'}},
+                gauge={
+                    'axis': {'range': [None, 100], 'tickwidth': 1, 'tickcolor': "white"},
+                    'bar': {'color': "#3b82f6"},
+                    'bgcolor': "rgba(255,255,255,0.1)",
+                    'steps': [
+                        {'range': [0, 30], 'color': 'rgba(239, 68, 68, 0.3)'},
+                        {'range': [30, 70], 'color': 'rgba(245, 158, 11, 0.3)'},
+                        {'range': [70, 100], 'color': 'rgba(16, 185, 129, 0.3)'}
+                    ],
+                }
+            ))
             
-            for alert in alerts[:5]:  # Mostrar top 5
-                alert_type = alert.get('type', 'info')
+            fig_sentiment.update_layout(
+                height=250,
+                template='plotly_dark',
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font={'color': "white", 'family': "Inter"}
+            )
+            
+            st.plotly_chart(fig_sentiment, use_container_width=True)
+        
+        with col_sent2:
+            st.markdown("### Interpretación")
+            if market_sentiment > 70:
+                st.success("🟢 **Optimista**: Mercados alcistas, apetito por riesgo alto")
+            elif market_sentiment > 50:
+                st.info("🟡 **Neutral-Positivo**: Sentimiento equilibrado con sesgo alcista")
+            elif market_sentiment > 30:
+                st.warning("🟠 **Neutral-Negativo**: Cautela en mercados")
+            else:
+                st.error("🔴 **Pesimista**: Aversión al riesgo, mercados bajistas")
+            
+            latest = data['sentiment_history'].iloc[-1]
+            st.dataframe(pd.DataFrame({
+                'Componente': list(COMPONENT_WEIGHTS),
+                'Score': [latest[name] for name in COMPONENT_WEIGHTS],
+                'Aporte': [latest[f"Δ {name}"] for name in COMPONENT_WEIGHTS],
+            }).style.format({'Score': "{:.0f}", 'Aporte': "{:+.1f}"}, na_rep='—'),
+                use_container_width=True, hide_index=True)
+        
+        fig_sentiment_history = create_sentiment_history_chart(data['sentiment_history'],
+                                                               version=data['version:markets'])
+        st.plotly_chart(fig_sentiment_history, use_container_width=True)
+    
+    # Curva de rendimientos
+    st.markdown('<p class="section-header">📉 Curva de Rendimientos Actual</p>', unsafe_allow_html=True)
+    fig_yield = create_yield_curve_chart(interest_rates, forecast_df, version=data['forecast_version'])
+    st.plotly_chart(fig_yield, use_container_width=True)
+    
+    if yield_slope < 0:
+        st.markdown('<div class="warning-box">⚠️ <strong>Curva Invertida Detectada:</strong> Históricamente, una curva de rendimientos invertida ha precedido a recesiones económicas en Estados Unidos.</div>', unsafe_allow_html=True)
+
+def render_interest_rates_tab(data: LazyData, settings: Dict):
+    """
+    Pestaña 2: análisis detallado de tipos de interés
+    """
+    interest_rates = data['interest_rates']
+    metrics = data['metrics:rates']
+    forecast_df = data['forecast_df']
+    yield_slope = data['yield_slope']
+    
+    st.markdown('<p class="section-header">📈 Análisis Detallado de Tipos de Interés</p>', unsafe_allow_html=True)
+    
+    # Gráfico histórico + proyección
+    fig_rates = create_interest_rate_history_chart(interest_rates, forecast_df, version=data['forecast_version'])
+    st.plotly_chart(fig_rates, use_container_width=True)
+    
+    # Análisis de tendencias
+    st.markdown('<p class="section-header">📊 Tendencias y Expectativas</p>', unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.markdown("### Fed Funds")
+        if metrics.has('rates', 'Fed Funds'):
+            current = metrics.level('rates', 'Fed Funds')
+            change_3m = metrics.pct_change('rates', 'Fed Funds', '3M')
+            change_12m = metrics.pct_change('rates', 'Fed Funds', '12M')
+            
+            st.metric("Tasa actual", f"{current:.2f}%")
+            st.metric("Cambio 3M", f"{change_3m:+.1f}%")
+            st.metric("Cambio 12M", f"{change_12m:+.1f}%")
+            
+            if not forecast_df.empty and 'Fed Funds' in forecast_df.columns:
+                projected = forecast_df['Fed Funds'].iloc[-1]
+                st.metric("Proyección 12M", f"{projected:.2f}%",
+                        delta=f"{projected-current:+.2f}%")
+    
+    with col2:
+        st.markdown("### 10Y Treasury")
+        if metrics.has('rates', '10Y Treasury'):
+            current = metrics.level('rates', '10Y Treasury')
+            change_3m = metrics.pct_change('rates', '10Y Treasury', '3M')
+            change_12m = metrics.pct_change('rates', '10Y Treasury', '12M')
+            
+            st.metric("Rendimiento actual", f"{current:.2f}%")
+            st.metric("Cambio 3M", f"{change_3m:+.1f}%")
+            st.metric("Cambio 12M", f"{change_12m:+.1f}%")
+            
+            if not forecast_df.empty and '10Y Treasury' in forecast_df.columns:
+                projected = forecast_df['10Y Treasury'].iloc[-1]
+                st.metric("Proyección 12M", f"{projected:.2f}%",
+                        delta=f"{projected-current:+.2f}%")
+    
+    with col3:
+        st.markdown("### Spread 10Y-2Y")
+        if not interest_rates.empty:
+            st.metric("Spread actual", f"{yield_slope:.2f}%")
+            
+            spread_status = "🔴 Invertida" if yield_slope < 0 else "🟢 Normal"
+            st.metric("Estado", spread_status)
+            
+            # Histórico del spread
+            if np.isfinite(metrics.spread_mean):
+                st.metric("Spread promedio", f"{metrics.spread_mean:.2f}%")
+    
+    # Tabla de datos
+    st.markdown('<p class="section-header">📋 Datos Completos</p>', unsafe_allow_html=True)
+    
+    if not interest_rates.empty:
+        display_df = interest_rates.tail(20).copy()
+        display_df.index = display_df.index.strftime('%Y-%m-%d')
+        st.dataframe(display_df.style.format("{:.2f}%"), use_container_width=True)
+
+def render_macro_tab(data: LazyData, settings: Dict):
+    """
+    Pestaña 3: indicadores macroeconómicos y postura de la Fed
+    """
+    show_fed_policy = settings['show_fed_policy']
+    macro_indicators = data['macro_indicators']
+    metrics = data['metrics:macro']
+    
+    st.markdown('<p class="section-header">🌍 Indicadores Macroeconómicos Principales</p>', unsafe_allow_html=True)
+    
+    # Gráficos de indicadores
+    fig_macro = create_macro_indicators_chart(macro_indicators, cpi_yoy=metrics.yoy('CPI'),
+                                              version=data['version:macro'])
+    st.plotly_chart(fig_macro, use_container_width=True)
+    
+    # Métricas detalladas
+    st.markdown('<p class="section-header">📊 Métricas Detalladas</p>', unsafe_allow_html=True)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    indicators_to_show = [
+        ('GDP', 'PIB (Trimestral)', col1),
+        ('CPI', 'Inflación (CPI)', col2),
+        ('Unemployment', 'Desempleo', col3),
+        ('Consumer Sentiment', 'Sent. Consumidor', col4)
+    ]
+    
+    for key, label, col in indicators_to_show:
+        if metrics.has('macro', key):
+            with col:
+                current = metrics.level('macro', key)
+                change = metrics.change('macro', key, 1)
+                yoy_change = metrics.latest_yoy(key)
                 
-                if alert_type == 'critical':
-                    box_style = 'border-color: #ef4444; background: rgba(239, 68, 68, 0.1)'
-                elif alert_type == 'warning':
-                    box_style = 'border-color: #f59e0b; background: rgba(245, 158, 11, 0.1)'
+                # Formato especial para CPI (mostrar como % YoY)
+                if key == 'CPI' and np.isfinite(yoy_change):
+                    st.metric(
+                        label=label,
+                        value=f"{yoy_change:.1f}%",
+                        delta=f"{change:.2f} pts"
+                    )
                 else:
-                    box_style = 'border-color: #3b82f6; background: rgba(59, 130, 246, 0.1)'
-                
-                st.markdown(f'''
-                <div style="border-left: 4px solid; {box_style}; padding: 1rem; border-radius: 8px; margin: 0.5rem 0;">
-                    <strong>{alert['title']}</strong><br>
-                    {alert['message']}<br>
-                    <small style="color: rgba(255,255,255,0.6);">💡 {alert['action']}</small>
-                </div>
-                ''', unsafe_allow_html=True)
+                    st.metric(
+                        label=label,
+                        value=f"{current:.2f}",
+                        delta=f"{change:+.2f}"
+                    )
+    
+    # Análisis adicional
+    st.markdown('<p class="section-header">📈 Análisis de Tendencias</p>', unsafe_allow_html=True)
+    
+    analysis_cols = st.columns(2)
+    
+    with analysis_cols[0]:
+        st.markdown("### 🏭 Sector Real")
         
-        # ANÁLISIS DE CICLO ECONÓMICO
-        if ADVANCED_FEATURES_AVAILABLE and show_cycle_analysis:
-            if 'GDP' in macro_indicators and 'Unemployment' in macro_indicators:
-                cycle_phase = detect_economic_cycle(
-                    macro_indicators['GDP'], 
-                    macro_indicators['Unemployment']
-                )
-                
-                st.markdown('<p class="section-header">🔄 Fase del Ciclo Económico</p>', unsafe_allow_html=True)
-                st.markdown(f'<div class="info-box"><strong>{cycle_phase}</strong></div>', unsafe_allow_html=True)
+        ip_change = metrics.latest_yoy('Industrial Production')
+        if np.isfinite(ip_change):
+            if ip_change > 2:
+                st.markdown('<div class="success-box">✅ Producción industrial en expansión (+{:.1f}% YoY)</div>'.format(ip_change), unsafe_allow_html=True)
+            elif ip_change < -2:
+                st.markdown('<div class="warning-box">⚠️ Producción industrial en contracción ({:.1f}% YoY)</div>'.format(ip_change), unsafe_allow_html=True)
+            else:
+                st.markdown('<div class="info-box">ℹ️ Producción industrial estable ({:.1f}% YoY)</div>'.format(ip_change), unsafe_allow_html=True)
+        
+        rs_change = metrics.latest_yoy('Retail Sales')
+        if np.isfinite(rs_change):
+            st.markdown(f"**Ventas minoristas:** {rs_change:+.1f}% YoY")
+    
+    with analysis_cols[1]:
+        st.markdown("### 💼 Mercado Laboral")
         
-        # SENTIMIENTO DE MERCADO
-        if ADVANCED_FEATURES_AVAILABLE and show_market_sentiment and market_sentiment is not None:
-            st.markdown('<p class="section-header">📊 Score de Sentimiento de Mercado</p>', unsafe_allow_html=True)
+        prev_unemp = metrics.lagged('macro', 'Unemployment', '12M')
+        if np.isfinite(prev_unemp):
+            current_unemp = metrics.level('macro', 'Unemployment')
+            unemp_change = current_unemp - prev_unemp
             
-            col_sent1, col_sent2 = st.columns([2, 1])
+            if unemp_change < -0.3:
+                st.markdown('<div class="success-box">✅ Desempleo en descenso ({:.1f}% → {:.1f}%)</div>'.format(prev_unemp, current_unemp), unsafe_allow_html=True)
+            elif unemp_change > 0.5:
+                st.markdown('<div class="warning-box">⚠️ Desempleo en aumento ({:.1f}% → {:.1f}%)</div>'.format(prev_unemp, current_unemp), unsafe_allow_html=True)
+            else:
+                st.markdown('<div class="info-box">ℹ️ Desempleo estable en {:.1f}%</div>'.format(current_unemp), unsafe_allow_html=True)
+    
+    # ANÁLISIS DE POSTURA FED (TAYLOR RULE)
+    if show_fed_policy:
+        st.markdown('<p class="section-header">🏦 Análisis de Política Monetaria Fed</p>', unsafe_allow_html=True)
+        
+        inputs = data['taylor_inputs']
+        grid = data['taylor_grid']
+        if inputs is not None and len(inputs) > 0 and grid is not None:
+            with st.expander("⚙️ Parámetros de la regla"):
+                par_col1, par_col2, par_col3, par_col4 = st.columns(4)
+                with par_col1:
+                    r_star = st.select_slider("Tipo neutral real r* (%)", options=list(R_STAR_GRID),
+                                              value=DEFAULT_PARAMS.r_star)
+                with par_col2:
+                    pi_star = st.select_slider("Objetivo de inflación π* (%)", options=list(PI_STAR_GRID),
+                                               value=DEFAULT_PARAMS.pi_star)
+                with par_col3:
+                    nairu = st.select_slider("NAIRU (%)", options=list(NAIRU_GRID), value=DEFAULT_PARAMS.nairu)
+                with par_col4:
+                    gap_coef = st.select_slider("Coeficiente del gap", options=list(GAP_COEF_GRID),
+                                                value=DEFAULT_PARAMS.gap_coef,
+                                                help="0.5 = Taylor (1993); 1.0 = balanced approach (1999)")
             
-            with col_sent1:
-                # Crear gauge de sentimiento
-                fig_sentiment = go.Figure(go.Indicator(
-                    mode="gauge+number",
-                    value=market_sentiment,
-                    domain={'x': [0, 1], 'y': [0, 1]},
-                    title={'text': "Sentimiento Agregado", 'font': {'size': 20, 'color': 'white'}},
-                    gauge={
-                        'axis': {'range': [None, 100], 'tickwidth': 1, 'tickcolor': "white"},
-                        'bar': {'color': "#3b82f6"},
-                        'bgcolor': "rgba(255,255,255,0.1)",
-                        'steps': [
-                            {'range': [0, 30], 'color': 'rgba(239, 68, 68, 0.3)'},
-                            {'range': [30, 70], 'color': 'rgba(245, 158, 11, 0.3)'},
-                            {'range': [70, 100], 'color': 'rgba(16, 185, 129, 0.3)'}
-                        ],
-                    }
-                ))
-                
-                fig_sentiment.update_layout(
-                    height=250,
-                    template='plotly_dark',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font={'color': "white", 'family': "Inter"}
-                )
+            params = TaylorParams(r_star=r_star, pi_star=pi_star, nairu=nairu, gap_coef=gap_coef)
+            taylor = apply_taylor(inputs, params)
+            fed_analysis = policy_stance(taylor)
+            
+            col_fed1, col_fed2, col_fed3 = st.columns([1, 1, 1])
+            
+            with col_fed1:
+                st.metric("Postura Fed", fed_analysis['stance'])
+                st.caption(fed_analysis['description'])
+            
+            with col_fed2:
+                st.metric("Tasa Actual", f"{fed_analysis['current_rate']:.2f}%")
+                st.metric("Tasa Taylor", f"{fed_analysis['taylor_rate']:.2f}%")
+            
+            with col_fed3:
+                gap = fed_analysis['policy_gap']
+                st.metric("Gap de Política", f"{gap:+.2f}%",
+                        delta="Restrictiva" if gap > 0 else "Acomodaticia")
                 
-                st.plotly_chart(fig_sentiment, use_container_width=True)
+                st.metric("Inflación Actual", f"{fed_analysis['current_inflation']:.1f}%")
             
-            with col_sent2:
-                st.markdown("### Interpretación")
-                if market_sentiment > 70:
-                    st.success("🟢 **Optimista**: Mercados alcistas, apetito por riesgo alto")
-                elif market_sentiment > 50:
-                    st.info("🟡 **Neutral-Positivo**: Sentimiento equilibrado con sesgo alcista")
-                elif market_sentiment > 30:
-                    st.warning("🟠 **Neutral-Negativo**: Cautela en mercados")
-                else:
-                    st.error("🔴 **Pesimista**: Aversión al riesgo, mercados bajistas")
+            fig_taylor = create_taylor_history_chart(taylor, version=f"{data['version:rates+macro']}:{params}")
+            st.plotly_chart(fig_taylor, use_container_width=True)
+            
+            # Sensibilidad: toda la rejilla ya está evaluada, solo se corta el tensor
+            fig_sensitivity = create_taylor_sensitivity_chart(grid, pi_star, gap_coef, r_star, nairu,
+                                                              version=data['version:rates+macro'])
+            st.plotly_chart(fig_sensitivity, use_container_width=True)
+            st.caption(f"{grid.gap[..., 0].size} combinaciones de parámetros · π* = {pi_star}%, "
+                       f"coeficiente del gap = {gap_coef}; ✕ = parámetros elegidos")
+            
+            # Explicación de la Regla de Taylor
+            with st.expander("ℹ️ ¿Qué es la Regla de Taylor?"):
+                st.markdown(f"""
+                **La Regla de Taylor** es una fórmula que sugiere cuál debería ser el tipo de interés de la Fed 
+                basándose en:
+                - Inflación actual vs objetivo ({params.pi_star:g}%)
+                - Desempleo actual vs NAIRU (tasa natural {params.nairu:g}%)
+                - Tasa neutral de interés real ({params.r_star:g}%)
+                
+                **Fórmula:**
+                ```
+                Tasa = {params.r_star:g}% + Inflación + {params.inflation_coef:g}×(Inflación - {params.pi_star:g}%) + {params.gap_coef:g}×(Gap de Output)
+                Gap de Output ≈ {params.okun:g}×(NAIRU - Desempleo)   (ley de Okun)
+                ```
+                
+                **Interpretación del Gap:**
+                - **Gap > +1%**: Fed más restrictiva de lo sugerido → Sesgo anti-inflación fuerte
+                - **Gap entre 0 y +1%**: Política ligeramente restrictiva → Normal en ciclos alcistas
+                - **Gap entre 0 y -1%**: Política ligeramente acomodaticia → Estimulando economía
+                - **Gap < -1%**: Fed muy acomodaticia → Crisis o recesión
+                
+                **Nota:** La Fed no sigue esta regla mecánicamente, pero es una referencia útil. La
+                inflación y el desempleo se toman por fecha de observación, no de publicación.
+                """)
+        else:
+            st.info("Se necesitan Fed Funds, CPI (más de 12 meses) y desempleo para la regla de Taylor")
+
+def render_markets_tab(data: LazyData, settings: Dict):
+    """
+    Pestaña 4: mercados financieros y correlaciones
+    """
+    market_data = data['market_data']
+    panel = data['panel:markets']
+    metrics = data['metrics:markets']
+    
+    st.markdown('<p class="section-header">💹 Panorama de Mercados Financieros</p>', unsafe_allow_html=True)
+    
+    # Overview de mercados
+    fig_markets = create_market_overview_chart(market_data, version=data['version:markets'])
+    st.plotly_chart(fig_markets, use_container_width=True)
+    
+    # Métricas de mercado
+    st.markdown('<p class="section-header">📊 Métricas Clave</p>', unsafe_allow_html=True)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    market_metrics = [
+        ('S&P 500', col1),
+        ('VIX', col2),
+        ('DXY (Dollar Index)', col3),
+        ('Gold', col4)
+    ]
+    
+    for market_name, col in market_metrics:
+        if metrics.has('markets', market_name):
+            with col:
+                current = metrics.level('markets', market_name)
+                change = metrics.pct_change('markets', market_name, 5)
+                
+                st.metric(
+                    label=market_name,
+                    value=f"{current:.2f}",
+                    delta=f"{change:+.2f}%"
+                )
+    
+    # Análisis de correlaciones
+    st.markdown('<p class="section-header">🔗 Análisis de Correlaciones</p>', unsafe_allow_html=True)
+    
+    if len(panel.columns('markets')) >= 2:
+        col_window, col_method = st.columns(2)
+        with col_window:
+            corr_window = st.selectbox(
+                "Ventana móvil (sesiones)",
+                CORRELATION_WINDOWS,
+                index=CORRELATION_WINDOWS.index(90),
+                key="corr_window"
+            )
+        with col_method:
+            corr_method = st.radio(
+                "Método",
+                ["Móvil", f"EWMA (vida media {DEFAULT_HALFLIFE} sesiones)"],
+                horizontal=True,
+                key="corr_method"
+            )
+        method = 'rolling' if corr_method == "Móvil" else 'ewma'
         
-        # Curva de rendimientos
-        st.markdown('<p class="section-header">📉 Curva de Rendimientos Actual</p>', unsafe_allow_html=True)
-        fig_yield = create_yield_curve_chart(interest_rates, forecast_df)
-        st.plotly_chart(fig_yield, use_container_width=True)
+        # Foto del estado incremental de las correlaciones; la matriz de la fecha elegida se calcula bajo demanda
+        correlations = get_correlation_engine(ANALYSIS_PERIODS[settings['analysis_period']], corr_window).update(
+            panel.observed('markets')
+        )
         
-        if yield_slope < 0:
-            st.markdown('<div class="warning-box">⚠️ <strong>Curva Invertida Detectada:</strong> Históricamente, una curva de rendimientos invertida ha precedido a recesiones económicas en Estados Unidos.</div>', unsafe_allow_html=True)
-    
-    # ═══════════════════════════════════════════════════════════════════════════
-    # TAB 2: TIPOS DE INTERÉS
-    # ═══════════════════════════════════════════════════════════════════════════
-    with tab2:
-        st.markdown('<p class="section-header">📈 Análisis Detallado de Tipos de Interés</p>', unsafe_allow_html=True)
+        if len(correlations.index) > 20 and len(correlations.columns) >= 2:
+            dates = [d.strftime('%Y-%m-%d') for d in correlations.index]
+            corr_date = st.select_slider(
+                "Fecha",
+                options=dates,
+                value=dates[-1],
+                key="corr_date"
+            )
+            
+            correlation_matrix = correlations.matrix(corr_date, method)
+            title = (f'Matriz de Correlación ({corr_window} sesiones)' if method == 'rolling'
+                     else f'Matriz de Correlación EWMA (vida media {DEFAULT_HALFLIFE} sesiones)')
+            fig_corr = create_correlation_heatmap(correlation_matrix, f'{title} · {corr_date}',
+                                                  version=data['version:markets'])
+            st.plotly_chart(fig_corr, use_container_width=True)
+
+def render_episode_replay(engine: ReplayEngine, interest_rates: pd.DataFrame,
+                          market_data: Dict[str, pd.DataFrame], forecast_months: int):
+    """
+    Episodios históricos (2008, 2013, 2020, 2022) repetidos desde los niveles actuales
+    """
+    st.markdown("#### ⏪ Replay de Episodios Históricos")
+    
+    current_markets = pd.Series({name: df['Close'].iloc[-1] for name, df in market_data.items()
+                                 if 'Close' in df.columns and len(df) > 0}, dtype=float)
+    replays = engine.replay(EPISODES, interest_rates.iloc[-1], current_markets) if engine else {}
+    if not replays:
+        st.info("No hay histórico suficiente para repetir episodios pasados")
+        return
+    
+    fig_replay = go.Figure()
+    rows = []
+    for name, episode in replays.items():
+        if '10Y Treasury' in episode.rates.columns:
+            fig_replay.add_trace(go.Scatter(
+                x=episode.rates.index, y=episode.rates['10Y Treasury'], mode='lines', name=name,
+                hovertemplate=f'{name}<br>%{{x|%d %b %Y}}: %{{y:.2f}}%<extra></extra>'
+            ))
         
-        # Gráfico histórico + proyección
-        fig_rates = create_interest_rate_history_chart(interest_rates, forecast_df)
-        st.plotly_chart(fig_rates, use_container_width=True)
+        row = {'Episodio': name, 'Período': f"{episode.start:%b %Y} – {episode.end:%b %Y}",
+               'Sesiones': len(episode.rates)}
+        rate_moves = episode.rates - episode.rates.iloc[0]
+        for col in ('Fed Funds', '2Y Treasury', '10Y Treasury'):
+            if col in rate_moves.columns:
+                row[f"Δ {col}"] = rate_moves[col].iloc[-1]
+        if 'S&P 500' in episode.markets.columns:
+            spx = episode.markets['S&P 500'] / episode.markets['S&P 500'].iloc[0] - 1
+            row['S&P 500 final'] = spx.iloc[-1] * 100
+            row['S&P 500 mín'] = spx.min() * 100
+        if 'VIX' in episode.markets.columns:
+            row['VIX máx'] = episode.markets['VIX'].max()
+        rows.append(row)
+    
+    fig_replay.update_layout(
+        title='10Y Treasury - Episodios históricos desde el nivel actual',
+        xaxis_title='Fecha', yaxis_title='Tasa (%)',
+        hovermode='x unified', height=450, template='plotly_white'
+    )
+    st.plotly_chart(fig_replay, use_container_width=True)
+    
+    table = pd.DataFrame(rows).set_index('Episodio')
+    numeric = [col for col in table.columns if col not in ('Período', 'Sesiones')]
+    st.dataframe(table.style.format({col: "{:+.2f}" for col in numeric if col != 'VIX máx'} | {'VIX máx': "{:.1f}"},
+                                    na_rep='—'),
+                 use_container_width=True)
+    
+    with st.expander(f"📚 Todas las ventanas históricas de {forecast_months} meses"):
+        horizon = forecast_months * SESSIONS_PER_MONTH
+        rate_windows = engine.window_distribution(horizon, 'rates')
+        market_windows = engine.window_distribution(horizon, 'markets')
+        if rate_windows.empty:
+            st.info("El histórico es más corto que el horizonte elegido")
+            return
+        st.caption(f"Cambios realizados en cada ventana de {horizon} sesiones desde {engine.first_date:%Y} "
+                   "(tipos en puntos, mercados en %)")
+        for title, windows in (("Tipos", rate_windows), ("Mercados", market_windows)):
+            if not windows.empty:
+                st.markdown(f"**{title}**")
+                st.dataframe(windows.style.format("{:+.2f}", subset=windows.columns[:-1]),
+                             use_container_width=True)
+
+def render_projections_tab(data: LazyData, settings: Dict):
+    """
+    Pestaña 5: proyecciones, escenarios y recomendaciones
+    """
+    forecast_months = settings['forecast_months']
+    enable_stress_test = settings['enable_stress_test']
+    interest_rates = data['interest_rates']
+    forecast_df = data['forecast_df']
+    yield_slope = data['yield_slope']
+    recession_prob = data['recession_prob']
+    stress_scenarios = data['stress_scenarios']
+    rate_fan = data['rate_fan']
+    
+    st.markdown('<p class="section-header">🔮 Proyecciones y Escenarios Futuros</p>', unsafe_allow_html=True)
+    
+    st.markdown('<div class="info-box">ℹ️ <strong>Nota:</strong> Las proyecciones se basan en modelos de tendencia lineal y simulación Monte Carlo y no constituyen asesoramiento financiero. Los resultados reales pueden variar significativamente.</div>', unsafe_allow_html=True)
+    
+    # Proyección de tipos de interés
+    st.markdown("### 📈 Proyección de Tipos de Interés ({} meses)".format(forecast_months))
+    
+    if not forecast_df.empty:
+        # Mostrar tabla de proyecciones
+        projection_table = forecast_df.copy()
+        projection_table.index = projection_table.index.strftime('%Y-%m')
+        st.dataframe(projection_table.style.format("{:.2f}%"), use_container_width=True)
         
-        # Análisis de tendencias
-        st.markdown('<p class="section-header">📊 Tendencias y Expectativas</p>', unsafe_allow_html=True)
+        # Análisis de escenarios
+        st.markdown("### 🎯 Escenarios Proyectados")
         
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.markdown("### Fed Funds")
-            if not interest_rates.empty and 'Fed Funds' in interest_rates.columns:
-                fed_data = interest_rates['Fed Funds'].dropna()
-                if len(fed_data) > 0:
-                    current = fed_data.iloc[-1]
-                    change_3m = calculate_rate_of_change(fed_data, 3)
-                    change_12m = calculate_rate_of_change(fed_data, 12)
-                    
-                    st.metric("Tasa actual", f"{current:.2f}%")
-                    st.metric("Cambio 3M", f"{change_3m:+.1f}%")
-                    st.metric("Cambio 12M", f"{change_12m:+.1f}%")
-                    
-                    if not forecast_df.empty and 'Fed Funds' in forecast_df.columns:
-                        projected = forecast_df['Fed Funds'].iloc[-1]
-                        st.metric("Proyección 12M", f"{projected:.2f}%",
-                                delta=f"{projected-current:+.2f}%")
-        
-        with col2:
-            st.markdown("### 10Y Treasury")
-            if not interest_rates.empty and '10Y Treasury' in interest_rates.columns:
-                t10y_data = interest_rates['10Y Treasury'].dropna()
-                if len(t10y_data) > 0:
-                    current = t10y_data.iloc[-1]
-                    change_3m = calculate_rate_of_change(t10y_data, 3)
-                    change_12m = calculate_rate_of_change(t10y_data, 12)
-                    
-                    st.metric("Rendimiento actual", f"{current:.2f}%")
-                    st.metric("Cambio 3M", f"{change_3m:+.1f}%")
-                    st.metric("Cambio 12M", f"{change_12m:+.1f}%")
-                    
-                    if not forecast_df.empty and '10Y Treasury' in forecast_df.columns:
-                        projected = forecast_df['10Y Treasury'].iloc[-1]
-                        st.metric("Proyección 12M", f"{projected:.2f}%",
-                                delta=f"{projected-current:+.2f}%")
-        
-        with col3:
-            st.markdown("### Spread 10Y-2Y")
-            if not interest_rates.empty:
-                st.metric("Spread actual", f"{yield_slope:.2f}%")
+            st.markdown("#### Escenario Base")
+            if 'Fed Funds' in forecast_df.columns:
+                base_fed = forecast_df['Fed Funds'].iloc[-1]
+                current_fed = interest_rates['Fed Funds'].iloc[-1] if 'Fed Funds' in interest_rates.columns else 0
                 
-                spread_status = "🔴 Invertida" if yield_slope < 0 else "🟢 Normal"
-                st.metric("Estado", spread_status)
+                st.metric("Fed Funds proyectado", f"{base_fed:.2f}%",
+                        delta=f"{base_fed - current_fed:+.2f}%")
                 
-                # Histórico del spread
-                if '10Y Treasury' in interest_rates.columns and '2Y Treasury' in interest_rates.columns:
-                    spread_history = interest_rates['10Y Treasury'] - interest_rates['2Y Treasury']
-                    avg_spread = spread_history.mean()
-                    st.metric("Spread promedio", f"{avg_spread:.2f}%")
-        
-        # Tabla de datos
-        st.markdown('<p class="section-header">📋 Datos Completos</p>', unsafe_allow_html=True)
-        
-        if not interest_rates.empty:
-            display_df = interest_rates.tail(20).copy()
-            display_df.index = display_df.index.strftime('%Y-%m-%d')
-            st.dataframe(display_df.style.format("{:.2f}%"), use_container_width=True)
-    
-    # ═══════════════════════════════════════════════════════════════════════════
-    # TAB 3: INDICADORES MACRO
-    # ═══════════════════════════════════════════════════════════════════════════
-    with tab3:
-        st.markdown('<p class="section-header">🌍 Indicadores Macroeconómicos Principales</p>', unsafe_allow_html=True)
-        
-        # Gráficos de indicadores
-        fig_macro = create_macro_indicators_chart(macro_indicators)
-        st.plotly_chart(fig_macro, use_container_width=True)
+                if base_fed > current_fed:
+                    st.markdown("🔴 Política monetaria restrictiva continuada")
+                elif base_fed < current_fed:
+                    st.markdown("🟢 Inicio de recortes de tipos esperado")
+                else:
+                    st.markdown("🟡 Tipos estables en el horizonte proyectado")
         
-        # Métricas detalladas
-        st.markdown('<p class="section-header">📊 Métricas Detalladas</p>', unsafe_allow_html=True)
+        # Percentiles Monte Carlo de Fed Funds al final del horizonte
+        def _fan_metric(percentile: float, label: str):
+            if rate_fan and percentile in rate_fan and 'Fed Funds' in rate_fan[percentile].columns:
+                value = rate_fan[percentile]['Fed Funds'].iloc[-1]
+                current_fed = interest_rates['Fed Funds'].iloc[-1]
+                st.metric(label, f"{value:.2f}%", delta=f"{value - current_fed:+.2f}%")
         
-        col1, col2, col3, col4 = st.columns(4)
+        with col2:
+            st.markdown("#### Escenario Optimista")
+            _fan_metric(25, "Fed Funds (P25 Monte Carlo)")
+            st.markdown("""
+            - Inflación controlada (< 2.5%)
+            - Crecimiento económico sólido
+            - Recortes de tipos graduales
+            - Mercados alcistas
+            """)
         
-        indicators_to_show = [
-            ('GDP', 'PIB (Trimestral)', col1),
-            ('CPI', 'Inflación (CPI)', col2),
-            ('Unemployment', 'Desempleo', col3),
-            ('Consumer Sentiment', 'Sent. Consumidor', col4)
-        ]
+        with col3:
+            st.markdown("#### Escenario Pesimista")
+            _fan_metric(5, "Fed Funds (P5 Monte Carlo)")
+            st.markdown("""
+            - Recesión económica
+            - Desempleo en aumento
+            - Recortes de emergencia
+            - Volatilidad extrema
+            """)
+    
+    # SIMULACIÓN MONTE CARLO
+    if rate_fan:
+        st.markdown('<p class="section-header">🎲 Simulación Monte Carlo de Tipos</p>', unsafe_allow_html=True)
         
-        for key, label, col in indicators_to_show:
-            if key in macro_indicators:
-                data = macro_indicators[key].dropna()
-                if len(data) > 0:
-                    with col:
-                        current = data.iloc[-1]
-                        prev = data.iloc[-2] if len(data) > 1 else current
-                        change = current - prev
-                        
-                        # Formato especial para CPI (mostrar como % YoY)
-                        if key == 'CPI' and len(data) > 12:
-                            yoy_change = (data.iloc[-1] - data.iloc[-12]) / data.iloc[-12] * 100
-                            st.metric(
-                                label=label,
-                                value=f"{yoy_change:.1f}%",
-                                delta=f"{change:.2f} pts"
-                            )
-                        else:
-                            st.metric(
-                                label=label,
-                                value=f"{current:.2f}",
-                                delta=f"{change:+.2f}"
-                            )
+        st.markdown(f"""
+        **{settings['mc_paths']:,} trayectorias** simuladas con un modelo AR(1) mensual (Vasicek discreto)
+        estimado sobre el histórico, con shocks correlacionados entre plazos. Las bandas muestran
+        los percentiles P{min(rate_fan):g}-P{max(rate_fan):g} y P25-P75 de la distribución.
+        """)
         
-        # Análisis adicional
-        st.markdown('<p class="section-header">📈 Análisis de Tendencias</p>', unsafe_allow_html=True)
+        fig_fan = create_interest_rate_history_chart(interest_rates, forecast_df, rate_fan,
+                                                     version=data['fan_version'])
+        st.plotly_chart(fig_fan, use_container_width=True)
         
-        analysis_cols = st.columns(2)
+        fig_curve_fan = create_yield_curve_chart(interest_rates, forecast_df, rate_fan,
+                                                 version=data['fan_version'])
+        st.plotly_chart(fig_curve_fan, use_container_width=True)
         
-        with analysis_cols[0]:
-            st.markdown("### 🏭 Sector Real")
-            
-            if 'Industrial Production' in macro_indicators:
-                ip = macro_indicators['Industrial Production'].dropna()
-                if len(ip) > 12:
-                    ip_change = calculate_rate_of_change(ip, 12)
-                    
-                    if ip_change > 2:
-                        st.markdown('<div class="success-box">✅ Producción industrial en expansión (+{:.1f}% YoY)</div>'.format(ip_change), unsafe_allow_html=True)
-                    elif ip_change < -2:
-                        st.markdown('<div class="warning-box">⚠️ Producción industrial en contracción ({:.1f}% YoY)</div>'.format(ip_change), unsafe_allow_html=True)
-                    else:
-                        st.markdown('<div class="info-box">ℹ️ Producción industrial estable ({:.1f}% YoY)</div>'.format(ip_change), unsafe_allow_html=True)
-            
-            if 'Retail Sales' in macro_indicators:
-                rs = macro_indicators['Retail Sales'].dropna()
-                if len(rs) > 12:
-                    rs_change = calculate_rate_of_change(rs, 12)
-                    st.markdown(f"**Ventas minoristas:** {rs_change:+.1f}% YoY")
+        # Distribución al final del horizonte
+        _, fan_mean, fan_std = data['rate_distribution']
+        fan_table = pd.DataFrame({f"P{p:g}": band.iloc[-1] for p, band in sorted(rate_fan.items())})
+        fan_table['Media'] = fan_mean.iloc[-1]
+        fan_table['Desv. típica'] = fan_std.iloc[-1]
+        st.markdown(f"#### Distribución a {forecast_months} meses")
+        st.dataframe(fan_table.style.format("{:.2f}%"), use_container_width=True)
+    
+    # STRESS TEST SCENARIOS (si está habilitado)
+    if enable_stress_test and stress_scenarios:
+        st.markdown('<p class="section-header">🎲 Análisis de Escenarios de Estrés</p>', unsafe_allow_html=True)
         
-        with analysis_cols[1]:
-            st.markdown("### 💼 Mercado Laboral")
-            
-            if 'Unemployment' in macro_indicators:
-                unemp = macro_indicators['Unemployment'].dropna()
-                if len(unemp) > 12:
-                    current_unemp = unemp.iloc[-1]
-                    prev_unemp = unemp.iloc[-12]
-                    unemp_change = current_unemp - prev_unemp
-                    
-                    if unemp_change < -0.3:
-                        st.markdown('<div class="success-box">✅ Desempleo en descenso ({:.1f}% → {:.1f}%)</div>'.format(prev_unemp, current_unemp), unsafe_allow_html=True)
-                    elif unemp_change > 0.5:
-                        st.markdown('<div class="warning-box">⚠️ Desempleo en aumento ({:.1f}% → {:.1f}%)</div>'.format(prev_unemp, current_unemp), unsafe_allow_html=True)
-                    else:
-                        st.markdown('<div class="info-box">ℹ️ Desempleo estable en {:.1f}%</div>'.format(current_unemp), unsafe_allow_html=True)
+        st.markdown("""
+        **Escenarios simulados** basados en crisis históricas y condiciones extremas:
+        """)
         
-        # ANÁLISIS DE POSTURA FED (TAYLOR RULE)
-        if ADVANCED_FEATURES_AVAILABLE and show_fed_policy:
-            st.markdown('<p class="section-header">🏦 Análisis de Política Monetaria Fed</p>', unsafe_allow_html=True)
-            
-            if 'Fed Funds' in interest_rates.columns:
-                fed_funds_series = interest_rates['Fed Funds'].dropna()
+        # Crear gráfico comparativo de escenarios
+        fig_stress = go.Figure()
+        
+        for scenario_name, scenario_df in stress_scenarios.items():
+            if '10Y Treasury' in scenario_df.columns:
+                color_map = {
+                    'Base': '#3b82f6',
+                    'Optimista': '#10b981',
+                    'Crisis 2008': '#ef4444',
+                    'Estanflación': '#f59e0b',
+                    'Deflación': '#06b6d4',
+                    'Endurecimiento Fed': '#ec4899'
+                }
                 
-                if 'CPI' in macro_indicators and 'Unemployment' in macro_indicators:
-                    cpi_series = macro_indicators['CPI'].dropna()
-                    unemp_series = macro_indicators['Unemployment'].dropna()
-                    
-                    if len(fed_funds_series) > 0 and len(cpi_series) > 12 and len(unemp_series) > 0:
-                        fed_analysis = analyze_fed_policy_stance(
-                            fed_funds_series,
-                            cpi_series,
-                            unemp_series
-                        )
-                        
-                        col_fed1, col_fed2, col_fed3 = st.columns([1, 1, 1])
-                        
-                        with col_fed1:
-                            st.metric("Postura Fed", fed_analysis['stance'])
-                            st.caption(fed_analysis['description'])
-                        
-                        with col_fed2:
-                            st.metric("Tasa Actual", f"{fed_analysis['current_rate']:.2f}%")
-                            st.metric("Tasa Taylor", f"{fed_analysis['taylor_rate']:.2f}%")
-                        
-                        with col_fed3:
-                            gap = fed_analysis['policy_gap']
-                            st.metric("Gap de Política", f"{gap:+.2f}%",
-                                    delta="Restrictiva" if gap > 0 else "Acomodaticia")
-                            
-                            st.metric("Inflación Actual", f"{fed_analysis['current_inflation']:.1f}%")
-                        
-                        # Explicación de la Regla de Taylor
-                        with st.expander("ℹ️ ¿Qué es la Regla de Taylor?"):
-                            st.markdown("""
-                            **La Regla de Taylor** es una fórmula que sugiere cuál debería ser el tipo de interés de la Fed 
-                            basándose en:
-                            - Inflación actual vs objetivo (2%)
-                            - Desempleo actual vs NAIRU (tasa natural ~4%)
-                            - Tasa neutral de interés real (~2%)
-                            
-                            **Fórmula simplificada:**
-                            ```
-                            Tasa = 2% + Inflación + 0.5×(Inflación - 2%) + 0.5×(Gap de Output)
-                            ```
-                            
-                            **Interpretación del Gap:**
-                            - **Gap > +1%**: Fed más restrictiva de lo sugerido → Sesgo anti-inflación fuerte
-                            - **Gap entre 0 y +1%**: Política ligeramente restrictiva → Normal en ciclos alcistas
-                            - **Gap entre 0 y -1%**: Política ligeramente acomodaticia → Estimulando economía
-                            - **Gap < -1%**: Fed muy acomodaticia → Crisis o recesión
-                            
-                            **Nota:** La Fed no sigue esta regla mecánicamente, pero es una referencia útil.
-                            """)
-    
-    # ═══════════════════════════════════════════════════════════════════════════
-    # TAB 4: MERCADOS
-    # ═══════════════════════════════════════════════════════════════════════════
-    with tab4:
-        st.markdown('<p class="section-header">💹 Panorama de Mercados Financieros</p>', unsafe_allow_html=True)
-        
-        # Overview de mercados
-        fig_markets = create_market_overview_chart(market_data)
-        st.plotly_chart(fig_markets, use_container_width=True)
-        
-        # Métricas de mercado
-        st.markdown('<p class="section-header">📊 Métricas Clave</p>', unsafe_allow_html=True)
-        
-        col1, col2, col3, col4 = st.columns(4)
+                fig_stress.add_trace(go.Scatter(
+                    x=scenario_df.index,
+                    y=scenario_df['10Y Treasury'],
+                    mode='lines',
+                    name=scenario_name,
+                    line=dict(
+                        color=color_map.get(scenario_name, '#8b5cf6'),
+                        width=2 if scenario_name == 'Base' else 1.5,
+                        dash='solid' if scenario_name == 'Base' else 'dash'
+                    )
+                ))
         
-        market_metrics = [
-            ('S&P 500', col1),
-            ('VIX', col2),
-            ('DXY (Dollar Index)', col3),
-            ('Gold', col4)
-        ]
+        fig_stress.update_layout(
+            title='10Y Treasury - Proyección en Múltiples Escenarios',
+            xaxis_title='Fecha',
+            yaxis_title='Rendimiento (%)',
+            template='plotly_dark',
+            hovermode='x unified',
+            height=450,
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=1.02,
+                xanchor="right",
+                x=1
+            )
+        )
         
-        for market_name, col in market_metrics:
-            if market_name in market_data:
-                df = market_data[market_name]
-                if not df.empty and 'Close' in df.columns:
-                    with col:
-                        current = df['Close'].iloc[-1]
-                        prev = df['Close'].iloc[-5] if len(df) > 5 else current
-                        change = (current - prev) / prev * 100
-                        
-                        st.metric(
-                            label=market_name,
-                            value=f"{current:.2f}",
-                            delta=f"{change:+.2f}%"
-                        )
+        st.plotly_chart(fig_stress, use_container_width=True)
         
-        # Análisis de correlaciones
-        st.markdown('<p class="section-header">🔗 Análisis de Correlaciones</p>', unsafe_allow_html=True)
+        # Tabla comparativa de escenarios
+        st.markdown("#### Tabla Comparativa de Escenarios (12 meses)")
         
-        if len(market_data) >= 2:
-            # Construir matriz de correlación
-            corr_data = {}
-            for name, df in market_data.items():
-                if not df.empty and 'Close' in df.columns:
-                    corr_data[name] = df['Close']
+        comparison_data = []
+        for scenario_name, scenario_df in stress_scenarios.items():
+            if len(scenario_df) > 0 and '10Y Treasury' in scenario_df.columns:
+                final_10y = scenario_df['10Y Treasury'].iloc[-1]
+                current_10y = interest_rates['10Y Treasury'].iloc[-1] if '10Y Treasury' in interest_rates.columns else 0
+                change = final_10y - current_10y
+                
+                comparison_data.append({
+                    'Escenario': scenario_name,
+                    '10Y Proyectado': f"{final_10y:.2f}%",
+                    'Cambio vs Actual': f"{change:+.2f}%",
+                    'Impacto': '🔴 Alto' if abs(change) > 2 else '🟡 Moderado' if abs(change) > 1 else '🟢 Bajo'
+                })
+        
+        if comparison_data:
+            st.dataframe(pd.DataFrame(comparison_data), use_container_width=True, hide_index=True)
+        
+        # Rejilla de shocks: todos los escenarios se evalúan en una sola operación
+        with st.expander("🧮 Rejilla de escenarios personalizada"):
+            grid_col1, grid_col2, grid_col3 = st.columns(3)
+            with grid_col1:
+                level_range = st.slider("Nivel (pp)", -4.0, 4.0, (-3.0, 3.0), 0.5)
+            with grid_col2:
+                slope_range = st.slider("Pendiente (pp)", -3.0, 3.0, (-2.0, 2.0), 0.5)
+            with grid_col3:
+                curvature_range = st.slider("Curvatura (pp)", -1.0, 1.0, (0.0, 0.0), 0.25)
+            profiles = st.multiselect("Perfiles temporales", list(PROFILES),
+                                      default=['instant', 'linear', 'revert'])
             
-            if corr_data:
-                corr_df = pd.DataFrame(corr_data).dropna()
+            if profiles:
+                _steps = lambda bounds, step: np.arange(bounds[0], bounds[1] + step / 2, step)
+                grid = apply_scenarios(forecast_df, scenario_grid(
+                    _steps(level_range, 0.5), _steps(slope_range, 0.5), _steps(curvature_range, 0.25), profiles
+                ))
+                grid_table = grid.table(interest_rates.iloc[-1])
+                shown = ['Nivel', 'Pendiente', 'Curvatura', 'Perfil'] + [
+                    col for col in grid_table.columns
+                    if col.startswith(('Δ', 'Máx')) and ('2Y' in col or '10Y' in col)
+                ]
+                sort_by = 'Máx |Δ| 10Y Treasury' if 'Máx |Δ| 10Y Treasury' in grid_table.columns else shown[-1]
                 
-                if len(corr_df) > 20:
-                    # Calcular correlación
-                    correlation_matrix = corr_df.corr()
-                    
-                    # Crear heatmap
-                    fig_corr = go.Figure(data=go.Heatmap(
-                        z=correlation_matrix.values,
-                        x=correlation_matrix.columns,
-                        y=correlation_matrix.columns,
-                        colorscale='RdBu',
-                        zmid=0,
-                        text=correlation_matrix.values,
-                        texttemplate='%{text:.2f}',
-                        textfont={"size": 10},
-                        colorbar=dict(title="Correlación")
-                    ))
-                    
-                    fig_corr.update_layout(
-                        title='Matriz de Correlación (90 días)',
-                        template='plotly_dark',
-                        height=500,
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)'
-                    )
-                    
-                    st.plotly_chart(fig_corr, use_container_width=True)
-    
-    # ═══════════════════════════════════════════════════════════════════════════
-    # TAB 5: PROYECCIONES
-    # ═══════════════════════════════════════════════════════════════════════════
-    with tab5:
-        st.markdown('<p class="section-header">🔮 Proyecciones y Escenarios Futuros</p>', unsafe_allow_html=True)
-        
-        st.markdown('<div class="info-box">ℹ️ <strong>Nota:</strong> Las proyecciones se basan en modelos de tendencia lineal y no constituyen asesoramiento financiero. Los resultados reales pueden variar significativamente.</div>', unsafe_allow_html=True)
+                st.caption(f"{len(grid.specs)} escenarios · ordenados por el mayor desvío del 10Y")
+                st.dataframe(
+                    grid_table[shown].sort_values(sort_by, ascending=False)
+                    .style.format({col: "{:+.2f}" for col in shown[4:]}),
+                    use_container_width=True, height=400
+                )
+            else:
+                st.info("Elige al menos un perfil temporal")
         
-        # Proyección de tipos de interés
-        st.markdown("### 📈 Proyección de Tipos de Interés ({} meses)".format(forecast_months))
+        render_episode_replay(data['replay_engine'], interest_rates, data['market_data'], forecast_months)
+    
+    # Recomendaciones estratégicas
+    st.markdown('<p class="section-header">💡 Recomendaciones Estratégicas</p>', unsafe_allow_html=True)
+    
+    rec_col1, rec_col2 = st.columns(2)
+    
+    with rec_col1:
+        st.markdown("### 🎯 Renta Fija")
         
-        if not forecast_df.empty:
-            # Mostrar tabla de proyecciones
-            projection_table = forecast_df.copy()
-            projection_table.index = projection_table.index.strftime('%Y-%m')
-            st.dataframe(projection_table.style.format("{:.2f}%"), use_container_width=True)
-            
-            # Análisis de escenarios
-            st.markdown("### 🎯 Escenarios Proyectados")
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.markdown("#### Escenario Base")
-                if 'Fed Funds' in forecast_df.columns:
-                    base_fed = forecast_df['Fed Funds'].iloc[-1]
-                    current_fed = interest_rates['Fed Funds'].iloc[-1] if 'Fed Funds' in interest_rates.columns else 0
-                    
-                    st.metric("Fed Funds proyectado", f"{base_fed:.2f}%",
-                            delta=f"{base_fed - current_fed:+.2f}%")
-                    
-                    if base_fed > current_fed:
-                        st.markdown("🔴 Política monetaria restrictiva continuada")
-                    elif base_fed < current_fed:
-                        st.markdown("🟢 Inicio de recortes de tipos esperado")
-                    else:
-                        st.markdown("🟡 Tipos estables en el horizonte proyectado")
-            
-            with col2:
-                st.markdown("#### Escenario Optimista")
-                st.markdown("""
-                - Inflación controlada (< 2.5%)
-                - Crecimiento económico sólido
-                - Recortes de tipos graduales
-                - Mercados alcistas
-                """)
-            
-            with col3:
-                st.markdown("#### Escenario Pesimista")
-                st.markdown("""
-                - Recesión económica
-                - Desempleo en aumento
-                - Recortes de emergencia
-                - Volatilidad extrema
-                """)
+        if yield_slope < 0:
+            st.markdown("""
+            - ⚠️ Curva invertida: precaución con bonos largos
+            - Considerar posiciones en corto plazo
+            - Diversificar con bonos corporativos de grado de inversión
+            - Monitorear señales de recesión
+            """)
+        else:
+            st.markdown("""
+            - ✅ Curva normal: oportunidades en toda la curva
+            - Balance entre corto y largo plazo
+            - Evaluar duration según expectativas de tipos
+            """)
+    
+    with rec_col2:
+        st.markdown("### 📊 Renta Variable")
         
-        # STRESS TEST SCENARIOS (si está habilitado)
-        if ADVANCED_FEATURES_AVAILABLE and enable_stress_test and stress_scenarios:
-            st.markdown('<p class="section-header">🎲 Análisis de Escenarios de Estrés</p>', unsafe_allow_html=True)
-            
+        if recession_prob > 60:
             st.markdown("""
-            **Escenarios simulados** basados en crisis históricas y condiciones extremas:
+            - ⚠️ Alto riesgo de recesión
+            - Posiciones defensivas (utilities, consumer staples)
+            - Incrementar efectivo
+            - Reducir exposición cíclica
             """)
-            
-            # Crear gráfico comparativo de escenarios
-            fig_stress = go.Figure()
-            
-            for scenario_name, scenario_df in stress_scenarios.items():
-                if '10Y Treasury' in scenario_df.columns:
-                    color_map = {
-                        'Base': '#3b82f6',
-                        'Optimista': '#10b981',
-                        'Crisis 2008': '#ef4444',
-                        'Estanflación': '#f59e0b',
-                        'Deflación': '#06b6d4'
-                    }
-                    
-                    fig_stress.add_trace(go.Scatter(
-                        x=scenario_df.index,
-                        y=scenario_df['10Y Treasury'],
-                        mode='lines',
-                        name=scenario_name,
-                        line=dict(
-                            color=color_map.get(scenario_name, '#8b5cf6'),
-                            width=2 if scenario_name == 'Base' else 1.5,
-                            dash='solid' if scenario_name == 'Base' else 'dash'
-                        )
-                    ))
-            
-            fig_stress.update_layout(
-                title='10Y Treasury - Proyección en Múltiples Escenarios',
-                xaxis_title='Fecha',
-                yaxis_title='Rendimiento (%)',
-                template='plotly_dark',
-                hovermode='x unified',
-                height=450,
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=1.02,
-                    xanchor="right",
-                    x=1
-                )
-            )
-            
-            st.plotly_chart(fig_stress, use_container_width=True)
-            
-            # Tabla comparativa de escenarios
-            st.markdown("#### Tabla Comparativa de Escenarios (12 meses)")
-            
-            comparison_data = []
-            for scenario_name, scenario_df in stress_scenarios.items():
-                if len(scenario_df) > 0 and '10Y Treasury' in scenario_df.columns:
-                    final_10y = scenario_df['10Y Treasury'].iloc[-1]
-                    current_10y = interest_rates['10Y Treasury'].iloc[-1] if '10Y Treasury' in interest_rates.columns else 0
-                    change = final_10y - current_10y
-                    
-                    comparison_data.append({
-                        'Escenario': scenario_name,
-                        '10Y Proyectado': f"{final_10y:.2f}%",
-                        'Cambio vs Actual': f"{change:+.2f}%",
-                        'Impacto': '🔴 Alto' if abs(change) > 2 else '🟡 Moderado' if abs(change) > 1 else '🟢 Bajo'
-                    })
-            
-            if comparison_data:
-                st.dataframe(pd.DataFrame(comparison_data), use_container_width=True, hide_index=True)
+        elif recession_prob > 30:
+            st.markdown("""
+            - 🟡 Riesgo moderado
+            - Equilibrio entre crecimiento y defensivos
+            - Diversificación sectorial
+            - Monitorear indicadores adelantados
+            """)
+        else:
+            st.markdown("""
+            - ✅ Entorno favorable
+            - Sesgo hacia growth y tecnología
+            - Aprovechar oportunidades cíclicas
+            """)
+    
+    # Calendario de eventos clave
+    st.markdown('<p class="section-header">📅 Próximos Eventos Clave</p>', unsafe_allow_html=True)
+    
+    st.markdown("""
+    | Fecha | Evento | Importancia |
+    |-------|--------|-------------|
+    | Próximo miércoles | Decisión FOMC | 🔴 Alta |
+    | 1er viernes del mes | Nóminas no agrícolas (NFP) | 🔴 Alta |
+    | Mes siguiente | Reporte CPI | 🟡 Media-Alta |
+    | Trimestral | PIB preliminar | 🟡 Media |
+    
+    **Nota:** Las fechas exactas varían. Consultar calendario económico oficial.
+    """)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# INTERFAZ PRINCIPAL
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def main():
+    init_fred_client()
+    start_refresh_worker()
+    
+    # Header
+    st.markdown("""
+    <div class="main-header">
+        <h1 class="main-title">📊 MACRO ECONOMIC DASHBOARD PRO</h1>
+        <p class="main-subtitle">
+            Análisis completo de tendencias macroeconómicas, tipos de interés y proyecciones futuras
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Sidebar
+    with st.sidebar:
+        st.image("https://img.icons8.com/fluency/96/000000/stocks-growth.png", width=80)
+        st.title("⚙️ Configuración")
         
-        # Recomendaciones estratégicas
-        st.markdown('<p class="section-header">💡 Recomendaciones Estratégicas</p>', unsafe_allow_html=True)
+        # Toggle funciones avanzadas
+        if ADVANCED_FEATURES_AVAILABLE:
+            st.markdown("### 🚀 Funciones Avanzadas")
+            use_ml_forecast = st.checkbox("Usar ML para proyecciones", value=False, 
+                help="Usa Random Forest en vez de regresión lineal")
+            show_cycle_analysis = st.checkbox("Análisis de ciclo económico", value=True)
+            st.markdown("---")
+        else:
+            use_ml_forecast = False
+            show_cycle_analysis = False
+            st.info("💡 Instala advanced_functions para más características")
         
-        rec_col1, rec_col2 = st.columns(2)
+        enable_auto_alerts = st.checkbox("Alertas automáticas", value=True,
+            help="Umbrales, cruces, z-scores y rachas sobre el panel; solo se evalúan las observaciones nuevas")
+        show_market_sentiment = st.checkbox("Score de sentimiento", value=True,
+            help="VIX, tendencia del S&P 500, dólar, oro y amplitud; histórico diario con el aporte de cada componente")
+        show_fed_policy = st.checkbox("Análisis postura Fed (Taylor)", value=True,
+            help="Tipo de Taylor y gap para cada fecha, con rejilla de sensibilidad a r*, π*, NAIRU y coeficiente")
         
-        with rec_col1:
-            st.markdown("### 🎯 Renta Fija")
-            
-            if yield_slope < 0:
-                st.markdown("""
-                - ⚠️ Curva invertida: precaución con bonos largos
-                - Considerar posiciones en corto plazo
-                - Diversificar con bonos corporativos de grado de inversión
-                - Monitorear señales de recesión
-                """)
-            else:
-                st.markdown("""
-                - ✅ Curva normal: oportunidades en toda la curva
-                - Balance entre corto y largo plazo
-                - Evaluar duration según expectativas de tipos
-                """)
+        analysis_period = st.selectbox(
+            "Período de análisis",
+            list(ANALYSIS_PERIODS),
+            index=2
+        )
         
-        with rec_col2:
-            st.markdown("### 📊 Renta Variable")
-            
-            if recession_prob > 60:
-                st.markdown("""
-                - ⚠️ Alto riesgo de recesión
-                - Posiciones defensivas (utilities, consumer staples)
-                - Incrementar efectivo
-                - Reducir exposición cíclica
-                """)
-            elif recession_prob > 30:
-                st.markdown("""
-                - 🟡 Riesgo moderado
-                - Equilibrio entre crecimiento y defensivos
-                - Diversificación sectorial
-                - Monitorear indicadores adelantados
-                """)
-            else:
-                st.markdown("""
-                - ✅ Entorno favorable
-                - Sesgo hacia growth y tecnología
-                - Aprovechar oportunidades cíclicas
-                """)
+        forecast_months = st.slider(
+            "Meses de proyección",
+            min_value=3,
+            max_value=24,
+            value=12,
+            step=3
+        )
         
-        # Calendario de eventos clave
-        st.markdown('<p class="section-header">📅 Próximos Eventos Clave</p>', unsafe_allow_html=True)
+        st.markdown("### 🎲 Monte Carlo")
+        mc_paths = st.select_slider(
+            "Trayectorias simuladas",
+            options=[10_000, 25_000, 50_000, 100_000, 250_000, 500_000],
+            value=50_000
+        )
+        mc_method = st.selectbox(
+            "Modelo de shocks",
+            list(MC_METHODS),
+            help="Normal con la covarianza histórica o remuestreo de residuos históricos"
+        )
+        mc_seed = st.number_input("Semilla", min_value=0, value=42, step=1,
+            help="Misma semilla = mismas trayectorias")
+        enable_stress_test = st.checkbox("Escenarios de estrés", value=False,
+            help="Shocks de nivel, pendiente y curvatura sobre la proyección")
         
+        st.markdown("---")
+        st.markdown("### 📡 Fuentes de datos")
         st.markdown("""
-        | Fecha | Evento | Importancia |
-        |-------|--------|-------------|
-        | Próximo miércoles | Decisión FOMC | 🔴 Alta |
-        | 1er viernes del mes | Nóminas no agrícolas (NFP) | 🔴 Alta |
-        | Mes siguiente | Reporte CPI | 🟡 Media-Alta |
-        | Trimestral | PIB preliminar | 🟡 Media |
+        - **FRED**: Federal Reserve Economic Data
+        - **Yahoo Finance**: Datos de mercado
+        - **Treasury.gov**: Bonos del tesoro
+        """)
         
-        **Nota:** Las fechas exactas varían. Consultar calendario económico oficial.
+        st.markdown("---")
+        st.markdown("### ℹ️ Nota importante")
+        st.info("""
+        Para usar este dashboard necesitas:
+        1. API key de FRED (gratuita) en `FRED_API_KEY`
+        2. Conexión a internet
+        3. Instalar dependencias
         """)
+        
+        if st.button("🔄 Actualizar datos", use_container_width=True):
+            # El almacén local conserva el histórico: solo se descargan observaciones nuevas
+            get_default_store().mark_stale()
+            st.cache_data.clear()
+            clear_figure_cache()
+            st.rerun()
+        
+        store = get_default_store()
+        if store.refresher_alive():
+            st.caption(f"🟢 Refresco en segundo plano activo · generación {store.generation()}")
+    
+    settings = {
+        'use_ml_forecast': use_ml_forecast,
+        'show_cycle_analysis': show_cycle_analysis,
+        'show_fed_policy': show_fed_policy,
+        'enable_stress_test': enable_stress_test,
+        'enable_auto_alerts': enable_auto_alerts,
+        'show_market_sentiment': show_market_sentiment,
+        'analysis_period': analysis_period,
+        'forecast_months': forecast_months,
+        'mc_paths': mc_paths,
+        'mc_method': MC_METHODS[mc_method],
+        'mc_seed': int(mc_seed)
+    }
+    
+    # Los datos se cargan bajo demanda: cada pestaña resuelve solo lo que necesita
+    data = build_data_loader(settings)
+    
+    # Tabs principales (solo se ejecuta la pestaña abierta)
+    tab_renderers = [
+        ("🎯 Overview", render_overview_tab),
+        ("📈 Tipos de Interés", render_interest_rates_tab),
+        ("🌍 Indicadores Macro", render_macro_tab),
+        ("💹 Mercados", render_markets_tab),
+        ("🔮 Proyecciones", render_projections_tab)
+    ]
+    
+    try:
+        tabs = st.tabs([name for name, _ in tab_renderers], key="main_tab", on_change="rerun")
+    except TypeError:
+        # Streamlit sin pestañas perezosas: se ejecutan todas
+        tabs = st.tabs([name for name, _ in tab_renderers])
+    
+    for tab, (_, render) in zip(tabs, tab_renderers):
+        if getattr(tab, 'open', None) is False:
+            continue
+        
+        with tab:
+            try:
+                render(data, settings)
+            except Exception as e:
+                st.error(f"Error cargando datos: {e}")
     
     # Footer
     st.markdown("---")
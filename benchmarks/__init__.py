@@ -0,0 +1,6 @@
+"""
+BENCHMARKS
+Tiempos y memoria pico de las rutas críticas (lectura del almacén, cálculo y
+construcción de gráficos) sobre datos grabados o sintéticos, sin red:
+    python -m benchmarks [--fixtures synthetic|recorded] [--save-baseline]
+"""
@@ -0,0 +1,345 @@
+"""
+EJECUCIÓN DE BENCHMARKS
+Cada etapa se mide por escala (años de historia × nº de tickers): mejor
+tiempo y mediana de varias repeticiones, y memoria pico con tracemalloc en
+una pasada aparte. Los resultados se comparan con una línea base guardada.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from alerts import DEFAULT_RULES, AlertEngine, AlertRule
+from analytics import calculate_recession_probability_history, calculate_yield_curve_slope, forecast_interest_rates
+from benchmarks.fixtures import Fixture, recorded_fixture, record_fixtures, synthetic_fixture
+from correlation import CorrelationEngine
+from data_fetch import load_fred_series, load_market_batch
+from derived_metrics import DerivedMetrics
+from macro_panel import build_panel, group_series, panel_from_sources
+from montecarlo import simulate_rate_distribution
+from sentiment import closes_frame, sentiment_history
+from series_catalog import MACRO_SERIES, RATE_SERIES
+from series_store import NEVER_STALE, SeriesStore
+
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+
+# Escalas (años de historia, nº de tickers): historia de 5 a 50 años, mercados de 7 a 500 tickers
+SCALES = [(5, 7), (10, 7), (25, 7), (50, 7), (10, 50), (10, 200), (10, 500)]
+QUICK_SCALES = [(5, 7), (10, 50)]
+
+# Tolerancia antes de marcar una regresión (fracción sobre la línea base)
+DEFAULT_TOLERANCE = 0.25
+
+# Trayectorias de la etapa Monte Carlo (en un solo proceso, para tiempos estables)
+BENCH_MC_PATHS = 20_000
+
+# Memoria pico máxima de una etapa; por encima la etapa cuenta como fallo
+DEFAULT_MEMORY_BUDGET_MB = 2048
+
+# Umbrales por columna de la etapa de alertas (además de las reglas por defecto)
+BENCH_ALERT_LEVELS = 10
+
+
+@dataclass
+class StageResult:
+    stage: str
+    scale: str
+    best_ms: float
+    median_ms: float
+    peak_mb: float
+    repeats: int
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ETAPAS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class Workload:
+    """
+    Entradas de cada etapa, calculadas una vez por escala a partir del almacén
+    """
+
+    def __init__(self, fixture: Fixture):
+        self.fixture = fixture
+        self.start_date = fixture.start_date
+        self.load_rates()
+        self.load_macro()
+        self.load_markets()
+        self.panel = panel_from_sources(self.interest_rates, self.macro_indicators, self.market_data)
+        self.forecast = forecast_interest_rates(self.interest_rates)
+        self.recession_history = calculate_recession_probability_history(self.macro_indicators, self.interest_rates)
+
+        # Misma entrada que la pestaña de mercados: panel del grupo y matriz del motor incremental
+        self.market_panel = build_panel({'markets': group_series('markets', self.market_data)})
+        self.correlation = CorrelationEngine().update(self.market_panel.observed('markets')).matrix()
+
+        # Cientos de reglas: umbral, cruce, racha y z-score de cada tipo y de los primeros tickers
+        columns = [('rates', name) for name in self.panel.columns('rates')]
+        columns += [('markets', name) for name in self.panel.columns('markets')[:BENCH_ALERT_LEVELS]]
+        rules = [
+            AlertRule(f"{group}:{name}:{kind}:{i}", group, name, kind=kind, level=level,
+                      transform='pct' if group == 'markets' else 'diff')
+            for group, name in columns
+            for kind in ('threshold', 'cross', 'streak', 'zscore')
+            for i, level in enumerate(np.linspace(-2, 2, BENCH_ALERT_LEVELS))
+        ]
+        self.alert_engine = AlertEngine(DEFAULT_RULES + rules, store=SeriesStore(tempfile.mkdtemp()))
+
+    # ── Lectura del almacén (la ruta de "descarga" sin red) ─────────────────
+
+    def _fred(self, series: Dict[str, str]) -> Dict[str, pd.Series]:
+        fixture = self.fixture
+        return {
+            name: load_fred_series(key, self.start_date, store=fixture.store, max_age=NEVER_STALE,
+                                   stale_while_revalidate=False)
+            for name, key in series.items() if key in fixture.fred_series.values()
+        }
+
+    def load_rates(self) -> None:
+        self.interest_rates = pd.DataFrame(self._fred(RATE_SERIES)).dropna()
+
+    def load_macro(self) -> None:
+        self.macro_indicators = self._fred(MACRO_SERIES)
+
+    def load_markets(self) -> None:
+        data, errors = load_market_batch(self.fixture.tickers, self.start_date, store=self.fixture.store,
+                                         max_age=NEVER_STALE, stale_while_revalidate=False)
+        self.market_data = {name: df for name, df in data.items() if name not in errors}
+
+    # ── Cálculo ─────────────────────────────────────────────────────────────
+
+    def build_panel(self):
+        return panel_from_sources(self.interest_rates, self.macro_indicators, self.market_data)
+
+    def derived_metrics(self):
+        return DerivedMetrics(self.panel)
+
+    def forecast_rates(self):
+        return forecast_interest_rates(self.interest_rates, 12)
+
+    def yield_slope(self):
+        return calculate_yield_curve_slope(self.interest_rates)
+
+    def recession(self):
+        return calculate_recession_probability_history(self.macro_indicators, self.interest_rates)
+
+    def correlations(self):
+        return CorrelationEngine().update(self.market_panel.observed('markets'))
+
+    def alerts(self):
+        # Estado vacío: evaluación de todo el histórico (el peor caso)
+        self.alert_engine.reset()
+        return self.alert_engine.update(self.panel, {'Probabilidad de recesión': self.recession_history['probability']})
+
+    def sentiment(self):
+        return sentiment_history(closes_frame(self.market_data))
+
+    def monte_carlo(self):
+        return simulate_rate_distribution(self.interest_rates, 12, BENCH_MC_PATHS, 42, 'gaussian', n_workers=1)
+
+    def stages(self) -> Dict[str, Callable[[], object]]:
+        stages = {
+            'store.rates': self.load_rates,
+            'store.macro': self.load_macro,
+            'store.markets': self.load_markets,
+            'compute.panel': self.build_panel,
+            'compute.metrics': self.derived_metrics,
+            'compute.forecast': self.forecast_rates,
+            'compute.yield_slope': self.yield_slope,
+            'compute.recession': self.recession,
+            'compute.correlation': self.correlations,
+            'compute.alerts': self.alerts,
+            'compute.sentiment': self.sentiment,
+            'compute.montecarlo': self.monte_carlo,
+        }
+        stages.update(self.render_stages())
+        return stages
+
+    # ── Gráficos ────────────────────────────────────────────────────────────
+
+    def render_stages(self) -> Dict[str, Callable[[], object]]:
+        """
+        Constructores create_*_chart de app.py, sin la caché de figuras (sin `version`)
+
+        Importar app.py ejecuta su configuración de página; fuera de `streamlit run`
+        Streamlit lo ignora. Si no se puede importar, las etapas se omiten.
+        """
+        try:
+            import app
+        except Exception as e:
+            logger.warning("Etapas de gráficos omitidas: %s", e)
+            return {}
+
+        cpi = self.macro_indicators.get('CPI')
+        return {
+            'render.yield_curve': lambda: app.create_yield_curve_chart(self.interest_rates, self.forecast),
+            'render.rate_history': lambda: app.create_interest_rate_history_chart(self.interest_rates, self.forecast),
+            'render.macro': lambda: app.create_macro_indicators_chart(
+                self.macro_indicators, app.yoy_series(cpi.dropna()) if cpi is not None else None),
+            'render.markets': lambda: app.create_market_overview_chart(self.market_data),
+            'render.recession': lambda: app.create_recession_history_chart(self.recession_history),
+            'render.correlation': lambda: app.create_correlation_heatmap(self.correlation, "Correlación"),
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# MEDICIÓN
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def measure(func: Callable[[], object], repeats: int = 5, warmup: int = 1) -> Tuple[List[float], float]:
+    """
+    (tiempos en ms de cada repetición, memoria pico en MB de una pasada con tracemalloc)
+    """
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeats):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return timings, peak / 2**20
+
+
+def run_benchmarks(scales: List[Tuple[int, int]], fixtures: str = 'synthetic', repeats: int = 5,
+                   only: Optional[List[str]] = None) -> List[StageResult]:
+    results = []
+    for years, n_tickers in scales:
+        with tempfile.TemporaryDirectory() as root:
+            if fixtures == 'recorded':
+                fixture = recorded_fixture(years)
+            else:
+                fixture = synthetic_fixture(Path(root), years, n_tickers)
+            workload = Workload(fixture)
+
+            for stage, func in workload.stages().items():
+                if only and not any(stage.startswith(prefix) for prefix in only):
+                    continue
+                timings, peak = measure(func, repeats)
+                result = StageResult(stage, fixture.label, round(min(timings), 3),
+                                     round(statistics.median(timings), 3), round(peak, 3), repeats)
+                results.append(result)
+                logger.info("%-22s %-22s %9.2f ms (mediana %9.2f)  pico %8.2f MB",
+                            stage, fixture.label, result.best_ms, result.median_ms, result.peak_mb)
+        if fixtures == 'recorded':
+            break
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LÍNEA BASE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def save_baseline(results: List[StageResult], path: Path = BASELINE_PATH) -> None:
+    payload = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'results': [asdict(result) for result in results],
+    }
+    path.write_text(json.dumps(payload, indent=2))
+
+
+def compare_baseline(results: List[StageResult], path: Path = BASELINE_PATH,
+                     tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Regresiones frente a la línea base: mejor tiempo o memoria pico por encima de la tolerancia
+    """
+    baseline = {(r['stage'], r['scale']): r for r in json.loads(path.read_text())['results']}
+    regressions = []
+    for result in results:
+        reference = baseline.get((result.stage, result.scale))
+        if reference is None:
+            continue
+        for metric, unit in (('best_ms', 'ms'), ('peak_mb', 'MB')):
+            before, after = reference[metric], getattr(result, metric)
+            if before > 0 and after > before * (1 + tolerance):
+                regressions.append(f"{result.stage} [{result.scale}] {metric}: "
+                                   f"{before:.2f} → {after:.2f} {unit} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def over_budget(results: List[StageResult], memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB) -> List[str]:
+    """
+    Etapas cuya memoria pico supera el presupuesto (fallos, haya o no línea base)
+    """
+    return [f"{result.stage} [{result.scale}] peak_mb: {result.peak_mb:.2f} MB > {memory_budget_mb:.0f} MB"
+            for result in results if result.peak_mb > memory_budget_mb]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Benchmarks de descarga, cálculo y gráficos")
+    parser.add_argument('command', nargs='?', choices=('run', 'record'), default='run',
+                        help="run: medir; record: grabar el almacén local como datos de prueba")
+    parser.add_argument('--fixtures', choices=('synthetic', 'recorded'), default='synthetic')
+    parser.add_argument('--quick', action='store_true', help="solo las escalas pequeñas")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--stage', action='append', help="prefijo de etapa (p. ej. compute., render.markets)")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="guarda los resultados como nueva línea base")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--memory-budget', type=float, default=DEFAULT_MEMORY_BUDGET_MB,
+                        help="memoria pico (MB) por encima de la cual una etapa cuenta como fallo")
+    parser.add_argument('--output', type=Path, help="escribe los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    if args.command == 'record':
+        copied = record_fixtures()
+        logger.info("Grabados %d ficheros", len(copied))
+        return 0
+
+    results = run_benchmarks(QUICK_SCALES if args.quick else SCALES, args.fixtures, args.repeats, args.stage)
+    if args.output:
+        args.output.write_text(json.dumps([asdict(result) for result in results], indent=2))
+
+    failures = over_budget(results, args.memory_budget)
+    for line in failures:
+        logger.warning("SOBRE PRESUPUESTO %s", line)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        logger.info("Línea base guardada en %s", args.baseline)
+        return 1 if failures else 0
+
+    if not args.baseline.exists():
+        logger.info("Sin línea base en %s (usa --save-baseline)", args.baseline)
+        return 1 if failures else 0
+
+    regressions = compare_baseline(results, args.baseline, args.tolerance)
+    for line in regressions:
+        logger.warning("REGRESIÓN %s", line)
+    if not regressions:
+        logger.info("Sin regresiones frente a %s", args.baseline)
+    return 1 if regressions or failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+DATOS DE PRUEBA
+Almacenes de series (mismo formato que SeriesStore) con historias sintéticas
+escaladas o con datos reales grabados, para medir sin llamadas de red
+"""
+
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from series_catalog import MACRO_SERIES, MARKET_TICKERS, RATE_SERIES
+from series_store import SeriesStore, get_default_store
+
+# Datos reales grabados con `python -m benchmarks record`
+RECORDED_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+# Nivel inicial aproximado de cada serie sintética
+_RATE_LEVELS = {'DFF': 4.3, 'DGS3MO': 4.2, 'DGS2': 3.9, 'DGS10': 4.1, 'DGS30': 4.5}
+_QUARTERLY = {'GDP'}
+
+
+class Fixture:
+    """
+    Almacén de series listo para medir: claves FRED y tickers disponibles
+    """
+
+    def __init__(self, name: str, store: SeriesStore, years: int,
+                 fred_series: Dict[str, str], tickers: Dict[str, str]):
+        self.name = name
+        self.store = store
+        self.years = years
+        self.fred_series = fred_series
+        self.tickers = tickers
+
+    @property
+    def start_date(self) -> str:
+        end = pd.Timestamp(self.store.metadata('fred', next(iter(self.fred_series.values()))).get('last_date'))
+        return (end - pd.DateOffset(years=self.years)).strftime('%Y-%m-%d')
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.years}y:{len(self.tickers)}t"
+
+
+def _write(store: SeriesStore, namespace: str, key: str, frame: pd.DataFrame) -> None:
+    store.write(namespace, key, frame,
+                checked_at=datetime.now().isoformat(),
+                covered_from=frame.index[0].strftime('%Y-%m-%d'))
+
+
+def synthetic_fixture(root: Path, years: int = 5, n_tickers: int = 7, seed: int = 0,
+                      end: str = '2026-09-30') -> Fixture:
+    """
+    Historias sintéticas de `years` años: tipos diarios (paseo con reversión a
+    la media), indicadores mensuales (PIB trimestral) y OHLCV de n_tickers
+    (los del catálogo y, a partir del octavo, SYN001, SYN002...)
+    """
+    rng = np.random.default_rng(seed)
+    store = SeriesStore(root)
+    end = pd.Timestamp(end)
+    start = end - pd.DateOffset(years=years + 1)
+
+    days = pd.bdate_range(start, end)
+    for series_id in RATE_SERIES.values():
+        level = _RATE_LEVELS.get(series_id, 4.0)
+        values = level + lfilter([1.0], [1.0, -0.998], rng.normal(0, 0.04, len(days)))
+        _write(store, 'fred', series_id, pd.DataFrame({'value': values}, index=days))
+
+    for series_id in MACRO_SERIES.values():
+        dates = pd.date_range(start, end, freq='QS' if series_id in _QUARTERLY else 'MS')
+        growth = rng.normal(0.002, 0.004, len(dates))
+        values = 100 * np.exp(np.cumsum(growth))
+        _write(store, 'fred', series_id, pd.DataFrame({'value': values}, index=dates))
+
+    tickers = dict(list(MARKET_TICKERS.items())[:n_tickers])
+    for i in range(len(tickers), n_tickers):
+        tickers[f"Synthetic {i + 1:03d}"] = f"SYN{i + 1:03d}"
+    for ticker in tickers.values():
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, len(days))))
+        spread = np.abs(rng.normal(0, 0.006, len(days)))
+        _write(store, 'yahoo', ticker, pd.DataFrame({
+            'Open': close * (1 + rng.normal(0, 0.003, len(days))),
+            'High': close * (1 + spread),
+            'Low': close * (1 - spread),
+            'Close': close,
+            'Volume': rng.integers(10**5, 10**7, len(days)).astype(float),
+        }, index=days))
+
+    return Fixture('synthetic', store, years, {**RATE_SERIES, **MACRO_SERIES}, tickers)
+
+
+def recorded_fixture(years: int = 5, root: Path = RECORDED_DIR) -> Fixture:
+    """
+    Datos reales grabados; falla si no se han grabado todavía
+    """
+    store = SeriesStore(root)
+    fred_series = {name: key for name, key in {**RATE_SERIES, **MACRO_SERIES}.items()
+                   if store.metadata('fred', key).get('last_date')}
+    tickers = {name: key for name, key in MARKET_TICKERS.items()
+               if store.metadata('yahoo', key).get('last_date')}
+    if not fred_series:
+        raise FileNotFoundError(f"No hay datos grabados en {root}: ejecuta `python -m benchmarks record`")
+    return Fixture('recorded', store, years, fred_series, tickers)
+
+
+def record_fixtures(source: SeriesStore = None, root: Path = RECORDED_DIR) -> List[Path]:
+    """
+    Copia del almacén local (ya descargado) las tablas del catálogo
+    """
+    source = source or get_default_store()
+    keys: List[Tuple[str, str]] = [('fred', key) for key in {**RATE_SERIES, **MACRO_SERIES}.values()]
+    keys += [('yahoo', ticker) for ticker in MARKET_TICKERS.values()]
+
+    copied = []
+    for namespace, key in keys:
+        base = source._base(namespace, key)
+        target = SeriesStore(root)._base(namespace, key)
+        for suffix in ('.parquet', '.json'):
+            if base.with_suffix(suffix).exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(base.with_suffix(suffix), target.with_suffix(suffix))
+                copied.append(target.with_suffix(suffix))
+    return copied
@@ -0,0 +1,317 @@
+"""
+MOTOR DE CORRELACIONES DE MERCADO
+Matrices de correlación móviles y exponenciales (EWMA) sobre rentabilidades
+logarítmicas para todos los pares a la vez, actualizables de forma incremental
+"""
+
+import threading
+import warnings
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+# Ventana por defecto de la correlación móvil (sesiones)
+DEFAULT_WINDOW = 90
+
+# Vida media por defecto de la correlación EWMA (sesiones)
+DEFAULT_HALFLIFE = 30
+
+# Observaciones conjuntas mínimas para publicar una correlación
+MIN_PERIODS = 20
+
+# Peso relativo por debajo del cual una sesión se ignora al recalcular la EWMA de una fecha pasada
+EWMA_TOLERANCE = 1e-12
+
+
+def aligned_prices(market_data: Dict[str, pd.DataFrame], column: str = 'Close') -> pd.DataFrame:
+    """
+    Precios de cierre de todos los activos sobre la unión de sus calendarios
+
+    Los huecos (festivos de un mercado, activos sin cotización) quedan como NaN;
+    no se rellenan para no inventar rentabilidades nulas.
+    """
+    closes = {
+        name: df[column] for name, df in market_data.items()
+        if df is not None and not df.empty and column in df.columns
+    }
+    if not closes:
+        return pd.DataFrame()
+    return pd.DataFrame(closes).sort_index()
+
+
+def log_returns(prices: pd.DataFrame, last_logs: np.ndarray = None) -> np.ndarray:
+    """
+    Rentabilidades logarítmicas respecto al último precio conocido de cada activo
+
+    Devuelve un array (T, N) alineado con prices.index; NaN donde el activo
+    no cotiza ese día o aún no tiene precio anterior. `last_logs` es el último
+    log-precio conocido antes de la primera fila (para continuar un tramo).
+    """
+    values = prices.to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logs = np.log(np.where(values > 0, values, np.nan))
+    if last_logs is None:
+        previous = pd.DataFrame(logs).ffill().shift(1).to_numpy()
+    else:
+        previous = pd.DataFrame(np.vstack([last_logs, logs])).ffill().to_numpy()[:-1]
+    return logs - previous
+
+
+def _pair_terms(returns: np.ndarray, center: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Términos por par (T, N, N) de las sumas de momentos con datos faltantes
+
+    Cada par usa solo los días en que cotizan los dos activos (pairwise
+    complete). Solo para pocas columnas (series de un par); para la matriz
+    completa se usa _moment_sums.
+    """
+    mask = ~np.isnan(returns)
+    x = np.where(mask, returns - center, 0.0)
+    m = mask.astype(float)
+
+    pair = m[:, :, None] * m[:, None, :]
+    return {
+        'n': pair,
+        'sx': x[:, :, None] * pair,
+        'sxx': (x * x)[:, :, None] * pair,
+        'sxy': x[:, :, None] * x[:, None, :],
+    }
+
+
+def _moment_sums(returns: np.ndarray, center: np.ndarray, weights: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """
+    Sumas (N, N) de momentos por par de un tramo de rentabilidades (T, N)
+
+    Equivale a sumar _pair_terms sobre T, pero con productos de matrices y
+    sin materializar nada de tamaño (T, N, N). `weights` (T,) pondera cada
+    sesión (EWMA).
+    """
+    mask = ~np.isnan(returns)
+    x = np.where(mask, returns - center, 0.0)
+    m = mask.astype(float)
+    w = np.ones(len(returns)) if weights is None else weights
+    wx = x * w[:, None]
+    return {
+        'n': (m * w[:, None]).T @ m,
+        'sx': wx.T @ m,
+        'sxx': (wx * x).T @ m,
+        'sxy': wx.T @ x,
+    }
+
+
+def _correlation(n: np.ndarray, sx: np.ndarray, sxx: np.ndarray, sxy: np.ndarray) -> np.ndarray:
+    """
+    Correlación de Pearson a partir de sumas de momentos por par
+
+    sx[..., i, j] es la suma de x_i en los días comunes a (i, j); la suma de
+    x_j en esos mismos días es su traspuesta. Las sumas pueden ser ponderadas
+    (n = suma de pesos), como en la EWMA.
+    """
+    sy = np.swapaxes(sx, -1, -2)
+    syy = np.swapaxes(sxx, -1, -2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = n * sxy - sx * sy
+        var = (n * sxx - sx * sx) * (n * syy - sy * sy)
+        corr = cov / np.sqrt(var)
+    corr[~(var > 0)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+@dataclass(frozen=True)
+class CorrelationSnapshot:
+    """
+    Foto inmutable del estado de un CorrelationEngine tras una actualización
+
+    Guarda referencias a los precios y al estado (N, N) de ese momento; las
+    actualizaciones posteriores del motor crean estado nuevo en vez de
+    modificarlo, así que las lecturas de la foto son coherentes aunque otra
+    sesión actualice o reinicie el motor mientras tanto.
+    """
+    prices: pd.DataFrame
+    center: Optional[np.ndarray]
+    window: int
+    decay: float
+    min_periods: int
+    ewma_span: int
+    window_sums: Optional[Dict[str, np.ndarray]]
+    ew_state: Optional[Dict[str, np.ndarray]]
+    count: Optional[np.ndarray]
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return self.prices.index
+
+    @property
+    def columns(self) -> list:
+        return list(self.prices.columns)
+
+    def _position(self, date) -> int:
+        if date is None:
+            return len(self.prices) - 1
+        return max(0, int(self.index.searchsorted(pd.Timestamp(date), side='right')) - 1)
+
+    def matrix(self, date=None, method: str = 'rolling') -> pd.DataFrame:
+        """
+        Matriz de correlación en la última sesión <= date (la última si date es None)
+
+        La última sesión sale del estado incremental; las anteriores se
+        recalculan con las rentabilidades de su ventana (móvil) o de las
+        sesiones con peso apreciable (EWMA).
+        """
+        columns = self.columns
+        if len(self.prices) == 0 or self.center is None:
+            return pd.DataFrame(index=columns, columns=columns, dtype=float)
+
+        pos = self._position(date)
+        if pos == len(self.prices) - 1:
+            sums = self.window_sums if method == 'rolling' else self.ew_state
+            counts = sums['n'] if method == 'rolling' else self.count
+        else:
+            returns = log_returns(self.prices.iloc[:pos + 1])
+            if method == 'rolling':
+                sums = _moment_sums(returns[-self.window:], self.center)
+                counts = sums['n']
+            else:
+                tail = returns[-self.ewma_span:]
+                weights = self.decay ** np.arange(len(tail) - 1, -1, -1, dtype=float)
+                sums = _moment_sums(tail, self.center, weights)
+                present = (~np.isnan(returns)).astype(float)
+                counts = present.T @ present
+
+        values = _correlation(sums['n'], sums['sx'], sums['sxx'], sums['sxy'])
+        values[counts < self.min_periods] = np.nan
+        return pd.DataFrame(values, index=columns, columns=columns)
+
+    def pair(self, first: str, second: str, method: str = 'rolling') -> pd.Series:
+        """
+        Serie temporal de la correlación entre dos activos (calculada bajo demanda)
+        """
+        if len(self.prices) == 0 or self.center is None:
+            return pd.Series(dtype=float)
+        i, j = self.columns.index(first), self.columns.index(second)
+        returns = log_returns(self.prices)[:, [i, j]]
+        terms = _pair_terms(returns, self.center[[i, j]])
+        counts = np.cumsum(terms['n'], axis=0)
+        if method == 'rolling':
+            sums = {k: np.cumsum(v, axis=0) for k, v in terms.items()}
+            sums = {k: v - np.concatenate([np.zeros((min(self.window, len(v)), 2, 2)), v[:-self.window]])
+                    for k, v in sums.items()}
+            counts = sums['n']
+        else:
+            sums = {k: lfilter([1.0], [1.0, -self.decay], v, axis=0) for k, v in terms.items()}
+        values = _correlation(sums['n'], sums['sx'], sums['sxx'], sums['sxy'])
+        values[counts < self.min_periods] = np.nan
+        return pd.Series(values[:, 0, 1], index=self.index)
+
+
+class CorrelationEngine:
+    """
+    Correlaciones móviles y EWMA con actualización incremental
+
+    El estado es de tamaño fijo: un buffer circular con las últimas `window`
+    rentabilidades, las sumas de momentos (N, N) de esa ventana y el estado
+    (N, N) del filtro exponencial. Cada sesión nueva cuesta O(N²): se suman
+    sus términos y se restan los de la sesión que sale del buffer. Las
+    matrices de fechas anteriores (para recorrer el histórico) se calculan
+    bajo demanda a partir de los precios; no se guarda ningún histórico
+    (T, N, N). Si cambian los activos o se revisa el histórico se recalcula todo.
+
+    `update` devuelve un CorrelationSnapshot: las lecturas (fechas, matrices)
+    se hacen sobre la foto, no sobre el motor compartido.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, halflife: float = DEFAULT_HALFLIFE,
+                 min_periods: int = MIN_PERIODS):
+        self.window = window
+        self.decay = 0.5 ** (1.0 / halflife)
+        self.min_periods = min(min_periods, window)
+        # Sesiones con peso EWMA apreciable (decay^k > EWMA_TOLERANCE) al calcular fechas pasadas
+        self.ewma_span = int(np.ceil(np.log(EWMA_TOLERANCE) / np.log(self.decay)))
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.prices: Optional[pd.DataFrame] = None
+        self._center = None
+        self._last_logs = None   # (N,) último log-precio conocido
+        self._ring = None        # (window, N) últimas rentabilidades (NaN = hueco)
+        self._seen = 0           # sesiones incorporadas (posición de escritura = _seen % window)
+        self._window_sums = None # {'n', 'sx', ...} -> (N, N) sumas de la ventana
+        self._ew_state = None    # {'n', 'sx', ...} -> (N, N) estado del filtro EWMA
+        self._count = None       # (N, N) sesiones comunes desde el inicio (min_periods de la EWMA)
+
+    def _is_extension(self, prices: pd.DataFrame) -> bool:
+        old = self.prices
+        if old is None or list(prices.columns) != list(old.columns) or len(prices) < len(old):
+            return False
+        head = prices.iloc[:len(old)]
+        return head.index.equals(old.index) and np.allclose(
+            head.to_numpy(dtype=float), old.to_numpy(dtype=float), equal_nan=True
+        )
+
+    def update(self, prices: Union[pd.DataFrame, Dict[str, pd.DataFrame]]) -> CorrelationSnapshot:
+        """
+        Incorpora los precios actuales y devuelve una foto inmutable del estado
+
+        `prices` es un DataFrame de cierres ya alineados (NaN en los días sin
+        cotización) o un dict {nombre: OHLCV} que se alinea con aligned_prices.
+        """
+        if isinstance(prices, dict):
+            prices = aligned_prices(prices)
+        with self._lock:
+            if not self._is_extension(prices):
+                self._reset()
+                self._append(prices, start=0)
+            elif len(prices) > len(self.prices):
+                self._append(prices, start=len(self.prices))
+            self.prices = prices
+            return CorrelationSnapshot(
+                prices, self._center, self.window, self.decay, self.min_periods, self.ewma_span,
+                self._window_sums, self._ew_state, self._count
+            )
+
+    def _append(self, prices: pd.DataFrame, start: int) -> None:
+        n_assets = prices.shape[1]
+        returns = log_returns(prices.iloc[start:], self._last_logs)
+        if len(returns) == 0:
+            return
+
+        if self._center is None:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                self._center = np.nan_to_num(np.nanmean(returns, axis=0))
+            self._ring = np.full((self.window, n_assets), np.nan)
+            self._window_sums = _moment_sums(self._ring, self._center)
+            self._ew_state = _moment_sums(self._ring[:0], self._center)
+            self._count = np.zeros((n_assets, n_assets))
+
+        # Último log-precio conocido de cada activo, para continuar en la próxima actualización
+        with np.errstate(divide='ignore', invalid='ignore'):
+            logs = np.log(prices.iloc[start:].where(prices.iloc[start:] > 0))
+        last = logs.ffill().to_numpy(dtype=float)[-1]
+        self._last_logs = last if self._last_logs is None else np.where(np.isnan(last), self._last_logs, last)
+
+        # Ventana móvil: se suman las sesiones nuevas y se restan las que salen del buffer
+        k = len(returns)
+        tail = returns[-self.window:]
+        slots = (self._seen + k - len(tail) + np.arange(len(tail))) % self.window
+        if k >= self.window:
+            self._ring[slots] = tail
+            self._window_sums = _moment_sums(self._ring, self._center)
+        else:
+            leaving = _moment_sums(self._ring[slots], self._center)
+            entering = _moment_sums(tail, self._center)
+            self._ring[slots] = tail
+            self._window_sums = {key: self._window_sums[key] + entering[key] - leaving[key]
+                                 for key in entering}
+        self._seen += k
+
+        # EWMA: s[t] = decay * s[t-1] + v[t], continuando desde el último estado del filtro
+        weights = self.decay ** np.arange(k - 1, -1, -1, dtype=float)
+        fresh = _moment_sums(returns, self._center, weights)
+        self._ew_state = {key: self.decay ** k * self._ew_state[key] + fresh[key] for key in fresh}
+        present = (~np.isnan(returns)).astype(float)
+        self._count = self._count + present.T @ present
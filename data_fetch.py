@@ -0,0 +1,499 @@
+"""
+MOTOR DE DESCARGA DE DATOS
+Descarga concurrente de series FRED y cotizaciones de Yahoo Finance,
+independiente de Streamlit, apoyada en el almacén local incremental
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import requests
+import yfinance as yf
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from freshness import fred_expires_at, market_expires_at, normalize_frequency, parse_fred_timestamp
+from macro_panel import infer_frequency
+from series_store import PER_SERIES_TTL, SeriesStore, get_default_store
+from singleflight import SingleFlight
+
+# Tamaño del pool de descarga y timeout por serie (segundos)
+FRED_MAX_WORKERS = 8
+FRED_SERIES_TIMEOUT = 20.0
+
+# Antigüedad máxima de lo almacenado para servirlo mientras se revalida en segundo plano;
+# por encima (o tras el botón de actualizar) la petición espera a la descarga
+STALE_WHILE_REVALIDATE = timedelta(days=7)
+
+# Hilos dedicados a las revalidaciones en segundo plano
+REVALIDATE_WORKERS = 4
+
+FRED_API_URL = 'https://api.stlouisfed.org/fred'
+
+
+def default_start_date(years: int = 5) -> str:
+    """
+    Fecha de inicio por defecto (hace n años) en formato YYYY-MM-DD
+    """
+    return (datetime.now() - timedelta(days=365 * years)).strftime('%Y-%m-%d')
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CLIENTE FRED
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class FredClient:
+    """
+    Cliente HTTP de la API de FRED con una sesión requests compartida
+
+    La sesión mantiene conexiones keep-alive en un pool, de modo que las
+    descargas sucesivas (y las concurrentes del pool de hilos) reutilizan
+    la conexión TLS en vez de abrir una nueva por serie. Los errores
+    transitorios (429, 5xx) se reintentan con backoff exponencial.
+    """
+
+    def __init__(self, api_key: str = None, pool_size: int = 16,
+                 max_retries: int = 3, backoff_factor: float = 0.5,
+                 timeout: float = FRED_SERIES_TIMEOUT):
+        self.api_key = api_key
+        self.timeout = timeout
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=('GET',),
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _get(self, endpoint: str, **params) -> Dict:
+        if not self.api_key:
+            raise ValueError("Falta la API key de FRED: define FRED_API_KEY en el entorno o en los secrets")
+
+        params.update(api_key=self.api_key, file_type='json')
+        try:
+            response = self.session.get(f"{FRED_API_URL}/{endpoint}", params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            # La URL del error lleva la API key: no debe llegar a la interfaz
+            raise ConnectionError(str(e).replace(self.api_key, '***')) from None
+
+        if response.status_code != 200:
+            try:
+                message = response.json().get('error_message', response.reason)
+            except ValueError:
+                message = response.reason
+            raise ValueError(f"FRED {response.status_code}: {message}")
+
+        return response.json()
+
+    def get_series(self, series_id: str, start_date: str = None, end_date: str = None) -> pd.Series:
+        """
+        Observaciones de una serie como pd.Series indexada por fecha (NaN si falta el dato)
+        """
+        params = {'series_id': series_id}
+        if start_date:
+            params['observation_start'] = start_date
+        if end_date:
+            params['observation_end'] = end_date
+
+        observations = self._get('series/observations', **params).get('observations', [])
+        if not observations:
+            return pd.Series(dtype=float)
+
+        dates = pd.to_datetime([obs['date'] for obs in observations])
+        values = pd.to_numeric([obs['value'] for obs in observations], errors='coerce')
+        return pd.Series(np.asarray(values, dtype=float), index=dates)
+
+    def get_series_info(self, series_id: str) -> Dict:
+        """
+        Metadatos de la serie (frequency_short, last_updated...): unos cientos de bytes
+        """
+        seriess = self._get('series', series_id=series_id).get('seriess', [])
+        return seriess[0] if seriess else {}
+
+
+_fred_client: Optional[FredClient] = None
+_fred_client_lock = threading.Lock()
+
+
+def _build_fred_client(api_key: str = None, **kwargs) -> FredClient:
+    settings = {
+        'api_key': api_key or os.environ.get('FRED_API_KEY'),
+        'pool_size': int(os.environ.get('FRED_POOL_SIZE', 16)),
+        'max_retries': int(os.environ.get('FRED_MAX_RETRIES', 3)),
+        'backoff_factor': float(os.environ.get('FRED_BACKOFF', 0.5)),
+    }
+    settings.update(kwargs)
+    return FredClient(**settings)
+
+
+def configure_fred_client(api_key: str = None, **kwargs) -> FredClient:
+    """
+    (Re)crea el cliente compartido del proceso
+
+    Los parámetros no indicados se leen del entorno:
+    FRED_API_KEY, FRED_POOL_SIZE, FRED_MAX_RETRIES, FRED_BACKOFF
+    """
+    global _fred_client
+
+    client = _build_fred_client(api_key, **kwargs)
+    with _fred_client_lock:
+        previous, _fred_client = _fred_client, client
+    if previous is not None:
+        previous.session.close()
+    return client
+
+
+def get_fred_client() -> FredClient:
+    """
+    Cliente FRED compartido por todo el proceso (se crea en el primer uso)
+    """
+    global _fred_client
+
+    with _fred_client_lock:
+        if _fred_client is None:
+            _fred_client = _build_fred_client()
+        return _fred_client
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# COALESCENCIA Y REVALIDACIÓN
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Una sola descarga en curso por serie/rango en todo el proceso: las sesiones
+# que piden lo mismo a la vez esperan a esa descarga y comparten su resultado
+_flights = SingleFlight()
+_revalidator = ThreadPoolExecutor(max_workers=REVALIDATE_WORKERS, thread_name_prefix='revalidate')
+
+
+def _can_serve_stale(store: SeriesStore, namespace: str, keys: List[str],
+                     start_date: str, max_age: Optional[timedelta]) -> bool:
+    """
+    True si todas las claves tienen datos que cubren el rango pedido y, como mucho,
+    falta la cola (comprobación caducada pero dentro de STALE_WHILE_REVALIDATE)
+    """
+    for key in keys:
+        if not store.metadata(namespace, key).get('last_date'):
+            return False
+        ranges = store.plan(namespace, key, start_date, max_age=max_age)
+        if any(range_end is not None for _, range_end in ranges):
+            return False
+        if ranges and not store.is_fresh(namespace, key, STALE_WHILE_REVALIDATE):
+            return False
+    return True
+
+
+def _revalidate(store: SeriesStore, namespace: str, keys: List[str], flight_key, refresh) -> None:
+    """
+    Lanza `refresh` en segundo plano (una vez por flight_key) y publica una nueva
+    generación del almacén si alguna tabla cambió, para invalidar las cachés de la app
+    """
+    def _run():
+        before = [store.metadata(namespace, key).get('updated_at') for key in keys]
+        result = refresh()
+        after = [store.metadata(namespace, key).get('updated_at') for key in keys]
+        if after != before:
+            store.bump_generation()
+        return result
+
+    _flights.do_async(flight_key, _run, _revalidator)
+
+
+def fetch_fred_series(series_id: str, start_date: str = None, end_date: str = None) -> pd.Series:
+    """
+    Descarga una serie de FRED. Lanza excepción si falla (sin capturar)
+    """
+    if start_date is None:
+        start_date = default_start_date()
+
+    return get_fred_client().get_series(series_id, start_date, end_date)
+
+
+def fetch_fred_series_info(series_id: str) -> Dict:
+    """
+    Metadatos de una serie de FRED. Lanza excepción si falla (sin capturar)
+    """
+    return get_fred_client().get_series_info(series_id)
+
+
+def _revalidate_fred(series_id: str) -> Callable[[Dict], Tuple[bool, Dict]]:
+    """
+    Comprobación condicional: la cola solo se descarga si FRED publicó algo
+    desde la última comprobación (last_updated distinto del guardado)
+    """
+    def check(meta: Dict) -> Tuple[bool, Dict]:
+        try:
+            info = fetch_fred_series_info(series_id)
+        except Exception:
+            return True, {}
+        source = {
+            'frequency': normalize_frequency(info.get('frequency_short')),
+            'source_updated': info.get('last_updated'),
+        }
+        changed = not source['source_updated'] or source['source_updated'] != meta.get('source_updated')
+        return changed, source
+    return check
+
+
+def _fred_expiry(frame: pd.DataFrame, source: Dict) -> datetime:
+    frequency = source.get('frequency') or infer_frequency(frame.index)
+    return fred_expires_at(frequency, parse_fred_timestamp(source.get('source_updated')))
+
+
+def load_fred_series(series_id: str, start_date: str = None,
+                     store: SeriesStore = None,
+                     max_age: Optional[timedelta] = PER_SERIES_TTL,
+                     stale_while_revalidate: bool = True) -> pd.Series:
+    """
+    Serie FRED desde el almacén local desde start_date
+
+    Solo se descarga lo que falta: las observaciones nuevas (si la última
+    comprobación tiene más de max_age) y, si se pide un rango más largo que
+    el almacenado, el tramo anterior. Un rango más corto se sirve recortando
+    el histórico local.
+
+    Con max_age=PER_SERIES_TTL cada serie caduca según su frecuencia y su
+    última publicación, y antes de descargar la cola se consultan sus
+    metadatos en FRED: si no ha cambiado, no se descarga nada.
+
+    Si solo falta la cola, se devuelve al momento lo almacenado y la cola se
+    descarga en segundo plano (stale-while-revalidate). Las descargas
+    concurrentes de la misma serie y rango se coalescen en una sola.
+    """
+    if start_date is None:
+        start_date = default_start_date()
+    store = store or get_default_store()
+
+    def _update() -> pd.DataFrame:
+        return store.update(
+            'fred', series_id,
+            lambda since, until: fetch_fred_series(series_id, since or start_date, until).to_frame('value'),
+            start_date=start_date, max_age=max_age,
+            revalidate=_revalidate_fred(series_id), expires_at=_fred_expiry
+        )
+
+    if stale_while_revalidate and _can_serve_stale(store, 'fred', [series_id], start_date, max_age):
+        if not store.is_fresh('fred', series_id, max_age):
+            _revalidate(store, 'fred', [series_id], (str(store.root), 'fred', series_id, 'revalidate'), _update)
+        frame = store.read('fred', series_id)
+        if frame is None:
+            frame = _flights.do((str(store.root), 'fred', series_id, start_date), _update)
+    else:
+        frame = _flights.do((str(store.root), 'fred', series_id, start_date), _update)
+    if frame.empty:
+        return pd.Series(dtype=float)
+
+    series = frame['value']
+    series.name = None
+    return series[series.index >= pd.Timestamp(start_date)]
+
+
+def fetch_fred_batch(series: Dict[str, str], start_date: str = None,
+                     max_workers: int = FRED_MAX_WORKERS,
+                     timeout: float = FRED_SERIES_TIMEOUT,
+                     max_age: Optional[timedelta] = PER_SERIES_TTL,
+                     stale_while_revalidate: bool = True) -> Tuple[Dict[str, pd.Series], Dict[str, str]]:
+    """
+    Descarga en paralelo un conjunto de series FRED {nombre: series_id}
+
+    Devuelve (datos, errores):
+    - datos: {nombre: pd.Series} con todas las claves de entrada; las series
+      fallidas o fuera de tiempo se devuelven vacías
+    - errores: {nombre: mensaje} solo para las series que fallaron
+
+    Cada serie dispone de `timeout` segundos desde que empieza a ejecutarse,
+    de modo que la latencia total es la de la serie más lenta y no la suma.
+    """
+    data = {name: pd.Series(dtype=float) for name in series}
+    errors = {}
+
+    if not series:
+        return data, errors
+
+    started = {}
+
+    def _task(name: str, series_id: str) -> pd.Series:
+        started[name] = time.monotonic()
+        return load_fred_series(series_id, start_date, max_age=max_age,
+                                stale_while_revalidate=stale_while_revalidate)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(series))),
+                                  thread_name_prefix='fred-fetch')
+    pending = {
+        executor.submit(_task, name, series_id): name
+        for name, series_id in series.items()
+    }
+
+    try:
+        while pending:
+            # Próximo vencimiento entre las tareas ya arrancadas
+            now = time.monotonic()
+            deadlines = [started[name] + timeout for name in pending.values() if name in started]
+            wait_for = max(0.0, min(deadlines) - now) if deadlines else timeout
+
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    result = future.result()
+                    data[name] = result if result is not None else pd.Series(dtype=float)
+                except Exception as e:
+                    errors[name] = str(e)
+
+            # Marcar como timeout las tareas que superan su plazo
+            now = time.monotonic()
+            for future, name in list(pending.items()):
+                if name in started and now - started[name] >= timeout and not future.done():
+                    errors[name] = f"timeout tras {timeout:.0f}s"
+                    future.cancel()
+                    del pending[future]
+    finally:
+        # No esperar a hilos colgados: sus resultados se descartan
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return data, errors
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# YAHOO FINANCE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+MARKET_HISTORY_YEARS = 2
+
+
+def _split_ohlcv(df: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """
+    Extrae el OHLCV de un ticker de la descarga de yfinance (columnas MultiIndex o planas)
+    """
+    if not isinstance(df.columns, pd.MultiIndex):
+        return df.dropna(how='all')
+
+    for level in range(df.columns.nlevels):
+        if ticker in df.columns.get_level_values(level):
+            return df.xs(ticker, axis=1, level=level).dropna(how='all')
+
+    return pd.DataFrame()
+
+
+def fetch_market_batch(tickers: List[str], start_date: str = None,
+                       end_date: str = None) -> Dict[str, pd.DataFrame]:
+    """
+    Descarga OHLCV diario de varios tickers en una sola petición de yfinance
+
+    Devuelve {ticker: DataFrame}; los tickers sin datos quedan con un DataFrame vacío
+    """
+    if start_date is None:
+        start_date = default_start_date(MARKET_HISTORY_YEARS)
+
+    raw = yf.download(list(tickers), start=start_date, end=end_date, group_by='ticker',
+                      threads=True, progress=False)
+
+    return {ticker: _split_ohlcv(raw, ticker) for ticker in tickers}
+
+
+def load_market_batch(tickers: Dict[str, str], start_date: str = None,
+                      store: SeriesStore = None,
+                      max_age: Optional[timedelta] = PER_SERIES_TTL,
+                      stale_while_revalidate: bool = True) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+    """
+    OHLCV de varios tickers {nombre: ticker} desde el almacén local
+
+    Las sesiones que faltan (nuevas o anteriores al rango almacenado) se
+    descargan en una única petición, desde la fecha más antigua que necesite
+    alguno de los tickers, y se reparten por ticker. Si el almacén ya cubre
+    el rango pedido no hay llamada de red. Devuelve (datos, errores) como
+    fetch_fred_batch.
+
+    Con max_age=PER_SERIES_TTL las cotizaciones caducan a los pocos minutos
+    en sesión y, fuera de ella, en la próxima apertura.
+
+    Si a todos los tickers solo les falta la cola, se sirve lo almacenado y
+    el lote se revalida en segundo plano; los lotes idénticos en curso se
+    coalescen en una sola descarga.
+    """
+    if start_date is None:
+        start_date = default_start_date(MARKET_HISTORY_YEARS)
+    store = store or get_default_store()
+
+    batch = tuple(sorted(tickers.items()))
+    symbols = list(tickers.values())
+
+    def _update() -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+        return _update_market_batch(tickers, start_date, store, max_age)
+
+    if not (stale_while_revalidate and _can_serve_stale(store, 'yahoo', symbols, start_date, max_age)):
+        return _flights.do((str(store.root), 'yahoo', batch, start_date), _update)
+
+    if not all(store.is_fresh('yahoo', ticker, max_age) for ticker in symbols):
+        _revalidate(store, 'yahoo', symbols, (str(store.root), 'yahoo', batch, 'revalidate'), _update)
+
+    data, errors = {}, {}
+    for name, ticker in tickers.items():
+        frame = store.read('yahoo', ticker)
+        if frame is None or frame.empty:
+            errors[name] = "sin datos"
+            data[name] = pd.DataFrame()
+            continue
+        data[name] = frame[frame.index >= pd.Timestamp(start_date)]
+    return data, errors
+
+
+def _update_market_batch(tickers: Dict[str, str], start_date: str, store: SeriesStore,
+                         max_age: Optional[timedelta]) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+    """
+    Descarga en una sola petición lo que falte de cada ticker y actualiza el almacén
+    """
+    overlap_days = 3
+    plans = {
+        ticker: store.plan('yahoo', ticker, start_date, max_age=max_age, overlap_days=overlap_days)
+        for ticker in tickers.values()
+    }
+    pending = [ticker for ticker, ranges in plans.items() if ranges]
+
+    downloaded, download_error = {}, None
+    if pending:
+        earliest = min(range_start or start_date for ticker in pending for range_start, _ in plans[ticker])
+        try:
+            downloaded = fetch_market_batch(pending, earliest)
+        except Exception as e:
+            download_error = str(e)
+
+    def _slice(ticker: str, since: Optional[str], until: Optional[str]) -> pd.DataFrame:
+        fresh = downloaded.get(ticker, pd.DataFrame())
+        if fresh.empty:
+            return fresh
+        mask = fresh.index >= pd.Timestamp(since or start_date)
+        if until:
+            mask &= fresh.index < pd.Timestamp(until)
+        return fresh[mask]
+
+    data, errors = {}, {}
+    for name, ticker in tickers.items():
+        if download_error and ticker in pending:
+            # Sin red: se sirve lo almacenado sin marcarlo como comprobado
+            frame = store.read('yahoo', ticker)
+            frame = frame if frame is not None else pd.DataFrame()
+        else:
+            frame = store.update('yahoo', ticker, lambda since, until, ticker=ticker: _slice(ticker, since, until),
+                                 start_date=start_date, max_age=max_age, overlap_days=overlap_days,
+                                 expires_at=lambda frame, source: market_expires_at())
+        if frame.empty:
+            errors[name] = download_error or "sin datos"
+            data[name] = frame
+            continue
+
+        data[name] = frame[frame.index >= pd.Timestamp(start_date)]
+
+    return data, errors
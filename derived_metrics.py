@@ -0,0 +1,137 @@
+"""
+MÉTRICAS DERIVADAS
+Variaciones interanuales, cambios, spreads y estadísticos calculados una sola
+vez por versión del panel; las pestañas solo leen los valores ya calculados
+"""
+
+from typing import Dict, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from macro_panel import MacroPanel
+
+# Desfases en observaciones (último dato frente a n observaciones antes)
+OBSERVATION_LAGS = (1, 5, 30)
+
+# Desfases de calendario (último dato frente al valor vigente n meses antes)
+CALENDAR_LAGS = {
+    '3M': pd.DateOffset(months=3),
+    '12M': pd.DateOffset(months=12),
+}
+
+Lag = Union[int, str]
+
+
+def asof_values(series: pd.Series, dates: pd.DatetimeIndex) -> np.ndarray:
+    """
+    Valor vigente de la serie en cada fecha (última observación <= fecha, NaN si no hay)
+    """
+    stamps = series.index.as_unit('ns').asi8
+    pos = np.searchsorted(stamps, dates.as_unit('ns').asi8, side='right') - 1
+    values = series.to_numpy(dtype=float)
+    return np.where(pos >= 0, values[np.maximum(pos, 0)], np.nan)
+
+
+def yoy_series(series: pd.Series) -> pd.Series:
+    """
+    Variación interanual (%) de cada observación frente al valor vigente 12 meses antes
+
+    Funciona igual para series mensuales, trimestrales o diarias, y no se
+    desplaza si falta alguna observación (a diferencia de pct_change(12)).
+    """
+    if len(series) == 0:
+        return pd.Series(dtype=float)
+    past = asof_values(series, series.index - CALENDAR_LAGS['12M'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yoy = (series.to_numpy(dtype=float) / past - 1) * 100
+    return pd.Series(yoy, index=series.index).dropna()
+
+
+class DerivedMetrics:
+    """
+    Métricas derivadas de un MacroPanel
+
+    Se construye una vez por `panel.version`. Para cada columna guarda el
+    último valor y los valores desfasados de OBSERVATION_LAGS y
+    CALENDAR_LAGS; para los indicadores macro, su serie interanual; y el
+    spread 10Y-2Y con sus estadísticos.
+    """
+
+    def __init__(self, panel: MacroPanel):
+        self.version = panel.version
+        self._levels: Dict[Tuple[str, str], float] = {}
+        self._lagged: Dict[Tuple[str, str], Dict[Lag, float]] = {}
+
+        for group in panel.groups:
+            for name in panel.columns(group):
+                native = panel.native(group, name)
+                values = native.to_numpy(dtype=float)
+                last_date = native.index[-1]
+
+                lagged: Dict[Lag, float] = {
+                    lag: values[-1 - lag] if len(values) > lag else np.nan
+                    for lag in OBSERVATION_LAGS
+                }
+                targets = pd.DatetimeIndex([last_date - offset for offset in CALENDAR_LAGS.values()])
+                past = asof_values(native, targets)
+                lagged.update(zip(CALENDAR_LAGS, past))
+
+                self._levels[(group, name)] = float(values[-1])
+                self._lagged[(group, name)] = lagged
+
+        self._yoy = {name: yoy_series(panel.native('macro', name)) for name in panel.columns('macro')}
+
+        if panel.has('rates', '10Y Treasury') and panel.has('rates', '2Y Treasury'):
+            self.spread = panel.column('rates', '10Y Treasury') - panel.column('rates', '2Y Treasury')
+        else:
+            self.spread = pd.Series(dtype=float)
+        self.spread_mean = float(self.spread.mean()) if len(self.spread) > 0 else np.nan
+        self.spread_inverted_share = float((self.spread.dropna() < 0).mean() * 100) if len(self.spread) > 0 else np.nan
+
+    # ── Lecturas ────────────────────────────────────────────────────────────
+
+    def has(self, group: str, name: str) -> bool:
+        return (group, name) in self._levels
+
+    def level(self, group: str, name: str) -> float:
+        """
+        Último valor observado (NaN si la columna no existe)
+        """
+        return self._levels.get((group, name), np.nan)
+
+    def lagged(self, group: str, name: str, lag: Lag) -> float:
+        """
+        Valor desfasado: `lag` observaciones antes (int) o el vigente hace '3M' / '12M'
+        """
+        return self._lagged.get((group, name), {}).get(lag, np.nan)
+
+    def change(self, group: str, name: str, lag: Lag) -> float:
+        """
+        Cambio absoluto frente al valor desfasado (0 si no hay histórico suficiente)
+        """
+        change = self.level(group, name) - self.lagged(group, name, lag)
+        return float(change) if np.isfinite(change) else 0.0
+
+    def pct_change(self, group: str, name: str, lag: Lag) -> float:
+        """
+        Cambio porcentual frente al valor desfasado (0 si no hay histórico suficiente)
+        """
+        past = self.lagged(group, name, lag)
+        if not np.isfinite(past) or past == 0:
+            return 0.0
+        change = (self.level(group, name) - past) / past * 100
+        return float(change) if np.isfinite(change) else 0.0
+
+    def yoy(self, name: str) -> pd.Series:
+        """
+        Serie interanual (%) de un indicador macro
+        """
+        return self._yoy.get(name, pd.Series(dtype=float))
+
+    def latest_yoy(self, name: str) -> float:
+        """
+        Última variación interanual (%) de un indicador macro (NaN si no hay 12 meses)
+        """
+        series = self.yoy(name)
+        return float(series.iloc[-1]) if len(series) > 0 else np.nan
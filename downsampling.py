@@ -0,0 +1,97 @@
+"""
+REDUCCIÓN DE PUNTOS PARA GRÁFICOS
+Largest-Triangle-Three-Buckets (LTTB) para líneas y agregación OHLC por
+tramos para velas, con un número de puntos ligado al ancho del gráfico
+"""
+
+import numpy as np
+import pandas as pd
+
+# Ancho de referencia de un gráfico a ancho completo (píxeles)
+DEFAULT_CHART_WIDTH = 1400
+
+# Puntos por píxel en líneas y píxeles mínimos por vela
+POINTS_PER_PIXEL = 1.0
+PIXELS_PER_CANDLE = 4
+
+
+def max_points(width_px: int = DEFAULT_CHART_WIDTH, columns: int = 1) -> int:
+    """
+    Puntos por traza que caben en un gráfico (o subgráfico de una rejilla de `columns`)
+    """
+    return max(16, int(width_px / columns * POINTS_PER_PIXEL))
+
+
+def max_candles(width_px: int = DEFAULT_CHART_WIDTH, columns: int = 1) -> int:
+    """
+    Velas que caben en un gráfico sin solaparse
+    """
+    return max(16, int(width_px / columns / PIXELS_PER_CANDLE))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Índices de los puntos elegidos por Largest-Triangle-Three-Buckets
+
+    Conserva el primero y el último; en cada tramo intermedio elige el punto
+    que forma el triángulo de mayor área con el punto elegido en el tramo
+    anterior y la media del tramo siguiente, lo que mantiene picos y valles.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[prev] - avg_x) * (y[start:end] - y[prev])
+            - (x[prev] - x[start:end]) * (avg_y - y[prev])
+        )
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+
+def lttb(series: pd.Series, n_out: int) -> pd.Series:
+    """
+    Serie reducida a n_out puntos con LTTB (sin NaN); la serie original si ya cabe
+    """
+    series = series.dropna()
+    if len(series) <= n_out:
+        return series
+
+    index = series.index
+    x = index.as_unit('ns').asi8.astype(float) if isinstance(index, pd.DatetimeIndex) else np.asarray(index, dtype=float)
+    return series.iloc[lttb_indices(x, series.to_numpy(dtype=float), n_out)]
+
+
+def ohlc_buckets(df: pd.DataFrame, n_out: int) -> pd.DataFrame:
+    """
+    Agrega velas consecutivas en n_out tramos: apertura del primero, máximo,
+    mínimo y cierre del último. La fecha del tramo es la de su primera sesión.
+    """
+    if len(df) <= n_out:
+        return df
+
+    groups = np.repeat(np.arange(n_out), np.diff(np.linspace(0, len(df), n_out + 1).astype(int)))
+    grouped = df.groupby(groups)
+    aggregated = pd.DataFrame({
+        'Open': grouped['Open'].first(),
+        'High': grouped['High'].max(),
+        'Low': grouped['Low'].min(),
+        'Close': grouped['Close'].last(),
+    })
+    aggregated.index = df.index[np.searchsorted(groups, np.arange(n_out))]
+    return aggregated
+
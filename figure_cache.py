@@ -0,0 +1,92 @@
+"""
+CACHÉ DE FIGURAS
+Memoización de los constructores de gráficos por versión de datos y
+parámetros, para no reconstruir ni volver a reducir figuras en cada rerun
+"""
+
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+# Figuras guardadas como máximo (las menos usadas recientemente se descartan)
+DEFAULT_MAX_FIGURES = 64
+
+# Tipos de argumento que forman parte de la clave; el resto (DataFrames,
+# dicts de series...) son datos y quedan representados por `version`
+_PARAM_TYPES = (str, int, float, bool, type(None))
+
+
+class FigureCache:
+    """
+    Caché LRU de figuras, segura entre hilos
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_FIGURES):
+        self.max_entries = max_entries
+        self._figures: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key]
+            self.misses += 1
+
+        figure = build()
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figure
+
+    def clear(self) -> None:
+        with self._lock:
+            self._figures.clear()
+
+
+_default_cache = FigureCache()
+
+
+def _params_key(args: Tuple, kwargs: dict) -> Tuple:
+    positional = tuple(arg if isinstance(arg, _PARAM_TYPES) else type(arg).__name__ for arg in args)
+    named = tuple(sorted(
+        (name, value) for name, value in kwargs.items() if isinstance(value, _PARAM_TYPES)
+    ))
+    return positional + named
+
+
+def memoize_figure(builder: Callable = None, *, cache: FigureCache = None) -> Callable:
+    """
+    Decorador para constructores create_*_chart
+
+    El constructor decorado acepta un argumento extra `version`: una cadena
+    que identifica los datos recibidos (p. ej. panel.version más los ajustes
+    de la proyección). La clave es (constructor, version, parámetros
+    escalares). Sin `version` la figura se construye siempre.
+
+    Las figuras devueltas se comparten entre reruns y sesiones: no deben
+    modificarse después de construirlas.
+    """
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, version: Optional[str] = None, **kwargs):
+            if version is None:
+                return func(*args, **kwargs)
+            key = (func.__qualname__, version, _params_key(args, kwargs))
+            return (cache or _default_cache).get_or_build(key, lambda: func(*args, **kwargs))
+        return wrapper
+
+    return decorate(builder) if builder is not None else decorate
+
+
+def clear_figure_cache() -> None:
+    """
+    Vacía la caché compartida (p. ej. al forzar la actualización de datos)
+    """
+    _default_cache.clear()
@@ -0,0 +1,123 @@
+"""
+POLÍTICA DE FRESCURA POR SERIE
+Caducidad de cada serie según su frecuencia de publicación y su última
+actualización en FRED, y según el horario de mercado para Yahoo Finance
+"""
+
+from datetime import datetime, time, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+# Intervalo entre comprobaciones según la frecuencia de la serie
+CHECK_INTERVALS = {
+    'D': timedelta(hours=1),
+    'W': timedelta(hours=6),
+    'M': timedelta(hours=6),
+    'Q': timedelta(hours=12),
+    'A': timedelta(days=1),
+}
+
+# Separación habitual entre publicaciones y fracción de ella en la que no se espera un dato nuevo
+RELEASE_GAPS = {
+    'D': timedelta(days=1),
+    'W': timedelta(days=7),
+    'M': timedelta(days=28),
+    'Q': timedelta(days=90),
+    'A': timedelta(days=365),
+}
+RELEASE_MARGIN = 0.8
+
+# Horario de la bolsa de Nueva York (sin festivos) y caducidad intradía
+MARKET_TIMEZONE = ZoneInfo('America/New_York')
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+MARKET_SETTLE = timedelta(minutes=30)     # margen tras el cierre para el dato definitivo
+MARKET_INTRADAY_TTL = timedelta(minutes=5)
+
+
+def normalize_frequency(code: Optional[str]) -> str:
+    """
+    Frecuencia FRED (frequency_short: D, W, BW, M, Q, SA, A...) reducida a D/W/M/Q/A
+    """
+    code = (code or 'D').upper()
+    if code.startswith('BW'):
+        return 'W'
+    if code.startswith('SA'):
+        return 'Q'
+    return code[0] if code[0] in CHECK_INTERVALS else 'D'
+
+
+def parse_fred_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """
+    last_updated de FRED ('2024-05-15 07:41:02-05') en hora local sin zona
+    """
+    if not value:
+        return None
+    try:
+        stamp = pd.Timestamp(value)
+    except ValueError:
+        return None
+    moment = stamp.to_pydatetime()
+    return _to_local(moment) if moment.tzinfo is not None else moment
+
+
+def fred_expires_at(frequency: str, last_updated: Optional[datetime] = None,
+                    now: datetime = None) -> datetime:
+    """
+    Hasta cuándo no merece la pena volver a consultar una serie FRED
+
+    Como mínimo el intervalo de comprobación de su frecuencia; si la última
+    publicación es reciente, hasta que se acerque la siguiente
+    (RELEASE_MARGIN del hueco habitual entre publicaciones).
+    """
+    now = now or datetime.now()
+    frequency = normalize_frequency(frequency)
+    expires_at = now + CHECK_INTERVALS[frequency]
+    if last_updated is not None:
+        expires_at = max(expires_at, last_updated + RELEASE_GAPS[frequency] * RELEASE_MARGIN)
+    return expires_at
+
+
+def _market_now(now: datetime = None) -> datetime:
+    return (now or datetime.now()).astimezone(MARKET_TIMEZONE)
+
+
+def _to_local(moment: datetime) -> datetime:
+    return moment.astimezone().replace(tzinfo=None)
+
+
+def market_is_open(now: datetime = None) -> bool:
+    """
+    True en sesión (o en el margen tras el cierre) un día laborable en Nueva York
+    """
+    moment = _market_now(now)
+    if moment.weekday() >= 5:
+        return False
+    opens = moment.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0)
+    closes = moment.replace(hour=MARKET_CLOSE.hour, minute=MARKET_CLOSE.minute, second=0, microsecond=0)
+    return opens <= moment < closes + MARKET_SETTLE
+
+
+def next_market_open(now: datetime = None) -> datetime:
+    """
+    Próxima apertura (hora local sin zona)
+    """
+    moment = _market_now(now)
+    opens = moment.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0)
+    if opens <= moment:
+        opens += timedelta(days=1)
+    while opens.weekday() >= 5:
+        opens += timedelta(days=1)
+    return _to_local(opens)
+
+
+def market_expires_at(now: datetime = None) -> datetime:
+    """
+    Caducidad de las cotizaciones: unos minutos en sesión; fuera de ella, hasta la próxima apertura
+    """
+    now = now or datetime.now()
+    if market_is_open(now):
+        return now + MARKET_INTRADAY_TTL
+    return next_market_open(now)
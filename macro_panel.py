@@ -0,0 +1,245 @@
+"""
+PANEL MACRO ALINEADO
+Modelo de datos único en memoria: tipos, indicadores macro y mercados sobre
+un calendario común de días hábiles, en bloques columnares con uniones as-of
+precalculadas y lecturas sin copia
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Tipo numérico de los bloques (float32 reduce memoria a la mitad)
+DEFAULT_DTYPE = np.dtype(os.environ.get('MACRO_PANEL_DTYPE', 'float64'))
+
+# Frecuencia nominal según la separación mediana entre observaciones (días)
+FREQUENCY_GAPS = [(4, 'D'), (10, 'W'), (40, 'M'), (120, 'Q')]
+
+
+def infer_frequency(index: pd.DatetimeIndex) -> str:
+    """
+    Frecuencia nominal de una serie: 'D', 'W', 'M', 'Q' o 'A'
+    """
+    if len(index) < 2:
+        return 'D'
+    gap = np.median(np.diff(index.as_unit('ns').asi8)) / 86_400e9
+    for limit, frequency in FREQUENCY_GAPS:
+        if gap <= limit:
+            return frequency
+    return 'A'
+
+
+@dataclass(frozen=True)
+class ColumnInfo:
+    """
+    Metadatos de una columna del panel
+    """
+    group: str
+    name: str
+    frequency: str
+    first_date: Optional[pd.Timestamp]
+    last_date: Optional[pd.Timestamp]
+    observations: int
+
+
+class MacroPanel:
+    """
+    Panel columnar alineado a un calendario de días hábiles
+
+    Cada grupo ('rates', 'macro', 'markets') es un único array 2-D en orden
+    Fortran (columnas contiguas), de modo que una columna o un tramo de
+    fechas es una vista sin copia. El valor de cada día es el de la última
+    observación con fecha <= ese día (unión as-of por fecha de observación,
+    no de publicación). Las series originales se conservan en `native`.
+    """
+
+    def __init__(self, index: pd.DatetimeIndex, blocks: Dict[str, np.ndarray],
+                 observed: Dict[str, np.ndarray], columns: Dict[str, List[str]],
+                 natives: Dict[str, Dict[str, pd.Series]], info: Dict[str, Dict[str, ColumnInfo]]):
+        self.index = index
+        self._blocks = blocks
+        self._observed = observed
+        self._columns = columns
+        self._natives = natives
+        self._info = info
+        self.version = self._hash()
+
+    def _hash(self) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.index.asi8.tobytes())
+        for group in sorted(self._blocks):
+            digest.update(group.encode())
+            digest.update('\x1f'.join(self._columns[group]).encode())
+            digest.update(np.ascontiguousarray(self._blocks[group]).tobytes())
+        return digest.hexdigest()
+
+    # ── Estructura ──────────────────────────────────────────────────────────
+
+    @property
+    def groups(self) -> List[str]:
+        return list(self._blocks)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return next(iter(self._blocks.values())).dtype if self._blocks else DEFAULT_DTYPE
+
+    @property
+    def nbytes(self) -> int:
+        return sum(block.nbytes for block in self._blocks.values())
+
+    def columns(self, group: str) -> List[str]:
+        return list(self._columns.get(group, []))
+
+    def has(self, group: str, name: str) -> bool:
+        return name in self._columns.get(group, [])
+
+    def info(self, group: str, name: str) -> ColumnInfo:
+        return self._info[group][name]
+
+    # ── Lecturas sin copia ──────────────────────────────────────────────────
+
+    def _rows(self, start=None, end=None) -> slice:
+        first = 0 if start is None else self.index.searchsorted(pd.Timestamp(start), side='left')
+        last = len(self.index) if end is None else self.index.searchsorted(pd.Timestamp(end), side='right')
+        return slice(first, last)
+
+    def frame(self, group: str, start=None, end=None) -> pd.DataFrame:
+        """
+        Vista DataFrame de un grupo (sin copia) entre start y end incluidos
+        """
+        if group not in self._blocks:
+            return pd.DataFrame()
+        rows = self._rows(start, end)
+        return pd.DataFrame(self._blocks[group][rows], index=self.index[rows],
+                            columns=self._columns[group], copy=False)
+
+    def column(self, group: str, name: str, start=None, end=None) -> pd.Series:
+        """
+        Vista Series de una columna alineada al calendario (sin copia)
+        """
+        rows = self._rows(start, end)
+        j = self._columns[group].index(name)
+        return pd.Series(self._blocks[group][rows, j], index=self.index[rows], name=name, copy=False)
+
+    def native(self, group: str, name: str) -> pd.Series:
+        """
+        Serie original en su propia frecuencia (solo observaciones válidas)
+        """
+        return self._natives.get(group, {}).get(name, pd.Series(dtype=float))
+
+    def latest(self, group: str, name: str) -> float:
+        """
+        Última observación de una columna (NaN si no hay datos)
+        """
+        series = self.native(group, name)
+        return float(series.iloc[-1]) if len(series) > 0 else np.nan
+
+    def observed(self, group: str, start=None, end=None) -> pd.DataFrame:
+        """
+        Grupo con NaN en los días sin observación propia (p. ej. festivos de mercado)
+
+        A diferencia de `frame`, devuelve una copia: sirve para cálculos que no
+        deben ver los valores arrastrados, como las rentabilidades diarias.
+        """
+        if group not in self._blocks:
+            return pd.DataFrame()
+        rows = self._rows(start, end)
+        values = np.where(self._observed[group][rows], self._blocks[group][rows], np.nan)
+        return pd.DataFrame(values, index=self.index[rows], columns=self._columns[group], copy=False)
+
+
+def build_panel(sources: Dict[str, Dict[str, pd.Series]], dtype=None) -> MacroPanel:
+    """
+    Construye el panel a partir de {grupo: {nombre: serie}}
+
+    El calendario son los días hábiles entre la primera y la última
+    observación de todas las series. Las posiciones as-of de cada columna
+    se calculan con una búsqueda binaria vectorizada sobre sus fechas.
+    """
+    dtype = np.dtype(dtype or DEFAULT_DTYPE)
+
+    natives = {
+        group: {name: series.dropna().sort_index() for name, series in series_map.items()
+                if series is not None and len(series.dropna()) > 0}
+        for group, series_map in sources.items()
+    }
+
+    dates = [s.index for group in natives.values() for s in group.values()]
+    if dates:
+        start = min(idx[0] for idx in dates).normalize()
+        end = max(idx[-1] for idx in dates).normalize()
+        index = pd.bdate_range(start, end).as_unit('ns')
+    else:
+        index = pd.DatetimeIndex([], dtype='datetime64[ns]')
+    calendar = index.asi8
+
+    blocks, observed, columns, info = {}, {}, {}, {}
+    for group, series_map in natives.items():
+        names = list(series_map)
+        block = np.full((len(index), len(names)), np.nan, dtype=dtype, order='F')
+        mask = np.zeros((len(index), len(names)), dtype=bool, order='F')
+        info[group] = {}
+
+        for j, name in enumerate(names):
+            series = series_map[name]
+            stamps = series.index.normalize().as_unit('ns').asi8
+            pos = np.searchsorted(stamps, calendar, side='right') - 1
+            valid = pos >= 0
+            block[valid, j] = series.to_numpy(dtype=float)[pos[valid]]
+            # Día con observación propia: la posición as-of cambia respecto al día anterior
+            mask[:, j] = valid & (np.diff(pos, prepend=-1) != 0)
+
+            info[group][name] = ColumnInfo(
+                group=group, name=name,
+                frequency=infer_frequency(series.index),
+                first_date=series.index[0], last_date=series.index[-1],
+                observations=int(len(series))
+            )
+
+        blocks[group] = block
+        observed[group] = mask
+        columns[group] = names
+
+    return MacroPanel(index, blocks, observed, columns, natives, info)
+
+
+def group_series(group: str, source) -> Dict[str, pd.Series]:
+    """
+    Series {nombre: serie} de un grupo a partir de su fuente
+
+    'rates' es un DataFrame de tipos, 'markets' un dict de OHLCV (se usa el
+    cierre) y el resto un dict de series.
+    """
+    if group == 'rates':
+        return {name: source[name] for name in source.columns}
+    if group == 'markets':
+        return {name: df['Close'] for name, df in source.items() if 'Close' in df.columns}
+    return dict(source)
+
+
+def group_fingerprint(group: str, source) -> str:
+    """
+    Huella del contenido de la fuente de un grupo (cambia con cualquier observación nueva o revisada)
+    """
+    digest = hashlib.blake2b(group.encode(), digest_size=16)
+    for name, series in sorted(group_series(group, source).items()):
+        digest.update(name.encode())
+        if series is not None and len(series) > 0:
+            digest.update(pd.util.hash_pandas_object(series).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def panel_from_sources(interest_rates: pd.DataFrame, macro_indicators: Dict[str, pd.Series],
+                       market_data: Dict[str, pd.DataFrame], dtype=None) -> MacroPanel:
+    """
+    Panel de los datos base: curva de tipos, indicadores macro y cierres de mercado
+    """
+    return build_panel({
+        'rates': group_series('rates', interest_rates),
+        'macro': group_series('macro', macro_indicators),
+        'markets': group_series('markets', market_data)
+    }, dtype)
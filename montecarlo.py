@@ -0,0 +1,450 @@
+"""
+SIMULACIÓN MONTE CARLO DE TIPOS DE INTERÉS
+Trayectorias correlacionadas de la curva (Fed Funds / Treasuries) con un
+modelo AR(1) mensual (Vasicek discreto), totalmente vectorizado en NumPy
+y repartido en bloques sobre un pool de procesos
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Percentiles por defecto de las bandas del fan chart
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Trayectorias por bloque: fija el reparto de semillas, no depende del nº de procesos
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Resolución de los histogramas de reducción (puntos porcentuales = 0.5 pb)
+HISTOGRAM_BIN_WIDTH = 0.005
+
+# Margen del histograma alrededor de los niveles actuales (puntos porcentuales)
+HISTOGRAM_MARGIN = 15.0
+
+# Observaciones mensuales mínimas para estimar el modelo
+MIN_MONTHLY_OBS = 12
+
+
+@dataclass
+class RateModel:
+    """
+    Modelo AR(1) multivariante estimado sobre datos mensuales
+
+    x[t+1] = intercept + coef * x[t] + e[t+1],  e ~ N(0, L L')
+
+    Es la discretización mensual de un Vasicek por serie: la reversión a la
+    media es 1 - coef y el nivel de largo plazo intercept / (1 - coef). Los
+    residuos se guardan para poder simular también por bootstrap.
+    """
+    columns: list
+    last: np.ndarray        # (n_series,) último nivel observado
+    last_date: pd.Timestamp
+    intercept: np.ndarray   # (n_series,)
+    coef: np.ndarray        # (n_series,)
+    chol: np.ndarray        # (n_series, n_series) factor de Cholesky de la covarianza
+    residuals: np.ndarray   # (n_obs, n_series) residuos históricos conjuntos
+
+
+def fit_rate_model(df: pd.DataFrame) -> RateModel:
+    """
+    Estima el modelo sobre el último dato de cada mes de las series de tipos
+    """
+    monthly = df.resample('MS').last().dropna()
+    if len(monthly) < MIN_MONTHLY_OBS:
+        raise ValueError(f"Se necesitan al menos {MIN_MONTHLY_OBS} meses de datos para simular")
+
+    values = monthly.to_numpy(dtype=float)
+    x_prev, x_next = values[:-1], values[1:]
+
+    # Regresión x[t+1] ~ x[t] por serie, todas a la vez
+    prev_mean, next_mean = x_prev.mean(axis=0), x_next.mean(axis=0)
+    prev_c = x_prev - prev_mean
+    var = (prev_c ** 2).sum(axis=0)
+    coef = np.divide((prev_c * (x_next - next_mean)).sum(axis=0), var,
+                     out=np.ones_like(var), where=var > 0)
+
+    # Coeficiente en [0, 1]: sin oscilaciones ni trayectorias explosivas
+    coef = np.clip(coef, 0.0, 1.0)
+    intercept = next_mean - coef * prev_mean
+
+    residuals = x_next - (intercept + coef * x_prev)
+    cov = np.atleast_2d(np.cov(residuals, rowvar=False))
+
+    # Pequeño jitter por si la covarianza es casi singular (series muy colineales)
+    jitter = 1e-10 * max(np.trace(cov), 1e-12)
+    chol = np.linalg.cholesky(cov + jitter * np.eye(len(cov)))
+
+    return RateModel(
+        columns=list(monthly.columns),
+        last=df.ffill().iloc[-1].to_numpy(dtype=float),
+        last_date=df.index[-1],
+        intercept=intercept,
+        coef=coef,
+        chol=chol,
+        residuals=residuals
+    )
+
+
+def draw_shocks(model: RateModel, rng: np.random.Generator, n_paths: int,
+                horizon: int, method: str = 'gaussian') -> np.ndarray:
+    """
+    Innovaciones (horizon, n_series, n_paths) correlacionadas entre series
+
+    - 'gaussian': normales con la covarianza histórica de los residuos
+    - 'bootstrap': filas completas de residuos históricos remuestreadas
+      (conserva colas gruesas y la correlación observada)
+
+    Las trayectorias van en el último eje para que cada paso temporal y cada
+    reducción por percentiles trabajen sobre memoria contigua.
+    """
+    n_series = len(model.columns)
+
+    if method == 'bootstrap':
+        idx = rng.integers(0, len(model.residuals), size=(horizon, n_paths))
+        return np.ascontiguousarray(model.residuals[idx].transpose(0, 2, 1))
+
+    if method == 'gaussian':
+        z = rng.standard_normal((horizon, n_series, n_paths))
+        return np.matmul(model.chol, z)
+
+    raise ValueError(f"Método de simulación desconocido: {method}")
+
+
+def simulate_rate_paths(model: RateModel, horizon: int = 12, n_paths: int = 10_000,
+                        seed: int = None, method: str = 'gaussian',
+                        floor: float = 0.0) -> np.ndarray:
+    """
+    Simula trayectorias mensuales de todas las series a la vez
+
+    Devuelve un array (horizon, n_series, n_paths). Con `seed` fijo el
+    resultado es reproducible. `floor` acota los tipos por abajo (None para
+    permitir tipos negativos).
+    """
+    rng = np.random.default_rng(seed)
+    paths = draw_shocks(model, rng, n_paths, horizon, method)
+
+    intercept = model.intercept[:, None]
+    coef = model.coef[:, None]
+
+    # Recursión AR(1) in-place sobre el array de shocks: un paso por mes
+    level = np.broadcast_to(model.last[:, None], paths.shape[1:])
+    for h in range(horizon):
+        level = paths[h] + intercept + coef * level
+        if floor is not None:
+            np.maximum(level, floor, out=level)
+        paths[h] = level
+
+    return paths
+
+
+def projection_index(model: RateModel, horizon: int) -> pd.DatetimeIndex:
+    """
+    Fechas mensuales de la proyección (mismo calendario que forecast_interest_rates)
+    """
+    return pd.date_range(
+        start=model.last_date + pd.Timedelta(days=30),
+        periods=horizon,
+        freq='MS'
+    )
+
+
+def fan_bands(paths: np.ndarray, index: pd.DatetimeIndex, columns: Sequence[str],
+              percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[float, pd.DataFrame]:
+    """
+    Percentiles por mes y serie: {percentil: DataFrame(horizon x n_series)}
+    `paths` con la forma de simulate_rate_paths: (horizon, n_series, n_paths)
+    """
+    bands = np.percentile(paths, percentiles, axis=-1)
+    return {
+        p: pd.DataFrame(band, index=index, columns=list(columns))
+        for p, band in zip(percentiles, bands)
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REDUCCIÓN EN STREAMING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class StreamingQuantileReducer:
+    """
+    Resumen de memoria constante de la distribución de cada celda (mes, serie)
+
+    Consume bloques de trayectorias (..., n_paths) y mantiene por celda:
+    - un histograma de rejilla fija [low, high) con paso bin_width, del que
+      salen los percentiles con error máximo de un ancho de bin
+    - media y varianza en streaming (Welford / Chan, numéricamente estables)
+    - mínimo y máximo exactos, que acotan los valores fuera de la rejilla
+
+    La memoria depende solo del nº de celdas y de bins, no del nº de
+    trayectorias. Dos reductores con la misma rejilla se combinan con
+    `merge`; los conteos son enteros, así que la combinación no depende del
+    orden y los percentiles son reproducibles bit a bit.
+    """
+
+    def __init__(self, shape: tuple, low: float, high: float,
+                 bin_width: float = HISTOGRAM_BIN_WIDTH):
+        self.shape = tuple(shape)
+        self.low = float(low)
+        self.bin_width = float(bin_width)
+        self.n_bins = int(round((high - low) / bin_width))
+
+        self.counts = np.zeros(self.shape + (self.n_bins,), dtype=np.int64)
+        self.n = 0
+        self.mean = np.zeros(self.shape)
+        self.m2 = np.zeros(self.shape)
+        self.min = np.full(self.shape, np.inf)
+        self.max = np.full(self.shape, -np.inf)
+        self.out_of_range = 0
+
+    @property
+    def high(self) -> float:
+        return self.low + self.n_bins * self.bin_width
+
+    def update(self, block: np.ndarray) -> 'StreamingQuantileReducer':
+        """
+        Incorpora un bloque de trayectorias con forma shape + (n,)
+        """
+        n_block = block.shape[-1]
+        if n_block == 0:
+            return self
+
+        # Histograma: un único bincount sobre índices (celda, bin) aplanados
+        bins = np.floor((block - self.low) / self.bin_width).astype(np.int64)
+        self.out_of_range += int(np.count_nonzero((bins < 0) | (bins >= self.n_bins)))
+        np.clip(bins, 0, self.n_bins - 1, out=bins)
+        n_cells = int(np.prod(self.shape))
+        bins += (np.arange(n_cells, dtype=np.int64) * self.n_bins).reshape(self.shape + (1,))
+        self.counts += np.bincount(bins.ravel(), minlength=n_cells * self.n_bins).reshape(self.counts.shape)
+
+        # Momentos del bloque y combinación de Chan con los acumulados
+        block_mean = block.mean(axis=-1)
+        block_m2 = np.square(block - block_mean[..., None]).sum(axis=-1)
+        self._combine(n_block, block_mean, block_m2)
+
+        np.minimum(self.min, block.min(axis=-1), out=self.min)
+        np.maximum(self.max, block.max(axis=-1), out=self.max)
+        return self
+
+    def merge(self, other: 'StreamingQuantileReducer') -> 'StreamingQuantileReducer':
+        """
+        Combina otro reductor con la misma rejilla (p. ej. el de otro proceso)
+        """
+        if (other.shape, other.low, other.bin_width, other.n_bins) != \
+                (self.shape, self.low, self.bin_width, self.n_bins):
+            raise ValueError("Los reductores deben compartir forma y rejilla para combinarse")
+
+        self.counts += other.counts
+        self.out_of_range += other.out_of_range
+        self._combine(other.n, other.mean, other.m2)
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+        return self
+
+    def _combine(self, n_other: int, mean_other: np.ndarray, m2_other: np.ndarray):
+        if n_other == 0:
+            return
+        n_total = self.n + n_other
+        delta = mean_other - self.mean
+        self.mean = self.mean + delta * (n_other / n_total)
+        self.m2 = self.m2 + m2_other + np.square(delta) * (self.n * n_other / n_total)
+        self.n = n_total
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self.m2 / max(self.n - 1, 1)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+    @property
+    def max_error(self) -> float:
+        """
+        Cota del error de los percentiles (infinita si hubo valores fuera de la rejilla)
+        """
+        return self.bin_width if self.out_of_range == 0 else np.inf
+
+    def quantiles(self, percentiles: Sequence[float]) -> np.ndarray:
+        """
+        Percentiles por celda con interpolación lineal dentro del bin
+        Devuelve (len(percentiles),) + shape.
+        """
+        cum = np.cumsum(self.counts, axis=-1)
+        total = cum[..., -1:]
+
+        result = []
+        for p in percentiles:
+            target = p / 100.0 * total
+            idx = np.minimum((cum < target).sum(axis=-1, keepdims=True), self.n_bins - 1)
+            in_bin = np.take_along_axis(self.counts, idx, axis=-1)
+            before = np.take_along_axis(cum, idx, axis=-1) - in_bin
+            frac = np.clip((target - before) / np.maximum(in_bin, 1), 0.0, 1.0)
+            value = (self.low + (idx + frac) * self.bin_width)[..., 0]
+
+            # Los bins extremos acumulan lo que cae fuera: acotar con el mínimo/máximo exactos
+            result.append(np.clip(value, self.min, self.max))
+
+        return np.stack(result)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# EJECUCIÓN EN BLOQUES MULTIPROCESO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def new_reducer(model: RateModel, horizon: int, floor: float = 0.0) -> StreamingQuantileReducer:
+    """
+    Reductor con la rejilla común de una simulación: niveles actuales ± HISTOGRAM_MARGIN
+    """
+    low = np.floor(model.last.min() - HISTOGRAM_MARGIN)
+    if floor is not None:
+        low = max(low, floor)
+    high = np.ceil(model.last.max() + HISTOGRAM_MARGIN)
+    return StreamingQuantileReducer((horizon, len(model.columns)), low, high)
+
+
+def _simulate_chunk(model: RateModel, horizon: int, n_paths: int,
+                    seed_seq: np.random.SeedSequence, method: str,
+                    floor: Optional[float]) -> StreamingQuantileReducer:
+    """
+    Simula un bloque y lo reduce en el propio proceso
+
+    Solo viaja de vuelta el reductor (histogramas y momentos), nunca la
+    matriz de trayectorias.
+    """
+    paths = simulate_rate_paths(model, horizon, n_paths, seed_seq, method, floor)
+    return new_reducer(model, horizon, floor).update(paths)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(n_workers: int) -> ProcessPoolExecutor:
+    """
+    Pool de procesos compartido (spawn: seguro aunque el proceso padre tenga hilos)
+
+    Se recrea si cambia el nº de procesos o si el pool quedó roto (un proceso
+    murió por falta de memoria o no pudo arrancar).
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != n_workers or getattr(_pool, '_broken', False):
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=n_workers,
+                                        mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = n_workers
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Descarta un pool roto para que la próxima llamada cree otro
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_chunked_simulation(model: RateModel, horizon: int = 12, n_paths: int = 10_000,
+                           seed: int = None, method: str = 'gaussian', floor: float = 0.0,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           n_workers: int = None) -> StreamingQuantileReducer:
+    """
+    Simula n_paths trayectorias en bloques de chunk_size sobre un pool de procesos
+
+    Cada bloque recibe su propio hijo de np.random.SeedSequence(seed) y se
+    reduce dentro del proceso que lo simula (el nº de procesos por defecto
+    es MC_WORKERS o el de CPUs). Como el reparto en bloques depende solo de
+    n_paths y chunk_size, y los reductores se combinan siempre en orden de
+    bloque, el resultado es idéntico bit a bit para una semilla dada sea
+    cual sea el número de procesos. La memoria está acotada por chunk_size.
+    """
+    n_workers = n_workers or int(os.environ.get('MC_WORKERS', 0)) or os.cpu_count() or 1
+    sizes = [chunk_size] * (n_paths // chunk_size)
+    if n_paths % chunk_size:
+        sizes.append(n_paths % chunk_size)
+
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(model, horizon, size, seq, method, floor) for size, seq in zip(sizes, seeds)]
+
+    total = None
+    if n_workers > 1 and len(sizes) > 1:
+        # Pool roto: se recrea una vez y, si vuelve a fallar, se simula en este proceso.
+        # Las semillas de cada bloque no cambian, así que el resultado tampoco
+        for _ in range(2):
+            pool = _get_pool(min(n_workers, len(sizes)))
+            try:
+                total = _reduce_chunks(model, horizon, floor, pool.map(_simulate_chunk, *zip(*args)))
+                break
+            except BrokenProcessPool:
+                _discard_pool(pool)
+
+    if total is None:
+        total = _reduce_chunks(model, horizon, floor, (_simulate_chunk(*a) for a in args))
+    return total
+
+
+def _reduce_chunks(model: RateModel, horizon: int, floor: Optional[float],
+                   chunks: Iterable[StreamingQuantileReducer]) -> StreamingQuantileReducer:
+    """
+    Reducción en streaming y en orden de bloque
+    """
+    total = new_reducer(model, horizon, floor)
+    for chunk in chunks:
+        total.merge(chunk)
+    return total
+
+
+def simulate_rate_distribution(df: pd.DataFrame, horizon: int = 12, n_paths: int = 10_000,
+                               seed: int = None, method: str = 'gaussian',
+                               percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                               n_workers: int = None,
+                               chunk_size: int = DEFAULT_CHUNK_SIZE
+                               ) -> Tuple[Dict[float, pd.DataFrame], pd.DataFrame, pd.DataFrame]:
+    """
+    Estima el modelo, simula en bloques y resume la distribución por mes y serie
+
+    Devuelve (bandas {percentil: DataFrame}, media, desviación típica).
+    """
+    model = fit_rate_model(df)
+    reducer = run_chunked_simulation(model, horizon, n_paths, seed, method,
+                                     chunk_size=chunk_size, n_workers=n_workers)
+
+    index = projection_index(model, horizon)
+    bands = {
+        p: pd.DataFrame(band, index=index, columns=model.columns)
+        for p, band in zip(percentiles, reducer.quantiles(percentiles))
+    }
+    mean = pd.DataFrame(reducer.mean, index=index, columns=model.columns)
+    std = pd.DataFrame(reducer.std, index=index, columns=model.columns)
+    return bands, mean, std
+
+
+def simulate_rate_fan(df: pd.DataFrame, horizon: int = 12, n_paths: int = 10_000,
+                      seed: int = None, method: str = 'gaussian',
+                      percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                      n_workers: int = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[float, pd.DataFrame]:
+    """
+    Bandas de percentiles para los gráficos (ver simulate_rate_distribution)
+    """
+    return simulate_rate_distribution(df, horizon, n_paths, seed, method, percentiles,
+                                      n_workers, chunk_size)[0]
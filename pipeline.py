@@ -0,0 +1,268 @@
+"""
+PIPELINE SIN INTERFAZ
+Descarga → cálculo → exportación con el mismo motor que el dashboard, sin
+Streamlit, para trabajos programados u otros servicios:
+    python pipeline.py --output resultados/ [--years 5] [--format parquet|json]
+"""
+
+import argparse
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analytics import calculate_recession_probability_history, calculate_yield_curve_slope, forecast_interest_rates
+from correlation import DEFAULT_HALFLIFE, CorrelationEngine
+from data_fetch import default_start_date, fetch_fred_batch, load_market_batch
+from derived_metrics import DerivedMetrics
+from macro_panel import MacroPanel, panel_from_sources
+from montecarlo import simulate_rate_distribution
+from series_catalog import MACRO_SERIES, MARKET_TICKERS, RATE_SERIES
+from series_store import PER_SERIES_TTL
+
+logger = logging.getLogger(__name__)
+
+# Histórico adicional de indicadores macro para calcular variaciones interanuales
+MACRO_LOOKBACK_YEARS = 1
+
+# Parámetros por defecto (los mismos que el sidebar del dashboard)
+DEFAULT_YEARS = 5
+DEFAULT_FORECAST_MONTHS = 12
+DEFAULT_MC_PATHS = 50_000
+DEFAULT_MC_SEED = 42
+DEFAULT_CORRELATION_WINDOW = 90
+
+EXPORT_FORMATS = ('parquet', 'json')
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DATOS BASE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def load_interest_rates(years: int = DEFAULT_YEARS,
+                        max_age: Optional[timedelta] = PER_SERIES_TTL,
+                        stale_while_revalidate: bool = True) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """
+    Curva de tipos (Fed Funds + Treasuries) en un DataFrame sin huecos, y errores por serie
+    """
+    rates, errors = fetch_fred_batch(RATE_SERIES, start_date=default_start_date(years), max_age=max_age,
+                                     stale_while_revalidate=stale_while_revalidate)
+    return pd.DataFrame({name: rates[name] for name in RATE_SERIES}).dropna(), errors
+
+
+def load_macro_indicators(years: int = DEFAULT_YEARS,
+                          max_age: Optional[timedelta] = PER_SERIES_TTL,
+                          stale_while_revalidate: bool = True) -> Tuple[Dict[str, pd.Series], Dict[str, str]]:
+    """
+    Indicadores macro con un año extra para que las variaciones interanuales cubran el período
+    """
+    return fetch_fred_batch(MACRO_SERIES, start_date=default_start_date(years + MACRO_LOOKBACK_YEARS),
+                            max_age=max_age, stale_while_revalidate=stale_while_revalidate)
+
+
+def load_market_data(years: int = DEFAULT_YEARS,
+                     max_age: Optional[timedelta] = PER_SERIES_TTL,
+                     stale_while_revalidate: bool = True) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+    """
+    OHLCV de los tickers de mercado; los que fallan no se incluyen
+    """
+    data, errors = load_market_batch(MARKET_TICKERS, start_date=default_start_date(years), max_age=max_age,
+                                     stale_while_revalidate=stale_while_revalidate)
+    return {name: df for name, df in data.items() if name not in errors}, errors
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CÁLCULO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class PipelineResult:
+    """
+    Datos base y resultados de una ejecución del pipeline
+    """
+    settings: Dict
+    interest_rates: pd.DataFrame
+    macro_indicators: Dict[str, pd.Series]
+    market_data: Dict[str, pd.DataFrame]
+    panel: MacroPanel
+    metrics: DerivedMetrics
+    forecast: pd.DataFrame
+    rate_bands: Optional[Dict[float, pd.DataFrame]]
+    rate_mean: Optional[pd.DataFrame]
+    recession_history: pd.DataFrame
+    correlation: pd.DataFrame
+    yield_slope: float
+    recession_probability: float
+    errors: Dict[str, str] = field(default_factory=dict)
+    generated_at: datetime = field(default_factory=datetime.now)
+
+    def tables(self) -> Dict[str, pd.DataFrame]:
+        """
+        Resultados tabulares listos para exportar ({nombre: DataFrame})
+        """
+        tables = {
+            'interest_rates': self.interest_rates,
+            'macro_indicators': pd.DataFrame(self.macro_indicators),
+            'market_close': self.panel.frame('markets') if 'markets' in self.panel.groups else pd.DataFrame(),
+            'forecast': self.forecast,
+            'recession_history': self.recession_history,
+            'correlation': self.correlation,
+        }
+        if self.rate_bands:
+            tables['rate_fan'] = pd.concat(
+                {f"p{p:g}": band for p, band in self.rate_bands.items()}, axis=1, names=['percentile', 'series']
+            )
+        return tables
+
+    def summary(self) -> Dict:
+        """
+        Resumen serializable a JSON: parámetros, versión de datos y últimos valores
+        """
+        def _clean(value):
+            value = float(value)
+            return value if np.isfinite(value) else None
+
+        return {
+            'generated_at': self.generated_at.isoformat(timespec='seconds'),
+            'settings': self.settings,
+            'data_version': self.panel.version,
+            'yield_slope': _clean(self.yield_slope),
+            'recession_probability': _clean(self.recession_probability),
+            'latest': {
+                group: {name: _clean(self.metrics.level(group, name)) for name in self.panel.columns(group)}
+                for group in self.panel.groups
+            },
+            'latest_yoy': {name: _clean(self.metrics.latest_yoy(name)) for name in self.panel.columns('macro')},
+            'forecast_end': {name: _clean(value) for name, value in self.forecast.iloc[-1].items()}
+                            if len(self.forecast) > 0 else {},
+            'errors': self.errors,
+        }
+
+
+def run_pipeline(years: int = DEFAULT_YEARS,
+                 forecast_months: int = DEFAULT_FORECAST_MONTHS,
+                 mc_paths: int = DEFAULT_MC_PATHS,
+                 mc_seed: int = DEFAULT_MC_SEED,
+                 mc_method: str = 'gaussian',
+                 correlation_window: int = DEFAULT_CORRELATION_WINDOW,
+                 max_age: Optional[timedelta] = PER_SERIES_TTL) -> PipelineResult:
+    """
+    Descarga los datos base (o los lee del almacén) y calcula todo lo que muestra el dashboard
+
+    A diferencia de la app, no se sirven datos caducados mientras se revalidan:
+    la ejecución espera a tener las series al día según max_age.
+    """
+    interest_rates, rate_errors = load_interest_rates(years, max_age, stale_while_revalidate=False)
+    macro_indicators, macro_errors = load_macro_indicators(years, max_age, stale_while_revalidate=False)
+    market_data, market_errors = load_market_data(years, max_age, stale_while_revalidate=False)
+    errors = {**rate_errors, **macro_errors, **market_errors}
+    for name, message in errors.items():
+        logger.warning("Error obteniendo %s: %s", name, message)
+
+    panel = panel_from_sources(interest_rates, macro_indicators, market_data)
+
+    try:
+        rate_bands, rate_mean, _ = simulate_rate_distribution(interest_rates, forecast_months, mc_paths,
+                                                              mc_seed, mc_method)
+    except ValueError as e:
+        logger.warning("Simulación Monte Carlo omitida: %s", e)
+        rate_bands, rate_mean = None, None
+
+    recession_history = calculate_recession_probability_history(macro_indicators, interest_rates)
+    correlation = CorrelationEngine(window=correlation_window, halflife=DEFAULT_HALFLIFE) \
+        .update(panel.observed('markets') if 'markets' in panel.groups else pd.DataFrame()).matrix()
+
+    return PipelineResult(
+        settings={
+            'years': years, 'forecast_months': forecast_months, 'mc_paths': mc_paths,
+            'mc_seed': mc_seed, 'mc_method': mc_method, 'correlation_window': correlation_window,
+        },
+        interest_rates=interest_rates,
+        macro_indicators=macro_indicators,
+        market_data=market_data,
+        panel=panel,
+        metrics=DerivedMetrics(panel),
+        forecast=forecast_interest_rates(interest_rates, forecast_months),
+        rate_bands=rate_bands,
+        rate_mean=rate_mean,
+        recession_history=recession_history,
+        correlation=correlation,
+        yield_slope=calculate_yield_curve_slope(interest_rates) if len(interest_rates) > 0 else np.nan,
+        recession_probability=float(recession_history['probability'].iloc[-1]) if len(recession_history) > 0 else 0.0,
+        errors=errors,
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# EXPORTACIÓN
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _flatten_columns(frame: pd.DataFrame) -> pd.DataFrame:
+    if isinstance(frame.columns, pd.MultiIndex):
+        frame = frame.copy()
+        frame.columns = [":".join(str(level) for level in col) for col in frame.columns]
+    return frame
+
+
+def export_results(result: PipelineResult, output_dir, fmt: str = 'parquet') -> List[Path]:
+    """
+    Escribe cada tabla en output_dir (Parquet o JSON orient='split') más summary.json
+
+    Devuelve las rutas escritas.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt} (usa {', '.join(EXPORT_FORMATS)})")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    written = []
+    for name, table in result.tables().items():
+        table = _flatten_columns(table)
+        path = output_dir / f"{name}.{fmt}"
+        if fmt == 'parquet':
+            table.to_parquet(path)
+        else:
+            table.to_json(path, orient='split', date_format='iso')
+        written.append(path)
+
+    summary_path = output_dir / 'summary.json'
+    summary_path.write_text(json.dumps(result.summary(), indent=2, ensure_ascii=False))
+    written.append(summary_path)
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pipeline macro sin interfaz: descarga, cálculo y exportación")
+    parser.add_argument('--output', '-o', default='resultados', help="directorio de salida")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='parquet')
+    parser.add_argument('--years', type=int, default=DEFAULT_YEARS, help="años de histórico")
+    parser.add_argument('--forecast-months', type=int, default=DEFAULT_FORECAST_MONTHS)
+    parser.add_argument('--mc-paths', type=int, default=DEFAULT_MC_PATHS)
+    parser.add_argument('--mc-seed', type=int, default=DEFAULT_MC_SEED)
+    parser.add_argument('--mc-method', choices=('gaussian', 'bootstrap'), default='gaussian')
+    parser.add_argument('--correlation-window', type=int, default=DEFAULT_CORRELATION_WINDOW)
+    parser.add_argument('--refresh', action='store_true', help="comprueba todas las series contra la fuente")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    result = run_pipeline(
+        years=args.years,
+        forecast_months=args.forecast_months,
+        mc_paths=args.mc_paths,
+        mc_seed=args.mc_seed,
+        mc_method=args.mc_method,
+        correlation_window=args.correlation_window,
+        max_age=timedelta(0) if args.refresh else PER_SERIES_TTL,
+    )
+    for path in export_results(result, args.output, args.format):
+        logger.info("Escrito %s", path)
+
+
+if __name__ == '__main__':
+    main()
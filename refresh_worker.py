@@ -0,0 +1,239 @@
+"""
+REFRESCO EN SEGUNDO PLANO
+Mantiene al día el almacén local según la frecuencia de publicación de cada
+serie (tipos diarios, CPI mensual, PIB trimestral, mercados intradía), para
+que las páginas lean siempre datos ya descargados
+
+Se ejecuta como hilo dentro de la app o como proceso aparte:
+    python refresh_worker.py [--once]
+"""
+
+import argparse
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from data_fetch import default_start_date, fetch_fred_batch, load_market_batch
+from freshness import CHECK_INTERVALS, MARKET_INTRADAY_TTL
+from macro_panel import infer_frequency
+from series_catalog import MACRO_SERIES, MARKET_TICKERS, RATE_SERIES
+from series_store import SeriesStore, get_default_store
+
+logger = logging.getLogger(__name__)
+
+# Histórico que se mantiene: período de análisis máximo + un año para variaciones interanuales
+REFRESH_HISTORY_YEARS = 11
+
+# Espera tras un fallo antes de reintentar
+RETRY_DELAY = timedelta(minutes=5)
+
+# Cada cuánto se renueva la señal de vida (segundos)
+HEARTBEAT_SECONDS = 30.0
+
+
+@dataclass
+class RefreshJob:
+    """
+    Estado de refresco de una serie FRED o del lote de tickers de mercado
+    """
+    source: str                 # 'fred' o 'yahoo'
+    name: str
+    key: str                    # series_id o '*' para el lote de mercado
+    frequency: str = 'D'
+    next_due: datetime = field(default_factory=datetime.now)
+    last_success: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+    def interval(self) -> timedelta:
+        """
+        Intervalo de reserva si el almacén no tiene caducidad para la serie
+        """
+        if self.source == 'yahoo':
+            return MARKET_INTRADAY_TTL
+        return CHECK_INTERVALS.get(self.frequency, CHECK_INTERVALS['D'])
+
+
+class RefreshWorker:
+    """
+    Planificador de refrescos sobre un SeriesStore
+
+    En cada vuelta comprueba, en un solo lote, las series FRED vencidas y,
+    si toca, los tickers de mercado. El próximo vencimiento de cada trabajo
+    es la caducidad que la política de frescura dejó en el almacén
+    (frecuencia y última publicación en FRED, horario de mercado en Yahoo).
+    Las tablas se escriben de forma atómica y, si alguna cambió, se publica
+    una nueva generación del almacén para que la app invalide sus cachés.
+    """
+
+    def __init__(self, store: SeriesStore = None,
+                 fred_series: Dict[str, str] = None,
+                 tickers: Dict[str, str] = None,
+                 history_years: int = REFRESH_HISTORY_YEARS):
+        self.store = store or get_default_store()
+        self.history_years = history_years
+        self.tickers = dict(MARKET_TICKERS if tickers is None else tickers)
+
+        fred_series = {**RATE_SERIES, **MACRO_SERIES} if fred_series is None else fred_series
+        self.jobs: List[RefreshJob] = [
+            RefreshJob('fred', name, series_id, frequency=self._stored_frequency('fred', series_id))
+            for name, series_id in fred_series.items()
+        ]
+        if self.tickers:
+            self.jobs.append(RefreshJob('yahoo', 'Mercados', '*'))
+
+        # Al arrancar se respeta la caducidad guardada (reinicios sin ráfaga de descargas)
+        for job in self.jobs:
+            job.next_due = self._stored_due(job) or job.next_due
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stored_frequency(self, namespace: str, key: str) -> str:
+        frame = self.store.read(namespace, key)
+        return infer_frequency(frame.index) if frame is not None and len(frame) > 1 else 'D'
+
+    def _keys(self, job: RefreshJob) -> List[tuple]:
+        if job.source == 'fred':
+            return [('fred', job.key)]
+        return [('yahoo', ticker) for ticker in self.tickers.values()]
+
+    def _stored_due(self, job: RefreshJob) -> Optional[datetime]:
+        """
+        Vencimiento según los metadatos: la primera caducidad de las claves del
+        trabajo o, sin ella, la última comprobación más el intervalo de reserva
+        """
+        dues = []
+        for ns, key in self._keys(job):
+            meta = self.store.metadata(ns, key)
+            if meta.get('expires_at'):
+                dues.append(datetime.fromisoformat(meta['expires_at']))
+            elif meta.get('checked_at'):
+                dues.append(datetime.fromisoformat(meta['checked_at']) + job.interval())
+            else:
+                return None
+        return min(dues) if dues else None
+
+    def _version(self, namespace: str, key: str):
+        return self.store.metadata(namespace, key).get('updated_at')
+
+    # ── Ejecución ───────────────────────────────────────────────────────────
+
+    def run_pending(self, now: datetime = None) -> int:
+        """
+        Refresca los trabajos vencidos; devuelve cuántas tablas cambiaron
+        """
+        now = now or datetime.now()
+        due = [job for job in self.jobs if job.next_due <= now]
+        if not due:
+            return 0
+
+        start_date = default_start_date(self.history_years)
+        changed = 0
+
+        fred_jobs = {job.name: job for job in due if job.source == 'fred'}
+        if fred_jobs:
+            before = {name: self._version('fred', job.key) for name, job in fred_jobs.items()}
+            data, errors = fetch_fred_batch({name: job.key for name, job in fred_jobs.items()},
+                                            start_date=start_date, max_age=timedelta(0),
+                                            stale_while_revalidate=False)
+            for name, job in fred_jobs.items():
+                if name in errors:
+                    self._failed(job, errors[name], now)
+                    continue
+                if len(data[name]) > 1:
+                    job.frequency = infer_frequency(data[name].index)
+                self._succeeded(job, now)
+                changed += self._version('fred', job.key) != before[name]
+
+        market_job = next((job for job in due if job.source == 'yahoo'), None)
+        if market_job is not None:
+            before = {ticker: self._version('yahoo', ticker) for ticker in self.tickers.values()}
+            try:
+                _, errors = load_market_batch(self.tickers, start_date=start_date, max_age=timedelta(0),
+                                              stale_while_revalidate=False)
+            except Exception as e:
+                errors = {'*': str(e)}
+            if '*' in errors or len(errors) == len(self.tickers):
+                self._failed(market_job, "; ".join(f"{k}: {v}" for k, v in errors.items()), now)
+            else:
+                for name, message in errors.items():
+                    logger.warning("Refresco de %s fallido: %s", name, message)
+                self._succeeded(market_job, now)
+            changed += sum(self._version('yahoo', ticker) != version for ticker, version in before.items())
+
+        if changed:
+            generation = self.store.bump_generation()
+            logger.info("Publicada generación %d (%d tablas actualizadas)", generation, changed)
+        return changed
+
+    def _succeeded(self, job: RefreshJob, now: datetime) -> None:
+        job.last_success, job.last_error = now, None
+        job.next_due = max(self._stored_due(job) or now + job.interval(), now + timedelta(minutes=1))
+
+    def _failed(self, job: RefreshJob, message: str, now: datetime) -> None:
+        logger.warning("Refresco de %s fallido: %s", job.name, message)
+        job.last_error = message
+        job.next_due = now + min(RETRY_DELAY, job.interval())
+
+    def seconds_until_due(self) -> float:
+        if not self.jobs:
+            return HEARTBEAT_SECONDS
+        next_due = min(job.next_due for job in self.jobs)
+        return max(0.0, (next_due - datetime.now()).total_seconds())
+
+    def _beat(self) -> None:
+        failing = [job.name for job in self.jobs if job.last_error]
+        try:
+            self.store.heartbeat(mode='thread' if self._thread else 'process',
+                                 jobs=len(self.jobs), failing=failing)
+        except OSError:
+            pass
+
+    def run_forever(self) -> None:
+        """
+        Bucle principal: refresca lo vencido y duerme hasta el próximo vencimiento
+        """
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception:
+                logger.exception("Error inesperado en el refresco")
+            self._beat()
+            self._stop.wait(min(self.seconds_until_due(), HEARTBEAT_SECONDS))
+
+    def start(self) -> 'RefreshWorker':
+        """
+        Arranca el bucle en un hilo demonio
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name='macro-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Refresco en segundo plano del almacén de series")
+    parser.add_argument('--once', action='store_true', help="refresca todo una vez y termina")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    worker = RefreshWorker()
+    if args.once:
+        worker.run_pending()
+        return
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+REPLAY DE EPISODIOS HISTÓRICOS
+Movimientos realizados de tipos y mercados en episodios pasados (2008, 2020,
+2022...) o en todas las ventanas históricas, trasladados a los niveles de hoy
+"""
+
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from data_fetch import fetch_fred_batch, load_market_batch
+from series_store import PER_SERIES_TTL
+from scenarios import RATE_FLOOR
+from series_catalog import MARKET_TICKERS, RATE_SERIES
+
+# Inicio del histórico que se guarda para los episodios
+REPLAY_HISTORY_START = '2007-01-01'
+
+# Sesiones por mes (para pasar horizontes en meses a sesiones)
+SESSIONS_PER_MONTH = 21
+
+# Episodios predefinidos (inicio, fin)
+EPISODES = {
+    'Crisis 2008': ('2008-09-01', '2009-03-09'),
+    'Taper tantrum 2013': ('2013-05-01', '2013-09-05'),
+    'COVID 2020': ('2020-02-19', '2020-04-30'),
+    'Endurecimiento 2022': ('2022-01-03', '2022-10-31'),
+}
+
+
+def load_replay_history(start_date: str = REPLAY_HISTORY_START,
+                        max_age: Optional[timedelta] = PER_SERIES_TTL,
+                        stale_while_revalidate: bool = True) -> Tuple[pd.DataFrame, Dict[str, pd.Series], Dict[str, str]]:
+    """
+    Histórico largo de tipos (FRED) y cierres de mercado (Yahoo) desde start_date
+
+    Sale del almacén local; solo la primera vez se descarga el tramo anterior
+    al ya almacenado. Devuelve (tipos, cierres, errores).
+    """
+    rates, errors = fetch_fred_batch(RATE_SERIES, start_date=start_date, max_age=max_age,
+                                     stale_while_revalidate=stale_while_revalidate)
+    market, market_errors = load_market_batch(MARKET_TICKERS, start_date=start_date, max_age=max_age,
+                                              stale_while_revalidate=stale_while_revalidate)
+    errors.update(market_errors)
+    closes = {name: df['Close'] for name, df in market.items()
+              if name not in market_errors and 'Close' in df.columns}
+    return pd.DataFrame({name: rates[name] for name in RATE_SERIES}), closes, errors
+
+
+@dataclass
+class ChangeIndex:
+    """
+    Índice acumulado de cambios sobre un calendario de días hábiles
+
+    values[t, k] es el nivel (tipos, cambios en puntos) o el log del precio
+    (mercados, cambios relativos) vigente en la sesión t; el cambio entre
+    dos sesiones es una resta, así que cualquier ventana sale por indexación.
+    """
+    index: pd.DatetimeIndex
+    columns: list
+    values: np.ndarray
+    log: bool
+
+    @classmethod
+    def build(cls, series: Dict[str, pd.Series], calendar: pd.DatetimeIndex, log: bool) -> 'ChangeIndex':
+        stamps = calendar.as_unit('ns').asi8
+        columns, blocks = [], []
+        for name, s in series.items():
+            s = s.dropna().sort_index()
+            if log:
+                s = s[s > 0]
+            if len(s) == 0:
+                continue
+            pos = np.searchsorted(s.index.as_unit('ns').asi8, stamps, side='right') - 1
+            values = s.to_numpy(dtype=float)
+            column = np.where(pos >= 0, values[np.maximum(pos, 0)], np.nan)
+            columns.append(name)
+            blocks.append(np.log(column) if log else column)
+        values = np.column_stack(blocks) if blocks else np.empty((len(calendar), 0))
+        return cls(calendar, columns, values, log)
+
+    def position(self, date) -> int:
+        """
+        Sesión vigente en `date` (la última <= date)
+        """
+        return max(0, int(self.index.searchsorted(pd.Timestamp(date), side='right')) - 1)
+
+    def rebase(self, changes: np.ndarray, current: np.ndarray) -> np.ndarray:
+        """
+        Traslada cambios a los niveles actuales (suma en tipos, producto en precios)
+        """
+        return current * np.exp(changes) if self.log else current + changes
+
+    def episodes(self, spans: Sequence[Tuple[int, int]]) -> np.ndarray:
+        """
+        Cambios acumulados desde el inicio de cada episodio (n_episodios, sesiones, columnas)
+
+        Los episodios más cortos que el más largo se rellenan con NaN.
+        """
+        starts = np.array([start for start, _ in spans])
+        lengths = np.array([end - start + 1 for start, end in spans])
+        offsets = np.arange(lengths.max())
+        rows = np.minimum(starts[:, None] + offsets[None, :], len(self.index) - 1)
+        changes = self.values[rows] - self.values[starts][:, None, :]
+        changes[offsets[None, :] >= lengths[:, None]] = np.nan
+        return changes
+
+    def windows(self, horizon: int, step: int = 1) -> np.ndarray:
+        """
+        Vista (n_ventanas, columnas, horizon + 1) de todas las ventanas históricas, sin copia
+        """
+        return sliding_window_view(self.values, horizon + 1, axis=0)[::step]
+
+
+@dataclass
+class EpisodeReplay:
+    """
+    Trayectorias de un episodio trasladadas a los niveles actuales
+    """
+    name: str
+    start: pd.Timestamp
+    end: pd.Timestamp
+    rates: pd.DataFrame
+    markets: pd.DataFrame
+
+
+class ReplayEngine:
+    """
+    Replay de episodios sobre índices de cambios precalculados
+
+    Los índices se construyen una vez (por versión de datos); cada episodio
+    o el conjunto de todas las ventanas históricas se evalúa después con
+    una sola indexación vectorizada.
+    """
+
+    def __init__(self, rates: pd.DataFrame, markets: Dict[str, pd.Series]):
+        series = [rates[col].dropna() for col in rates.columns] + [s.dropna() for s in markets.values()]
+        series = [s for s in series if len(s) > 0]
+        if series:
+            calendar = pd.bdate_range(min(s.index[0] for s in series).normalize(),
+                                      max(s.index[-1] for s in series).normalize()).as_unit('ns')
+        else:
+            calendar = pd.DatetimeIndex([], dtype='datetime64[ns]')
+        self.rates = ChangeIndex.build({c: rates[c] for c in rates.columns}, calendar, log=False)
+        self.markets = ChangeIndex.build(markets, calendar, log=True)
+
+    @property
+    def first_date(self) -> Optional[pd.Timestamp]:
+        return self.rates.index[0] if len(self.rates.index) else None
+
+    def replay(self, episodes: Dict[str, Tuple[str, str]], current_rates: pd.Series,
+               current_markets: pd.Series, anchor: pd.Timestamp = None) -> Dict[str, EpisodeReplay]:
+        """
+        Replay de varios episodios desde los niveles actuales
+
+        Las fechas de salida son sesiones a partir de `anchor` (por defecto la
+        última fecha de los tipos actuales). Los episodios anteriores al
+        histórico disponible se omiten.
+        """
+        if len(self.rates.index) == 0:
+            return {}
+        episodes = {name: span for name, span in episodes.items()
+                    if pd.Timestamp(span[0]) >= self.rates.index[0]}
+        if not episodes:
+            return {}
+
+        spans = [(self.rates.position(start), self.rates.position(end)) for start, end in episodes.values()]
+        anchor = pd.Timestamp(anchor if anchor is not None else current_rates.name or pd.Timestamp.today()).normalize()
+        dates = pd.bdate_range(anchor, periods=max(end - start for start, end in spans) + 1)
+
+        rate_now = current_rates.reindex(self.rates.columns).to_numpy(dtype=float)
+        market_now = current_markets.reindex(self.markets.columns).to_numpy(dtype=float)
+        rate_paths = np.maximum(self.rates.rebase(self.rates.episodes(spans), rate_now), RATE_FLOOR)
+        market_paths = self.markets.rebase(self.markets.episodes(spans), market_now)
+
+        replays = {}
+        for i, (name, (start, end)) in enumerate(episodes.items()):
+            length = spans[i][1] - spans[i][0] + 1
+            replays[name] = EpisodeReplay(
+                name, pd.Timestamp(start), pd.Timestamp(end),
+                pd.DataFrame(rate_paths[i, :length], index=dates[:length], columns=self.rates.columns),
+                pd.DataFrame(market_paths[i, :length], index=dates[:length], columns=self.markets.columns),
+            )
+        return replays
+
+    def window_distribution(self, horizon: int, group: str = 'rates',
+                            percentiles: Sequence[float] = (5, 50, 95), step: int = 1) -> pd.DataFrame:
+        """
+        Distribución de los cambios en todas las ventanas históricas de `horizon` sesiones
+
+        Por columna: percentiles del cambio al final de la ventana y del peor
+        descenso / mayor subida dentro de ella (en puntos para tipos, en % para mercados).
+        Las ventanas con huecos (antes del inicio de la serie) se descartan.
+        """
+        index = self.rates if group == 'rates' else self.markets
+        if len(index.index) <= horizon:
+            return pd.DataFrame()
+
+        view = index.windows(horizon, step)              # (W, K, horizon + 1)
+        start = view[:, :, 0]
+        stats = {
+            'final': view[:, :, -1] - start,
+            'mín': view.min(axis=2) - start,
+            'máx': view.max(axis=2) - start,
+        }
+        if index.log:
+            stats = {key: np.expm1(value) * 100 for key, value in stats.items()}
+
+        rows = {}
+        for key, value in stats.items():
+            quantiles = np.nanpercentile(value, percentiles, axis=0)
+            for p, row in zip(percentiles, quantiles):
+                rows[f"{key} P{p:g}"] = row
+        table = pd.DataFrame(rows, index=index.columns)
+        table['ventanas'] = np.isfinite(stats['final']).sum(axis=0)
+        return table
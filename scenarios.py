@@ -0,0 +1,178 @@
+"""
+ESCENARIOS DE ESTRÉS
+Shocks de nivel, pendiente y curvatura sobre la curva proyectada, con un
+perfil temporal por escenario; toda la rejilla se evalúa en una sola
+operación vectorizada (escenarios × meses × plazos)
+"""
+
+import itertools
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Plazo en años de cada serie de tipos (Fed Funds = overnight)
+TENOR_YEARS = {
+    'Fed Funds': 0.0,
+    '3M Treasury': 0.25,
+    '2Y Treasury': 2.0,
+    '10Y Treasury': 10.0,
+    '30Y Treasury': 30.0,
+}
+
+# Decaimiento de Nelson-Siegel (Diebold-Li, en años): curvatura máxima hacia los 2-3 años
+NELSON_SIEGEL_LAMBDA = 0.7308
+
+# Suelo de los tipos tras el shock (puntos porcentuales)
+RATE_FLOOR = 0.0
+
+# Perfiles temporales: fracción del shock aplicada en cada mes del horizonte
+PROFILES: Dict[str, Callable[[int], np.ndarray]] = {
+    'instant': lambda h: np.ones(h),                                # salto inmediato y permanente
+    'linear': lambda h: np.arange(1, h + 1) / h,                    # se materializa poco a poco
+    'revert': lambda h: 0.5 ** (np.arange(h) / max(h / 3, 1)),      # salto y vuelta (vida media h/3)
+    'late': lambda h: (np.arange(1, h + 1) / h) ** 2,               # se concentra al final
+}
+
+
+@dataclass(frozen=True)
+class ShockSpec:
+    """
+    Shock sobre la curva, en puntos porcentuales
+
+    - level: desplazamiento paralelo de todos los plazos
+    - slope: inclinación; el corto se mueve -slope/2 y el largo ≈ +slope/2
+    - curvature: joroba en los plazos medios (máximo = curvature)
+    """
+    name: str
+    level: float = 0.0
+    slope: float = 0.0
+    curvature: float = 0.0
+    profile: str = 'linear'
+
+
+# Escenarios predefinidos (los que se comparan en la pestaña de proyecciones)
+PRESET_SCENARIOS = [
+    ShockSpec('Base'),
+    ShockSpec('Optimista', level=-0.5, slope=0.3),
+    ShockSpec('Crisis 2008', level=-2.5, slope=2.5, curvature=-0.3, profile='instant'),
+    ShockSpec('Estanflación', level=2.0, slope=-0.5, curvature=0.3),
+    ShockSpec('Deflación', level=-2.0, slope=-0.8, profile='late'),
+    ShockSpec('Endurecimiento Fed', level=1.0, slope=-1.5, curvature=0.5, profile='revert'),
+]
+
+
+def factor_loadings(columns: Sequence[str]) -> np.ndarray:
+    """
+    Cargas (3, n_plazos) de nivel, pendiente y curvatura (Nelson-Siegel)
+
+    Las columnas sin plazo conocido solo reciben el shock de nivel.
+    """
+    tau = np.array([TENOR_YEARS.get(col, np.nan) for col in columns], dtype=float)
+    known = np.isfinite(tau)
+    x = np.where(known & (tau > 0), NELSON_SIEGEL_LAMBDA * np.where(known, tau, 1.0), 1.0)
+    decay = np.where(known & (tau > 0), (1 - np.exp(-x)) / x, 1.0)
+
+    grid = NELSON_SIEGEL_LAMBDA * np.linspace(0.01, 30, 3000)
+    hump_peak = ((1 - np.exp(-grid)) / grid - np.exp(-grid)).max()
+
+    slope = np.where(known, 0.5 - decay, 0.0)
+    curvature = np.where(known & (tau > 0), (decay - np.exp(-x)) / hump_peak, 0.0)
+    return np.vstack([np.ones(len(columns)), slope, curvature])
+
+
+def profile_weights(profiles: Sequence[str], horizon: int) -> np.ndarray:
+    """
+    Pesos temporales (n_escenarios, horizonte) según el perfil de cada escenario
+    """
+    names = list(PROFILES)
+    unknown = set(profiles) - set(names)
+    if unknown:
+        raise ValueError(f"Perfil desconocido: {', '.join(sorted(unknown))} (usa {', '.join(names)})")
+    table = np.vstack([PROFILES[name](horizon) for name in names])
+    return table[[names.index(p) for p in profiles]]
+
+
+@dataclass
+class ScenarioSet:
+    """
+    Curvas proyectadas bajo cada escenario: values (n_escenarios, meses, plazos)
+    """
+    specs: List[ShockSpec]
+    index: pd.DatetimeIndex
+    columns: list
+    values: np.ndarray
+
+    @property
+    def names(self) -> List[str]:
+        return [spec.name for spec in self.specs]
+
+    def frame(self, name: str) -> pd.DataFrame:
+        return pd.DataFrame(self.values[self.names.index(name)], index=self.index, columns=self.columns)
+
+    def to_dict(self) -> Dict[str, pd.DataFrame]:
+        return {spec.name: pd.DataFrame(block, index=self.index, columns=self.columns)
+                for spec, block in zip(self.specs, self.values)}
+
+    def table(self, current: pd.Series = None) -> pd.DataFrame:
+        """
+        Una fila por escenario: parámetros del shock, nivel final de cada plazo
+        y, con `current`, el cambio frente al último dato observado
+        """
+        params = pd.DataFrame([
+            {'Escenario': s.name, 'Nivel': s.level, 'Pendiente': s.slope,
+             'Curvatura': s.curvature, 'Perfil': s.profile}
+            for s in self.specs
+        ])
+        final = pd.DataFrame(self.values[:, -1, :], columns=[f"{col} final" for col in self.columns])
+        parts = [params, final]
+        if current is not None:
+            now = current.reindex(self.columns).to_numpy(dtype=float)
+            parts.append(pd.DataFrame(self.values[:, -1, :] - now,
+                                      columns=[f"Δ {col}" for col in self.columns]))
+            peak = np.abs(self.values - now).max(axis=1)
+            parts.append(pd.DataFrame(peak, columns=[f"Máx |Δ| {col}" for col in self.columns]))
+        return pd.concat(parts, axis=1).set_index('Escenario')
+
+
+def apply_scenarios(base: pd.DataFrame, specs: Sequence[ShockSpec],
+                    floor: float = RATE_FLOOR) -> ScenarioSet:
+    """
+    Aplica todos los shocks a la proyección base en una sola operación
+
+    curvas[s, t, k] = base[t, k] + peso[s, t] · (shock[s, :] · cargas[:, k])
+    """
+    specs = list(specs)
+    columns = list(base.columns)
+    horizon = len(base)
+
+    shocks = np.array([[s.level, s.slope, s.curvature] for s in specs], dtype=float).reshape(-1, 3)
+    weights = profile_weights([s.profile for s in specs], horizon)
+    values = base.to_numpy(dtype=float)[None, :, :] + np.einsum(
+        'st,sf,fk->stk', weights, shocks, factor_loadings(columns), optimize=True
+    )
+    if floor is not None:
+        np.maximum(values, floor, out=values)
+    return ScenarioSet(specs, base.index, columns, values)
+
+
+def scenario_grid(levels: Iterable[float] = (0.0,), slopes: Iterable[float] = (0.0,),
+                  curvatures: Iterable[float] = (0.0,), profiles: Iterable[str] = ('linear',)) -> List[ShockSpec]:
+    """
+    Producto cartesiano de shocks (p. ej. 13 niveles × 9 pendientes × 3 perfiles = 351 escenarios)
+    """
+    return [
+        ShockSpec(f"L{level:+.2f} S{slope:+.2f} C{curv:+.2f} {profile}", level, slope, curv, profile)
+        for level, slope, curv, profile in itertools.product(levels, slopes, curvatures, profiles)
+    ]
+
+
+def generate_stress_scenarios(forecast_df: pd.DataFrame,
+                              specs: Sequence[ShockSpec] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Proyección bajo cada escenario {nombre: DataFrame}; por defecto los predefinidos
+    """
+    if forecast_df is None or forecast_df.empty:
+        return {}
+    return apply_scenarios(forecast_df, specs or PRESET_SCENARIOS).to_dict()
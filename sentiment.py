@@ -0,0 +1,226 @@
+"""
+SENTIMIENTO DE MERCADO
+Score diario 0-100 a partir de componentes vectorizados (percentil del VIX,
+tendencia del S&P 500, momentum del dólar y del oro, amplitud de los activos
+de riesgo) con la contribución de cada uno; se actualiza de forma incremental
+cuando llegan sesiones nuevas
+"""
+
+import threading
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Peso de cada componente en el score agregado
+COMPONENT_WEIGHTS = {
+    'VIX': 0.30,
+    'Tendencia S&P 500': 0.25,
+    'Amplitud': 0.20,
+    'Dólar': 0.15,
+    'Oro': 0.10,
+}
+
+# Ventanas (sesiones)
+VIX_PERCENTILE_WINDOW = 252
+TREND_WINDOW = 200
+MOMENTUM_WINDOW = 63
+BREADTH_WINDOW = 50
+
+# Observaciones mínimas para dar un valor mientras se llena la ventana
+MIN_PERIODS = 20
+
+# Escala de las desviaciones que llevan un componente cerca de 0 o de 100 (tanh)
+TREND_SCALE = 0.10
+DOLLAR_SCALE = 0.05
+GOLD_SCALE = 0.08
+
+# Activos de riesgo para la amplitud (además de los tickers fuera del catálogo)
+RISK_ASSETS = ('S&P 500', 'NASDAQ', 'Oil (WTI)')
+NON_RISK_ASSETS = ('VIX', 'DXY (Dollar Index)', 'Gold', '10Y Treasury')
+
+# Sesiones de histórico que se recalculan antes de la última fila guardada
+LOOKBACK = max(VIX_PERCENTILE_WINDOW, TREND_WINDOW, MOMENTUM_WINDOW, BREADTH_WINDOW) + 5
+
+
+def closes_frame(market_data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Cierres de todos los tickers sobre un calendario común de días hábiles (as-of)
+    """
+    closes = {name: df['Close'].dropna() for name, df in market_data.items()
+              if df is not None and 'Close' in df.columns and df['Close'].notna().any()}
+    if not closes:
+        return pd.DataFrame()
+    start = min(s.index[0] for s in closes.values()).normalize()
+    end = max(s.index[-1] for s in closes.values()).normalize()
+    calendar = pd.bdate_range(start, end)
+    return pd.DataFrame({name: s[~s.index.duplicated(keep='last')].reindex(calendar, method='ffill')
+                         for name, s in closes.items()}, index=calendar)
+
+
+def rolling_mean(values: np.ndarray, window: int, min_periods: int = MIN_PERIODS) -> np.ndarray:
+    """
+    Media móvil por columnas (T, N) ignorando NaN, con ventana parcial al principio
+    """
+    valid = np.isfinite(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts >= min(window, min_periods), sums / counts, np.nan)
+
+
+def rolling_percentile(values: np.ndarray, window: int, min_periods: int = MIN_PERIODS) -> np.ndarray:
+    """
+    Percentil (0-100) de cada valor dentro de su ventana móvil, en una sola pasada
+    """
+    padded = np.concatenate([np.full(window - 1, np.nan), values])
+    view = sliding_window_view(padded, window)                # (T, window), sin copia
+    current = values[:, None]
+    with np.errstate(invalid='ignore'):
+        below = (view < current).sum(axis=1) + 0.5 * (view == current).sum(axis=1)
+    counts = np.isfinite(view).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where((counts >= min(window, min_periods)) & np.isfinite(values), below / counts * 100, np.nan)
+
+
+def momentum(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Variación relativa frente a `window` sesiones antes
+    """
+    past = np.full_like(values, np.nan)
+    past[window:] = values[:-window]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return values / past - 1
+
+
+def _squash(x: np.ndarray, scale: float) -> np.ndarray:
+    return 50 + 50 * np.tanh(x / scale)
+
+
+def sentiment_components(closes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Componentes (0-100, más alto = más apetito por riesgo) de cada sesión
+
+    Los componentes sin datos (ticker ausente) quedan como NaN.
+    """
+    index = closes.index
+    components = pd.DataFrame(np.nan, index=index, columns=list(COMPONENT_WEIGHTS))
+    if closes.empty:
+        return components
+
+    def column(name: str) -> np.ndarray:
+        return closes[name].to_numpy(dtype=float) if name in closes.columns else np.full(len(index), np.nan)
+
+    # VIX bajo respecto a su último año = calma
+    components['VIX'] = 100 - rolling_percentile(column('VIX'), VIX_PERCENTILE_WINDOW)
+
+    # Distancia del S&P 500 a su media de 200 sesiones
+    spx = column('S&P 500')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        components['Tendencia S&P 500'] = _squash(spx / rolling_mean(spx[:, None], TREND_WINDOW)[:, 0] - 1,
+                                                  TREND_SCALE)
+
+    # Dólar y oro al alza = huida hacia la seguridad
+    components['Dólar'] = 100 - _squash(momentum(column('DXY (Dollar Index)'), MOMENTUM_WINDOW), DOLLAR_SCALE)
+    components['Oro'] = 100 - _squash(momentum(column('Gold'), MOMENTUM_WINDOW), GOLD_SCALE)
+
+    # Amplitud: % de activos de riesgo por encima de su media de 50 sesiones
+    risk = [name for name in closes.columns if name in RISK_ASSETS or name not in NON_RISK_ASSETS]
+    if risk:
+        prices = closes[risk].to_numpy(dtype=float)
+        averages = rolling_mean(prices, BREADTH_WINDOW)
+        known = np.isfinite(prices) & np.isfinite(averages)
+        above = (known & (prices > np.where(known, averages, np.inf))).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            components['Amplitud'] = np.where(known.any(axis=1), above / known.sum(axis=1) * 100, np.nan)
+
+    return components
+
+
+def sentiment_history(closes: pd.DataFrame, weights: Dict[str, float] = None) -> pd.DataFrame:
+    """
+    Componentes, score agregado ('score') y contribuciones ('Δ <componente>')
+
+    El score es la media ponderada de los componentes disponibles cada día;
+    la contribución de cada componente es su desvío frente a 50 por su peso
+    (renormalizado), de modo que score = 50 + suma de contribuciones.
+    """
+    weights = weights or COMPONENT_WEIGHTS
+    components = sentiment_components(closes)
+    values = components[list(weights)].to_numpy(dtype=float)
+    w = np.array(list(weights.values()), dtype=float)
+
+    available = np.isfinite(values)
+    total = (available * w).sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        contributions = np.where(available, (values - 50) * w / total, np.nan)
+    score = 50 + np.nansum(contributions, axis=1)
+    score[total[:, 0] == 0] = np.nan
+
+    history = components.copy()
+    history['score'] = score
+    for j, name in enumerate(weights):
+        history[f"Δ {name}"] = contributions[:, j]
+    return history.dropna(subset=['score'])
+
+
+class SentimentEngine:
+    """
+    Histórico de sentimiento que se actualiza de forma incremental
+
+    Tras el primer cálculo completo, cada actualización recalcula solo la
+    última sesión guardada (puede ser una barra intradía) y las nuevas, con
+    LOOKBACK sesiones de contexto para las ventanas móviles. Si las entradas
+    empiezan antes o acaban antes que el histórico se recalcula todo.
+    """
+
+    def __init__(self, weights: Dict[str, float] = None):
+        self.weights = weights or COMPONENT_WEIGHTS
+        self.history = None
+        self._start = None
+        self._key = None
+        self._lock = threading.Lock()
+
+    def update(self, market_data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        with self._lock:
+            # Sin sesiones nuevas ni cambios en la última barra no se recalcula nada
+            key = tuple((name, len(df), df.index[-1], float(df['Close'].iloc[-1]))
+                        for name, df in sorted(market_data.items())
+                        if df is not None and 'Close' in df.columns and len(df) > 0)
+            if key == self._key and self.history is not None:
+                return self.history
+            self._key = key
+
+            closes = closes_frame(market_data)
+            if closes.empty:
+                return pd.DataFrame()
+
+            # Entradas que empiezan antes o acaban antes que el histórico (otro período): todo
+            if self.history is None or self.history.empty or closes.index[0] < self._start or \
+                    closes.index[-1] < self.history.index[-1]:
+                self.history = sentiment_history(closes, self.weights)
+                self._start = closes.index[0]
+                return self.history
+
+            last = self.history.index[-1]
+
+            start = max(0, closes.index.searchsorted(last) - LOOKBACK)
+            fresh = sentiment_history(closes.iloc[start:], self.weights)
+            fresh = fresh[fresh.index >= last]
+            self.history = pd.concat([self.history[self.history.index < last], fresh])
+            return self.history
+
+    @property
+    def latest(self) -> float:
+        return float(self.history['score'].iloc[-1]) if self.history is not None and len(self.history) else np.nan
+
+
+def calculate_market_sentiment_score(market_data: Dict[str, pd.DataFrame]) -> float:
+    """
+    Score de sentimiento (0-100) de la última sesión
+    """
+    history = sentiment_history(closes_frame(market_data))
+    return float(history['score'].iloc[-1]) if len(history) else np.nan
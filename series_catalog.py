@@ -0,0 +1,39 @@
+"""
+CATÁLOGO DE SERIES
+Series de FRED y tickers de Yahoo Finance que usa el dashboard, compartidos
+por la interfaz y por el refresco en segundo plano
+"""
+
+# Series de tipos de interés (curva de rendimientos)
+RATE_SERIES = {
+    'Fed Funds': 'DFF',          # Fed Funds Rate efectivo
+    '3M Treasury': 'DGS3MO',
+    '2Y Treasury': 'DGS2',
+    '10Y Treasury': 'DGS10',
+    '30Y Treasury': 'DGS30'
+}
+
+# Indicadores macroeconómicos principales
+MACRO_SERIES = {
+    'GDP': 'GDP',           # PIB
+    'CPI': 'CPIAUCSL',      # Inflación (CPI)
+    'Unemployment': 'UNRATE',  # Tasa de desempleo
+    'Retail Sales': 'RSXFS',   # Ventas minoristas
+    'Industrial Production': 'INDPRO',  # Producción industrial
+    'Housing Starts': 'HOUST',  # Inicio de viviendas
+    'Consumer Sentiment': 'UMCSENT',  # Sentimiento del consumidor
+    'PCE': 'PCEPI',         # Índice de precios PCE
+    'M2 Money Supply': 'M2SL',  # Oferta monetaria M2
+    'Trade Balance': 'BOPGSTB'  # Balanza comercial
+}
+
+# Tickers de mercado (Yahoo Finance)
+MARKET_TICKERS = {
+    'S&P 500': '^GSPC',
+    'NASDAQ': '^IXIC',
+    'DXY (Dollar Index)': 'DX-Y.NYB',
+    'Gold': 'GC=F',
+    'Oil (WTI)': 'CL=F',
+    'VIX': '^VIX',
+    '10Y Treasury': '^TNX'
+}
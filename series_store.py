@@ -0,0 +1,331 @@
+"""
+ALMACÉN LOCAL DE SERIES
+Persistencia en disco (Parquet) de series FRED y cotizaciones de Yahoo Finance
+con actualización incremental: solo se descargan las observaciones nuevas
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import pandas as pd
+
+# Directorio del almacén (configurable por variable de entorno)
+DEFAULT_STORE_DIR = Path(os.environ.get(
+    'MACRO_DATA_DIR',
+    Path(__file__).resolve().parent / '.data_store'
+))
+
+# Días que se vuelven a pedir antes de la última observación para recoger revisiones
+DEFAULT_OVERLAP_DAYS = 7
+
+# Antigüedad máxima de la última comprobación antes de volver a consultar la fuente
+DEFAULT_MAX_AGE = timedelta(hours=1)
+
+# max_age para usar la caducidad propia de cada clave (expires_at en sus metadatos,
+# fijada por la política de frescura); sin ella se aplica DEFAULT_MAX_AGE
+PER_SERIES_TTL = None
+
+# Sin caducidad: el almacén se da por bueno (lo mantiene al día el refresco en segundo plano)
+NEVER_STALE = timedelta.max
+
+# Silencio máximo del refresco en segundo plano antes de darlo por muerto
+REFRESHER_TIMEOUT = timedelta(minutes=3)
+
+
+class SeriesStore:
+    """
+    Almacén columnar de series temporales, una tabla Parquet por clave
+
+    Cada clave (series_id de FRED o ticker de Yahoo) vive en un espacio de
+    nombres ('fred', 'yahoo') y tiene un fichero de metadatos con la primera
+    y la última fecha observada. Las escrituras son atómicas (fichero temporal
+    + os.replace), así que un lector nunca ve una tabla a medio escribir.
+    """
+
+    def __init__(self, root: Path = DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._stale_before: Optional[datetime] = None
+
+    # ── Rutas y bloqueos ────────────────────────────────────────────────────
+
+    def _base(self, namespace: str, key: str) -> Path:
+        return self.root / namespace / quote(key, safe='')
+
+    def _lock(self, namespace: str, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(f"{namespace}/{key}", threading.Lock())
+
+    # ── Lectura / escritura ─────────────────────────────────────────────────
+
+    def read(self, namespace: str, key: str) -> Optional[pd.DataFrame]:
+        """
+        Lee la tabla almacenada o None si no existe o está corrupta
+        """
+        path = self._base(namespace, key).with_suffix('.parquet')
+        if not path.exists():
+            return None
+        try:
+            return pd.read_parquet(path)
+        except Exception:
+            return None
+
+    def metadata(self, namespace: str, key: str) -> Dict:
+        """
+        Metadatos de la clave (first_date, last_date, rows, updated_at)
+        """
+        path = self._base(namespace, key).with_suffix('.json')
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def write(self, namespace: str, key: str, frame: pd.DataFrame, **extra) -> None:
+        """
+        Escribe la tabla y sus metadatos de forma atómica
+        """
+        base = self._base(namespace, key)
+        base.parent.mkdir(parents=True, exist_ok=True)
+
+        meta = self.metadata(namespace, key)
+        meta.update(extra)
+        meta.update({
+            'first_date': frame.index.min().strftime('%Y-%m-%d') if len(frame) else None,
+            'last_date': frame.index.max().strftime('%Y-%m-%d') if len(frame) else None,
+            'rows': int(len(frame)),
+            'updated_at': datetime.now().isoformat(),
+        })
+
+        tmp_data = base.with_suffix('.parquet.tmp')
+        frame.to_parquet(tmp_data)
+        os.replace(tmp_data, base.with_suffix('.parquet'))
+
+        tmp_meta = base.with_suffix('.json.tmp')
+        tmp_meta.write_text(json.dumps(meta))
+        os.replace(tmp_meta, base.with_suffix('.json'))
+
+    def touch(self, namespace: str, key: str, **extra) -> None:
+        """
+        Actualiza solo los metadatos (p. ej. la hora de la última comprobación)
+        """
+        base = self._base(namespace, key)
+        meta = self.metadata(namespace, key)
+        meta.update(extra)
+
+        tmp_meta = base.with_suffix('.json.tmp')
+        tmp_meta.write_text(json.dumps(meta))
+        os.replace(tmp_meta, base.with_suffix('.json'))
+
+    def _write_json(self, path: Path, payload: Dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.json.tmp')
+        tmp.write_text(json.dumps(payload))
+        os.replace(tmp, path)
+
+    def load_state(self, name: str) -> Dict:
+        """
+        Estado persistente de un componente (p. ej. las alertas) o {} si no existe
+        """
+        try:
+            return json.loads((self.root / '_state' / f"{quote(name, safe='')}.json").read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self, name: str, payload: Dict) -> None:
+        """
+        Guarda el estado de un componente de forma atómica
+        """
+        self._write_json(self.root / '_state' / f"{quote(name, safe='')}.json", payload)
+
+    # ── Publicación y refresco en segundo plano ─────────────────────────────
+
+    def generation(self) -> int:
+        """
+        Contador de publicaciones: cambia cada vez que el refresco escribe datos nuevos
+        """
+        try:
+            return int(json.loads((self.root / '_generation.json').read_text()).get('generation', 0))
+        except (OSError, ValueError):
+            return 0
+
+    def bump_generation(self) -> int:
+        """
+        Publica una nueva generación (tras escribir las tablas actualizadas)
+        """
+        with self._locks_guard:
+            generation = self.generation() + 1
+            self._write_json(self.root / '_generation.json', {
+                'generation': generation,
+                'published_at': datetime.now().isoformat(),
+            })
+        return generation
+
+    def heartbeat(self, **status) -> None:
+        """
+        Señal de vida del refresco en segundo plano (hilo o proceso aparte)
+        """
+        status.update(pid=os.getpid(), heartbeat_at=datetime.now().isoformat())
+        self._write_json(self.root / '_refresher.json', status)
+
+    def refresher_status(self) -> Dict:
+        try:
+            return json.loads((self.root / '_refresher.json').read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def refresher_alive(self, timeout: timedelta = REFRESHER_TIMEOUT) -> bool:
+        """
+        True si algún refresco en segundo plano ha dado señal de vida hace menos de timeout
+        """
+        heartbeat_at = self.refresher_status().get('heartbeat_at')
+        if not heartbeat_at:
+            return False
+        return datetime.now() - datetime.fromisoformat(heartbeat_at) < timeout
+
+    def mark_stale(self) -> None:
+        """
+        Considera obsoletas todas las comprobaciones anteriores (botón de actualizar)
+        """
+        self._stale_before = datetime.now()
+
+    # ── Actualización incremental ───────────────────────────────────────────
+
+    def is_fresh(self, namespace: str, key: str,
+                 max_age: Optional[timedelta] = PER_SERIES_TTL) -> bool:
+        """
+        True si la clave se comprobó contra la fuente hace menos de max_age
+        (con PER_SERIES_TTL, si aún no ha llegado su expires_at)
+        """
+        meta = self.metadata(namespace, key)
+        checked_at = meta.get('checked_at')
+        if not checked_at:
+            return False
+
+        checked_at = datetime.fromisoformat(checked_at)
+        if self._stale_before is not None and checked_at < self._stale_before:
+            return False
+        if max_age is PER_SERIES_TTL:
+            if meta.get('expires_at'):
+                return datetime.now() < datetime.fromisoformat(meta['expires_at'])
+            max_age = DEFAULT_MAX_AGE
+        return datetime.now() - checked_at < max_age
+
+    def plan(self, namespace: str, key: str, start_date: str = None,
+             max_age: Optional[timedelta] = PER_SERIES_TTL,
+             overlap_days: int = DEFAULT_OVERLAP_DAYS) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Rangos (inicio, fin) que hay que descargar para cubrir desde start_date
+
+        - Sin datos: todo el rango pedido
+        - Rango pedido anterior al ya cubierto: solo el tramo que falta (backfill)
+        - Última comprobación más antigua que max_age: la cola desde la última
+          observación (menos el solape, para recoger revisiones)
+        Una lista vacía significa que el almacén basta y no hay llamada de red.
+        """
+        meta = self.metadata(namespace, key)
+        if not meta.get('last_date'):
+            return [(start_date, None)]
+
+        ranges = []
+        covered_from = meta.get('covered_from') or meta.get('first_date')
+        if start_date and covered_from and start_date < covered_from:
+            ranges.append((start_date, covered_from))
+
+        if not self.is_fresh(namespace, key, max_age):
+            since = pd.Timestamp(meta['last_date']) - timedelta(days=overlap_days)
+            ranges.append((since.strftime('%Y-%m-%d'), None))
+
+        return ranges
+
+    def update(self, namespace: str, key: str,
+               fetch: Callable[[Optional[str], Optional[str]], pd.DataFrame],
+               start_date: str = None,
+               max_age: Optional[timedelta] = PER_SERIES_TTL,
+               overlap_days: int = DEFAULT_OVERLAP_DAYS,
+               revalidate: Callable[[Dict], Tuple[bool, Dict[str, Any]]] = None,
+               expires_at: Callable[[pd.DataFrame, Dict[str, Any]], Optional[datetime]] = None) -> pd.DataFrame:
+        """
+        Completa la tabla almacenada con las observaciones que falten
+
+        `fetch(start_date, end_date)` debe devolver las observaciones del rango
+        (None = sin límite). Solo se piden los rangos que indique `plan`; las
+        fechas solapadas se sobrescriben con lo descargado para recoger revisiones.
+
+        `revalidate(meta)` es una comprobación barata previa a la descarga de la
+        cola: devuelve (cambió, metadatos de la fuente). Si la fuente no cambió,
+        solo se registra la comprobación. `expires_at(tabla, metadatos)` fija la
+        caducidad de la clave tras cada comprobación (ver PER_SERIES_TTL).
+        """
+        with self._lock(namespace, key):
+            stored = self.read(namespace, key)
+            if stored is None:
+                stored = pd.DataFrame()
+
+            ranges = self.plan(namespace, key, start_date, max_age, overlap_days)
+            if stored.empty:
+                ranges = [(start_date, None)]
+            if not ranges:
+                return stored
+
+            meta = self.metadata(namespace, key)
+            covered_from = meta.get('covered_from') or meta.get('first_date')
+            extra: Dict[str, Any] = {}
+            if revalidate is not None and not stored.empty:
+                changed, extra = revalidate(meta)
+                if not changed:
+                    # Solo queda la cola y la fuente no ha publicado nada: no se descarga
+                    ranges = [(range_start, range_end) for range_start, range_end in ranges
+                              if range_end is not None]
+
+            merged = stored
+            for range_start, range_end in ranges:
+                fresh = fetch(range_start, range_end)
+                if fresh is None or fresh.empty:
+                    continue
+                merged = fresh if merged.empty else (
+                    fresh.combine_first(merged)[merged.columns.union(fresh.columns, sort=False)]
+                )
+
+            if start_date and (not covered_from or start_date < covered_from):
+                covered_from = start_date
+            extra['checked_at'] = datetime.now().isoformat()
+            extra['covered_from'] = covered_from
+            if expires_at is not None:
+                expiry = expires_at(merged, extra)
+                extra['expires_at'] = expiry.isoformat() if expiry else None
+
+            try:
+                if merged is not stored:
+                    merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+                if merged is stored or merged.equals(stored):
+                    # Nada nuevo en la fuente: solo se registra la comprobación
+                    if not stored.empty:
+                        self.touch(namespace, key, **extra)
+                    return stored
+
+                self.write(namespace, key, merged, **extra)
+            except OSError:
+                # El almacén es una caché: si no se puede escribir seguimos con los datos en memoria
+                pass
+            return merged
+
+
+_default_store: Optional[SeriesStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_store() -> SeriesStore:
+    """
+    Almacén compartido por todo el proceso
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SeriesStore()
+        return _default_store
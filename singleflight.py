@@ -0,0 +1,70 @@
+"""
+COALESCENCIA DE PETICIONES
+Single-flight: una sola ejecución en curso por clave; las llamadas
+concurrentes con la misma clave esperan y comparten su resultado
+"""
+
+import threading
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, Hashable, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """
+    Grupo de llamadas coalescidas por clave
+
+    `do` ejecuta la función en el hilo que llega primero (líder) y bloquea
+    al resto hasta que termine; todos reciben el mismo resultado o la misma
+    excepción. `do_async` hace lo mismo en un executor sin bloquear.
+    Terminada la llamada, la clave se libera y la siguiente vuelve a ejecutar.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.executions = 0
+        self.shared = 0
+
+    def _join(self, key: Hashable):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.executions += 1
+            return future, True
+
+    def _run(self, key: Hashable, future: Future, fn: Callable[[], T]) -> None:
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        Ejecuta fn una sola vez por clave en curso y devuelve su resultado
+        """
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn)
+        return future.result()
+
+    def do_async(self, key: Hashable, fn: Callable[[], T], executor: Executor) -> Future:
+        """
+        Lanza fn en el executor salvo que ya haya una ejecución en curso con esa clave
+        """
+        future, leader = self._join(key)
+        if leader:
+            executor.submit(self._run, key, future, fn)
+        return future
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls
@@ -0,0 +1,198 @@
+"""
+REGLA DE TAYLOR
+Tipo de Taylor y gap de política para cada fecha (Fed Funds diario frente a
+CPI y desempleo mensuales, unidos as-of) y rejilla de sensibilidad a los
+parámetros (r*, π*, NAIRU, coeficiente del gap) evaluada como un único
+tensor por broadcasting
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+from derived_metrics import asof_values, yoy_series
+
+
+@dataclass(frozen=True)
+class TaylorParams:
+    """
+    Parámetros de la regla (en puntos porcentuales)
+
+    tipo = r* + π + inflation_coef·(π - π*) + gap_coef·okun·(NAIRU - u)
+
+    El gap de output se aproxima con la ley de Okun a partir del desempleo.
+    """
+    r_star: float = 2.0
+    pi_star: float = 2.0
+    nairu: float = 4.0
+    inflation_coef: float = 0.5
+    gap_coef: float = 0.5
+    okun: float = 2.0
+
+
+DEFAULT_PARAMS = TaylorParams()
+
+# Rejilla de sensibilidad por defecto
+R_STAR_GRID = np.round(np.arange(0.0, 3.01, 0.25), 2)
+PI_STAR_GRID = np.array([1.5, 2.0, 2.5, 3.0])
+NAIRU_GRID = np.round(np.arange(3.5, 6.01, 0.25), 2)
+GAP_COEF_GRID = np.array([0.5, 1.0])          # Taylor (1993) y "balanced approach" (1999)
+
+# Postura según el gap (Fed Funds - Taylor): (límite inferior, postura, descripción)
+STANCES = [
+    (1.0, 'Muy restrictiva', "Fed más restrictiva de lo sugerido: sesgo anti-inflación fuerte"),
+    (0.0, 'Restrictiva', "Política ligeramente restrictiva: normal en ciclos alcistas"),
+    (-1.0, 'Acomodaticia', "Política ligeramente acomodaticia: estimulando la economía"),
+    (-np.inf, 'Muy acomodaticia', "Fed muy acomodaticia: típico de crisis o recesiones"),
+]
+
+
+def classify_stance(gap: float) -> Dict[str, str]:
+    """
+    Postura y descripción para un gap de política
+    """
+    for lower, stance, description in STANCES:
+        if gap > lower:
+            return {'stance': stance, 'description': description}
+    return {'stance': 'Sin datos', 'description': "No hay datos suficientes"}
+
+
+def taylor_inputs(fed_funds: pd.Series, cpi: pd.Series, unemployment: pd.Series) -> pd.DataFrame:
+    """
+    Fed Funds, inflación interanual y desempleo en cada fecha de Fed Funds
+
+    Los datos mensuales se unen as-of (último dato con fecha de observación
+    <= fecha); se descartan las fechas anteriores al primer dato de cada serie.
+    """
+    fed_funds = fed_funds.dropna()
+    inflation = yoy_series(cpi.dropna())
+    unemployment = unemployment.dropna()
+    if len(fed_funds) == 0 or len(inflation) == 0 or len(unemployment) == 0:
+        return pd.DataFrame(columns=['Fed Funds', 'Inflación', 'Desempleo'])
+
+    dates = fed_funds.index
+    inputs = pd.DataFrame({
+        'Fed Funds': fed_funds.to_numpy(dtype=float),
+        'Inflación': asof_values(inflation, dates),
+        'Desempleo': asof_values(unemployment, dates),
+    }, index=dates)
+    return inputs.dropna()
+
+
+def taylor_rate(inflation, unemployment, params: TaylorParams = DEFAULT_PARAMS):
+    """
+    Tipo de Taylor (escalar o array)
+    """
+    return (params.r_star + inflation + params.inflation_coef * (inflation - params.pi_star)
+            + params.gap_coef * params.okun * (params.nairu - unemployment))
+
+
+def apply_taylor(inputs: pd.DataFrame, params: TaylorParams = DEFAULT_PARAMS) -> pd.DataFrame:
+    """
+    Entradas más tipo de Taylor ('Taylor') y gap ('Gap' = Fed Funds - Taylor) de cada fecha
+    """
+    history = inputs.copy()
+    history['Taylor'] = taylor_rate(history['Inflación'].to_numpy(dtype=float),
+                                    history['Desempleo'].to_numpy(dtype=float), params)
+    history['Gap'] = history['Fed Funds'] - history['Taylor']
+    return history
+
+
+def taylor_history(fed_funds: pd.Series, cpi: pd.Series, unemployment: pd.Series,
+                   params: TaylorParams = DEFAULT_PARAMS) -> pd.DataFrame:
+    """
+    Tipo de Taylor y gap de cada fecha de Fed Funds
+    """
+    return apply_taylor(taylor_inputs(fed_funds, cpi, unemployment), params)
+
+
+def policy_stance(history: pd.DataFrame) -> Dict:
+    """
+    Postura en la última fecha de un histórico de apply_taylor
+
+    Devuelve stance, description, current_rate, taylor_rate, policy_gap y current_inflation.
+    """
+    if history.empty:
+        return {'stance': 'Sin datos', 'description': "No hay datos suficientes",
+                'current_rate': np.nan, 'taylor_rate': np.nan, 'policy_gap': np.nan,
+                'current_inflation': np.nan}
+    last = history.iloc[-1]
+    return {
+        **classify_stance(float(last['Gap'])),
+        'current_rate': float(last['Fed Funds']),
+        'taylor_rate': float(last['Taylor']),
+        'policy_gap': float(last['Gap']),
+        'current_inflation': float(last['Inflación']),
+    }
+
+
+def analyze_fed_policy_stance(fed_funds: pd.Series, cpi: pd.Series, unemployment: pd.Series,
+                              params: TaylorParams = DEFAULT_PARAMS) -> Dict:
+    """
+    Postura actual de la Fed según la regla de Taylor
+    """
+    return policy_stance(taylor_history(fed_funds, cpi, unemployment, params))
+
+
+@dataclass
+class TaylorGrid:
+    """
+    Gap de política (r*, π*, NAIRU, coeficiente del gap, fechas) para toda la rejilla
+    """
+    r_stars: np.ndarray
+    pi_stars: np.ndarray
+    nairus: np.ndarray
+    gap_coefs: np.ndarray
+    index: pd.DatetimeIndex
+    gap: np.ndarray
+
+    def latest(self) -> np.ndarray:
+        """
+        Gap en la última fecha (r*, π*, NAIRU, coeficiente)
+        """
+        return self.gap[..., -1]
+
+    def mean_abs(self) -> np.ndarray:
+        """
+        Gap absoluto medio del período: qué parámetros describen mejor la Fed observada
+        """
+        return np.abs(self.gap).mean(axis=-1)
+
+    def surface(self, values: np.ndarray, pi_star: float, gap_coef: float) -> pd.DataFrame:
+        """
+        Corte r* × NAIRU de un resultado (r*, π*, NAIRU, coeficiente) para π* y coeficiente dados
+        """
+        p = int(np.abs(self.pi_stars - pi_star).argmin())
+        c = int(np.abs(self.gap_coefs - gap_coef).argmin())
+        return pd.DataFrame(values[:, p, :, c], index=pd.Index(self.r_stars, name='r*'),
+                            columns=pd.Index(self.nairus, name='NAIRU'))
+
+
+def taylor_grid(inputs: pd.DataFrame, r_stars: Sequence[float] = R_STAR_GRID,
+                pi_stars: Sequence[float] = PI_STAR_GRID, nairus: Sequence[float] = NAIRU_GRID,
+                gap_coefs: Sequence[float] = GAP_COEF_GRID, inflation_coef: float = DEFAULT_PARAMS.inflation_coef,
+                okun: float = DEFAULT_PARAMS.okun, freq: str = 'M') -> TaylorGrid:
+    """
+    Evalúa la regla para todas las combinaciones de parámetros en una sola operación
+
+    Las entradas diarias se reducen a la última fecha de cada período `freq`
+    (frecuencia de Period, p. ej. 'M' o 'W'; None = todas las fechas); la
+    última fecha siempre se conserva.
+    """
+    if freq is not None and len(inputs) > 0:
+        inputs = inputs[~inputs.index.to_period(freq).duplicated(keep='last')]
+    r = np.asarray(r_stars, dtype=float)[:, None, None, None, None]
+    p = np.asarray(pi_stars, dtype=float)[None, :, None, None, None]
+    n = np.asarray(nairus, dtype=float)[None, None, :, None, None]
+    c = np.asarray(gap_coefs, dtype=float)[None, None, None, :, None]
+
+    fed = inputs['Fed Funds'].to_numpy(dtype=float)
+    inflation = inputs['Inflación'].to_numpy(dtype=float)
+    unemployment = inputs['Desempleo'].to_numpy(dtype=float)
+
+    taylor = r + inflation + inflation_coef * (inflation - p) + c * okun * (n - unemployment)
+    return TaylorGrid(np.asarray(r_stars, dtype=float), np.asarray(pi_stars, dtype=float),
+                      np.asarray(nairus, dtype=float), np.asarray(gap_coefs, dtype=float),
+                      inputs.index, fed - taylor)